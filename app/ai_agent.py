@@ -5,8 +5,11 @@ Suporta tanto OpenAI quanto modelos locais gratuitos
 import os
 import re
 import json
+import time
+import queue
+import threading
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterator, List, Optional, Tuple, Any
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 
@@ -18,14 +21,47 @@ except ImportError:
     OPENAI_AVAILABLE = False
 
 try:
-    from transformers import pipeline, AutoTokenizer, AutoModelForCausalLM
+    from transformers import pipeline, AutoTokenizer, AutoModelForCausalLM, TextIteratorStreamer
     import torch
     TRANSFORMERS_AVAILABLE = True
 except ImportError:
     TRANSFORMERS_AVAILABLE = False
 
-from app import crud
+from app import crud, intent_router
 from app.database import get_db
+from app.answer_cache import answer_cache, ANSWER_CACHE_ENABLED
+from app.context_cache import context_cache
+from app.inference_batcher import InferenceBatcher, INFERENCE_BATCHING
+from app.prompt_context import COLUMN_SEPARATOR, format_table
+from app.prompt_packer import PackedPrompt, load_tokenizer, pack_prompt
+
+# Título da tabela de produtos no contexto; as linhas abaixo dele são as únicas descartáveis
+CONTEXT_TABLE_TITLE = "Top 3 produtos mais vendidos no último mês:"
+
+def _render_context_lines(lines: List[str], omitted_rows: int = 0) -> str:
+    """Junta as linhas de contexto incluídas no prompt, indicando as omitidas"""
+    if omitted_rows:
+        lines = list(lines) + [f"... (+{omitted_rows} linhas omitidas)"]
+    return "\n".join(lines)
+
+def _split_context(context: str) -> Tuple[str, List[str]]:
+    """
+    Separa o contexto em cabeçalho fixo (resumo, título e cabeçalho da tabela)
+    e linhas da tabela de produtos, as únicas que o empacotamento pode descartar
+    """
+    lines = [line.strip() for line in context.strip().splitlines()]
+    if CONTEXT_TABLE_TITLE not in lines:
+        return "\n".join(lines), []
+    table_start = lines.index(CONTEXT_TABLE_TITLE) + 1
+    header = lines[:table_start]
+    table = [line for line in lines[table_start:] if line]
+    if table and COLUMN_SEPARATOR in table[0]:
+        header.append(table.pop(0))  # cabeçalho das colunas da tabela
+    return "\n".join(header), table
+
+def _join_context(header: str, rows_text: str) -> str:
+    """Cabeçalho fixo seguido das linhas de dados incluídas"""
+    return f"{header}\n{rows_text}" if rows_text else header
 
 class SalesInsightsAI:
     """
@@ -38,10 +74,16 @@ class SalesInsightsAI:
         self.model_name = os.getenv("MODEL_NAME", "microsoft/DialoGPT-medium")
         self.temperature = float(os.getenv("MODEL_TEMPERATURE", "0.1"))
         self.max_tokens = int(os.getenv("MAX_TOKENS", "500"))
+        # Tempo máximo sem receber tokens do modelo local em streaming
+        self.stream_timeout = float(os.getenv("LOCAL_MODEL_STREAM_TIMEOUT", "60"))
+        # Janela de contexto do modelo local e tokens reservados para a resposta
+        self.local_context_window = int(os.getenv("LOCAL_MODEL_CONTEXT_WINDOW", "1024"))
+        self.local_max_new_tokens = int(os.getenv("LOCAL_MODEL_MAX_NEW_TOKENS", "200"))
         
         # Inicializa o modelo apropriado
         self.model = None
         self.tokenizer = None
+        self.batcher = None
         self._initialize_model()
     
     def _initialize_model(self):
@@ -61,14 +103,51 @@ class SalesInsightsAI:
                     device=-1  # CPU
                 )
                 print("✅ Modelo local inicializado")
+                
+                # Requisições concorrentes compartilham um forward em lote
+                if INFERENCE_BATCHING:
+                    self.batcher = InferenceBatcher(self.model, self._local_generation_kwargs())
+                    print("✅ Micro-batching de inferência ativo")
             except Exception as e:
                 print(f"❌ Erro ao inicializar modelo local: {e}")
                 self.model = None
         else:
             print("⚠️ Nenhum modelo de IA disponível, usando respostas baseadas em regras")
     
-    def _get_database_context(self, db: Session) -> str:
-        """Obtém contexto do banco de dados para o modelo"""
+    def _local_generation_kwargs(self) -> Dict[str, Any]:
+        """Parâmetros de geração do modelo local"""
+        return {
+            'max_new_tokens': self.local_max_new_tokens,
+            'num_return_sequences': 1,
+            'temperature': self.temperature,
+            'do_sample': True,
+            'pad_token_id': 50256
+        }
+    
+    def _get_database_context(self, db: Session, data_version: Optional[str] = None) -> Tuple[str, float]:
+        """
+        Obtém contexto do banco de dados para o modelo
+        O contexto é construído uma vez por versão dos dados e reutilizado
+        
+        Returns:
+            (contexto, build_ms): build_ms é o tempo de construção do contexto,
+            medido agora ou guardado no cache quando ele foi construído
+        """
+        data_version = data_version or crud.get_data_version(db)
+        cached = context_cache.get_entry(data_version)
+        if cached is not None:
+            return cached
+        
+        start = time.perf_counter()
+        context = self._build_database_context(db)
+        build_ms = (time.perf_counter() - start) * 1000
+        
+        if not context.startswith("Erro"):
+            context_cache.set(data_version, context, build_ms)
+        return context, build_ms
+    
+    def _build_database_context(self, db: Session) -> str:
+        """Monta o texto de contexto a partir do resumo e dos top produtos"""
         try:
             # Busca informações básicas do banco
             summary = crud.get_sales_summary(db)
@@ -81,11 +160,16 @@ class SalesInsightsAI:
             - Total de produtos: {summary['total_products']}
             - Total de clientes: {summary['total_customers']}
             
-            Top 3 produtos mais vendidos no último mês:
+            {CONTEXT_TABLE_TITLE}
             """
             
-            for i, product in enumerate(top_products, 1):
-                context += f"\n{i}. {product['name']} - {product['total_quantity']} unidades - R$ {product['total_revenue']:.2f}"
+            # Tabela compacta: cabeçalho único e valores arredondados
+            context += "\n" + format_table(
+                [
+                    {'produto': product['name'], 'unidades': product['total_quantity'], 'receita_rs': product['total_revenue']}
+                    for product in top_products
+                ]
+            )
             
             return context
         except Exception as e:
@@ -114,35 +198,8 @@ class SalesInsightsAI:
             return []
     
     def _analyze_question_intent(self, question: str) -> Dict[str, Any]:
-        """Analisa a intenção da pergunta"""
-        question_lower = question.lower()
-        
-        intent = {
-            'type': 'general',
-            'entities': [],
-            'time_period': None,
-            'metric': None
-        }
-        
-        # Detecta tipo de pergunta
-        if any(word in question_lower for word in ['mais vendido', 'top', 'melhor', 'maior']):
-            intent['type'] = 'top_products'
-        elif any(word in question_lower for word in ['total', 'soma', 'receita', 'faturamento']):
-            intent['type'] = 'summary'
-        elif any(word in question_lower for word in ['cliente', 'comprador']):
-            intent['type'] = 'customer_analysis'
-        elif any(word in question_lower for word in ['período', 'mês', 'semana', 'ano']):
-            intent['type'] = 'time_analysis'
-        
-        # Detecta período de tempo
-        if 'última semana' in question_lower or 'semana passada' in question_lower:
-            intent['time_period'] = 'last_week'
-        elif 'último mês' in question_lower or 'mês passado' in question_lower:
-            intent['time_period'] = 'last_month'
-        elif 'hoje' in question_lower:
-            intent['time_period'] = 'today'
-        
-        return intent
+        """Analisa a intenção da pergunta (roteador de intenções compilado)"""
+        return intent_router.analyze_question(question)
     
     def _generate_rule_based_response(self, question: str, db: Session) -> str:
         """Gera resposta baseada em regras quando não há modelo de IA"""
@@ -192,22 +249,64 @@ Posso ajudar você com análises sobre:
         except Exception as e:
             return f"❌ Erro ao processar sua pergunta: {str(e)}"
     
-    def _use_openai_model(self, question: str, context: str) -> str:
-        """Usa modelo OpenAI para gerar resposta"""
-        try:
-            prompt = f"""
+    def _build_openai_prompt(self, question: str, context: str) -> PackedPrompt:
+        """
+        Monta o prompt enviado ao modelo OpenAI dentro do orçamento de tokens
+        O resumo e o cabeçalho da tabela são fixos; as últimas linhas de top
+        produtos são descartadas se o prompt exceder o orçamento
+        """
+        header, rows = _split_context(context)
+        
+        def build_prompt(rows_text: str) -> str:
+            return f"""
             Você é um assistente especializado em análise de vendas. 
             Responda à pergunta do usuário baseado nos dados fornecidos.
             
             Contexto dos dados:
-            {context}
+            {_join_context(header, rows_text)}
             
             Pergunta: {question}
             
             Responda de forma clara, objetiva e profissional em português brasileiro.
             Use emojis e formatação markdown quando apropriado.
             """
-            
+        
+        return pack_prompt(build_prompt, rows, self.max_tokens, render=_render_context_lines)
+    
+    def _count_local_tokens(self, text: str) -> int:
+        """Conta os tokens com o tokenizador do próprio modelo local"""
+        return len(self.model.tokenizer.encode(text))
+    
+    def _build_local_prompt(self, question: str, context: str) -> PackedPrompt:
+        """
+        Monta o prompt do modelo local dentro da janela do modelo, reservando
+        os tokens da resposta; como no prompt OpenAI, só as linhas de top
+        produtos são descartáveis
+        """
+        header, rows = _split_context(context)
+        
+        def build_prompt(rows_text: str) -> str:
+            return f"Pergunta sobre vendas: {question}\nContexto: {_join_context(header, rows_text)}\nResposta:"
+        
+        return pack_prompt(
+            build_prompt,
+            rows,
+            self.local_max_new_tokens,
+            render=_render_context_lines,
+            budget=self.local_context_window - self.local_max_new_tokens,
+            token_counter=self._count_local_tokens
+        )
+    
+    def _check_local_prompt(self, prompt: PackedPrompt):
+        """Recusa o prompt que não cabe na janela do modelo local mesmo sem linhas de dados"""
+        if prompt.over_budget:
+            raise ValueError(
+                f"prompt com {prompt.prompt_tokens} tokens excede a janela do modelo ({prompt.budget} tokens)"
+            )
+    
+    def _use_openai_model(self, prompt: str) -> str:
+        """Usa modelo OpenAI para gerar resposta"""
+        try:
             response = openai.ChatCompletion.create(
                 model="gpt-3.5-turbo",
                 messages=[{"role": "user", "content": prompt}],
@@ -219,24 +318,21 @@ Posso ajudar você com análises sobre:
         except Exception as e:
             return f"Erro ao usar OpenAI: {str(e)}"
     
-    def _use_local_model(self, question: str, context: str) -> str:
-        """Usa modelo local para gerar resposta"""
+    def _use_local_model(self, question: str, packed: PackedPrompt) -> str:
+        """Usa modelo local para gerar resposta (prompt montado por _build_local_prompt)"""
         try:
             if not self.model:
                 return self._generate_rule_based_response(question, None)
             
-            prompt = f"Pergunta sobre vendas: {question}\nContexto: {context}\nResposta:"
+            self._check_local_prompt(packed)
+            prompt = packed.prompt
             
-            response = self.model(
-                prompt,
-                max_length=200,
-                num_return_sequences=1,
-                temperature=self.temperature,
-                do_sample=True,
-                pad_token_id=50256
-            )
+            if self.batcher:
+                generated_text = self.batcher.generate(prompt)
+            else:
+                response = self.model(prompt, **self._local_generation_kwargs())
+                generated_text = response[0]['generated_text']
             
-            generated_text = response[0]['generated_text']
             # Extrai apenas a resposta gerada
             answer = generated_text.split("Resposta:")[-1].strip()
             
@@ -244,33 +340,213 @@ Posso ajudar você com análises sobre:
         except Exception as e:
             return f"Erro no modelo local: {str(e)}"
     
+    def _stream_openai_model(self, prompt: str) -> Iterator[str]:
+        """Usa modelo OpenAI em modo streaming, emitindo os tokens conforme chegam"""
+        response = openai.ChatCompletion.create(
+            model="gpt-3.5-turbo",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            stream=True
+        )
+        for chunk in response:
+            content = chunk.choices[0].delta.get("content")
+            if content:
+                yield content
+    
+    def _stream_local_model(self, packed: PackedPrompt) -> Iterator[str]:
+        """
+        Usa modelo local em modo streaming (geração em thread separada)
+        Um erro na geração encerra o streamer e é relançado aqui; sem tokens
+        por stream_timeout segundos, levanta TimeoutError
+        """
+        self._check_local_prompt(packed)
+        prompt = packed.prompt
+        streamer = TextIteratorStreamer(
+            self.model.tokenizer, skip_prompt=True, skip_special_tokens=True, timeout=self.stream_timeout
+        )
+        errors = []
+        
+        def generate():
+            try:
+                self.model(prompt, **self._local_generation_kwargs(), streamer=streamer)
+            except Exception as e:
+                errors.append(e)
+                # Desbloqueia o consumidor, que relança o erro
+                streamer.end()
+        
+        worker = threading.Thread(target=generate, daemon=True)
+        worker.start()
+        try:
+            for token in streamer:
+                if token:
+                    yield token
+        except queue.Empty:
+            raise TimeoutError(f"modelo local sem resposta por {self.stream_timeout:g}s")
+        worker.join()
+        if errors:
+            raise errors[0]
+    
+    def stream_question(self, question: str, db: Session) -> Iterator[Dict[str, Any]]:
+        """
+        Versão em streaming de process_question
+        Emite primeiro a parte de dados da resposta e depois os tokens do LLM
+        """
+        start = time.perf_counter()
+        try:
+            data_version = crud.get_data_version(db)
+            
+            cache_key = None
+            if ANSWER_CACHE_ENABLED:
+                intent = self._analyze_question_intent(question)
+                cache_key = answer_cache.make_key(question, intent['type'], data_version)
+                cached = answer_cache.get(cache_key)
+                if cached is not None:
+                    yield {'event': 'data', 'text': cached['answer']}
+                    yield {
+                        'event': 'done',
+                        'model_used': cached['model_used'],
+                        'cache_hit': True,
+                        'timings': {'total_ms': round((time.perf_counter() - start) * 1000, 3)}
+                    }
+                    return
+            
+            context_start = time.perf_counter()
+            context, context_build_ms = self._get_database_context(db, data_version)
+            context_ms = (time.perf_counter() - context_start) * 1000
+            
+            prompt_stats = None
+            if not self.use_local_model and OPENAI_AVAILABLE and self.openai_api_key:
+                packed = self._build_openai_prompt(question, context)
+                prompt_stats = packed.stats()
+                tokens = self._stream_openai_model(packed.prompt)
+                model_used = "OpenAI GPT-3.5"
+                error_prefix = "Erro ao usar OpenAI"
+            elif self.model:
+                packed = self._build_local_prompt(question, context)
+                prompt_stats = packed.stats()
+                tokens = self._stream_local_model(packed)
+                model_used = "Modelo Local (DialoGPT)"
+                error_prefix = "Erro no modelo local"
+            else:
+                tokens = None
+                model_used = "Sistema Baseado em Regras"
+            
+            if tokens is None:
+                answer = self._generate_rule_based_response(question, db)
+                yield {'event': 'data', 'text': answer}
+            else:
+                # A tabela de dados do contexto é enviada antes da geração
+                data_table = "\n".join(line.strip() for line in context.strip().splitlines())
+                yield {'event': 'data', 'text': data_table + "\n\n"}
+                
+                parts = []
+                try:
+                    for token in tokens:
+                        parts.append(token)
+                        yield {'event': 'token', 'text': token}
+                    answer = "".join(parts).strip()
+                except Exception as e:
+                    # Mesma resposta de erro do caminho sem streaming (e fora do cache)
+                    answer = f"{error_prefix}: {str(e)}"
+                    yield {'event': 'token', 'text': ("\n\n" if parts else "") + answer}
+            
+            # Erros do modelo não são armazenados no cache
+            if cache_key is not None and answer and not answer.startswith(('Erro', '❌')):
+                answer_cache.set(cache_key, {
+                    'answer': answer,
+                    'model_used': model_used,
+                    'data_source': 'Banco de dados SQLite',
+                    'context_used': len(context) > 0
+                })
+            
+            yield {
+                'event': 'done',
+                'model_used': model_used,
+                'cache_hit': False,
+                'prompt': prompt_stats,
+                'timings': {
+                    'context_ms': round(context_ms, 3),
+                    'context_build_ms': round(context_build_ms, 3),
+                    'total_ms': round((time.perf_counter() - start) * 1000, 3)
+                }
+            }
+        
+        except Exception as e:
+            yield {'event': 'error', 'text': f"❌ Erro ao processar pergunta: {str(e)}"}
+    
     def process_question(self, question: str, db: Session) -> Dict[str, Any]:
         """
         Processa uma pergunta sobre vendas e retorna insights
         """
+        start = time.perf_counter()
         try:
-            # Obtém contexto do banco de dados
-            context = self._get_database_context(db)
+            data_version = crud.get_data_version(db)
+            
+            # Consulta o cache de respostas (pergunta normalizada + intenção + versão dos dados)
+            cache_key = None
+            if ANSWER_CACHE_ENABLED:
+                intent = self._analyze_question_intent(question)
+                cache_key = answer_cache.make_key(question, intent['type'], data_version)
+                cached = answer_cache.get(cache_key)
+                if cached is not None:
+                    cached.update({
+                        'question': question,
+                        'timestamp': datetime.now(),
+                        'cache_hit': True,
+                        'timings': {'total_ms': round((time.perf_counter() - start) * 1000, 3)}
+                    })
+                    return cached
+            
+            # Obtém contexto do banco de dados (pré-computado por versão dos dados);
+            # context_ms é o tempo desta requisição (busca no cache ou construção),
+            # context_build_ms o custo de construção do contexto
+            context_start = time.perf_counter()
+            context, context_build_ms = self._get_database_context(db, data_version)
+            context_ms = (time.perf_counter() - context_start) * 1000
             
             # Escolhe o método de processamento
+            prompt_stats = None
             if not self.use_local_model and OPENAI_AVAILABLE and self.openai_api_key:
-                answer = self._use_openai_model(question, context)
+                packed = self._build_openai_prompt(question, context)
+                prompt_stats = packed.stats()
+                answer = self._use_openai_model(packed.prompt)
                 model_used = "OpenAI GPT-3.5"
             elif self.model:
-                answer = self._use_local_model(question, context)
+                packed = self._build_local_prompt(question, context)
+                prompt_stats = packed.stats()
+                answer = self._use_local_model(question, packed)
                 model_used = "Modelo Local (DialoGPT)"
             else:
                 answer = self._generate_rule_based_response(question, db)
                 model_used = "Sistema Baseado em Regras"
             
-            return {
+            result = {
                 'question': question,
                 'answer': answer,
                 'model_used': model_used,
                 'data_source': 'Banco de dados SQLite',
                 'timestamp': datetime.now(),
-                'context_used': len(context) > 0
+                'context_used': len(context) > 0,
+                'cache_hit': False,
+                'prompt_tokens': prompt_stats['prompt_tokens'] if prompt_stats else None,
+                'timings': {
+                    'context_ms': round(context_ms, 3),
+                    'context_build_ms': round(context_build_ms, 3),
+                    'total_ms': round((time.perf_counter() - start) * 1000, 3)
+                }
             }
+            if prompt_stats:
+                result['timings']['packing_ms'] = prompt_stats['packing_ms']
+            
+            # Erros do modelo não são armazenados no cache
+            if cache_key is not None and not answer.startswith(('Erro', '❌')):
+                answer_cache.set(cache_key, {
+                    key: value for key, value in result.items()
+                    if key not in ('question', 'timestamp', 'cache_hit', 'prompt_tokens', 'timings')
+                })
+            
+            return result
         
         except Exception as e:
             return {
@@ -279,9 +555,24 @@ Posso ajudar você com análises sobre:
                 'model_used': "Sistema de Erro",
                 'data_source': 'N/A',
                 'timestamp': datetime.now(),
-                'context_used': False
+                'context_used': False,
+                'cache_hit': False
             }
 
+    def preload(self, db: Session):
+        """
+        Pré-carrega o tokenizador e o contexto do banco para a versão atual
+        dos dados (chamado pelo processo mestre do servidor pré-forkado antes do fork)
+        """
+        load_tokenizer()
+        self._get_database_context(db)
+
+    def get_inference_stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas de vazão do micro-batching do modelo local"""
+        if not self.batcher:
+            return {'batching_active': False}
+        return {'batching_active': True, **self.batcher.stats()}
+
 # Instância global do agente
 sales_ai_agent = SalesInsightsAI()
 
@@ -0,0 +1,468 @@
+"""
+Registro de consultas analíticas parametrizadas
+
+Cada consulta é uma construção SQLAlchemy Core criada uma única vez na
+importação, com parâmetros vinculados para a janela (dias e instantes em
+segundos, comparados às colunas inteiras sale_day e sale_epoch) e para o
+limite de linhas. Como a estrutura do
+statement nunca muda, o cache de compilação do engine é reutilizado em todas
+as execuções. As conversões de data usam as expressões de app.sql_time, então
+as consultas compilam para SQLite e PostgreSQL.
+"""
+import math
+from datetime import datetime, time, timedelta
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple, Any
+
+from sqlalchemy import Float, Integer, and_, bindparam, case, desc, distinct, func, literal, select, type_coerce
+from sqlalchemy.engine import Dialect
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from app import models
+from app.sql_time import epoch_date
+
+sales = models.Sale.__table__
+products = models.Product.__table__
+customers = models.Customer.__table__
+customer_stats = models.CustomerStats.__table__
+
+# Parâmetros vinculados compartilhados pelas consultas (dias e segundos, como sale_day/sale_epoch)
+START_DAY = bindparam("start_day", type_=Integer)
+END_DAY = bindparam("end_day", type_=Integer)
+START_EPOCH = bindparam("start_epoch", type_=Integer)
+END_EPOCH = bindparam("end_epoch", type_=Integer)
+RECENT_START_EPOCH = bindparam("recent_start_epoch", type_=Integer)
+LIMIT = bindparam("limit", type_=Integer)
+DAYS = bindparam("days", type_=Float)
+
+# Janela padrão das análises e subjanela "recente" (última semana)
+DEFAULT_WINDOW_DAYS = 30
+RECENT_WINDOW_DAYS = 7
+
+EPOCH = datetime(1970, 1, 1)
+
+def epoch_seconds(value: datetime) -> int:
+    """Segundos inteiros desde 1970-01-01 de um datetime sem fuso (a conta de sale_epoch)"""
+    return math.floor((value - EPOCH).total_seconds())
+
+def _as_float(expression):
+    """Lê médias e razões como float, sem conversão para Decimal"""
+    return type_coerce(expression, Float)
+
+def _reais(cents):
+    """Valor (ou agregado) em centavos convertido para reais no próprio SQL"""
+    return cents / 100.0
+
+def _money(cents):
+    """Agregado exato em centavos inteiros, convertido para reais (float) só na saída"""
+    return type_coerce(_reais(cents), Float)
+
+def _in_window(table):
+    """
+    Filtro de período [start, end) sobre sale_epoch
+
+    A faixa de dias (prefixo do índice ix_sales_sale_day_covering) delimita a
+    leitura do índice; sale_epoch, também no índice, recorta os dias das pontas.
+    """
+    return and_(
+        table.c.sale_day >= START_DAY, table.c.sale_day <= END_DAY,
+        table.c.sale_epoch >= START_EPOCH, table.c.sale_epoch < END_EPOCH
+    )
+
+def in_sale_period(start: datetime, end: datetime, include_end: bool = False):
+    """Filtro de sales em [start, end) (ou [start, end] com include_end) pela faixa do índice"""
+    start_epoch, end_epoch = epoch_seconds(start), epoch_seconds(end)
+    return and_(
+        sales.c.sale_day >= start_epoch // 86400, sales.c.sale_day <= end_epoch // 86400,
+        sales.c.sale_epoch >= start_epoch,
+        sales.c.sale_epoch <= end_epoch if include_end else sales.c.sale_epoch < end_epoch
+    )
+
+def _share_of_window(group_revenue):
+    """
+    Percentual da receita do grupo sobre a receita total da janela
+
+    O total vem de SUM(...) OVER () sobre os grupos já agregados, em vez de
+    uma subconsulta que relê a tabela sales.
+    """
+    return func.round(group_revenue * 100.0 / func.sum(group_revenue).over(), 2)
+
+def _build_top_products() -> Select:
+    """Produtos mais vendidos (quantidade) no período"""
+    return (
+        select(
+            products.c.id,
+            products.c.name,
+            products.c.sku,
+            products.c.category,
+            _money(products.c.price_cents).label("price"),
+            func.sum(sales.c.quantity).label("total_quantity"),
+            _money(func.sum(sales.c.total_amount_cents)).label("total_revenue"),
+            func.count(sales.c.id).label("total_orders")
+        )
+        .select_from(products.join(sales, products.c.id == sales.c.product_id))
+        .where(_in_window(sales))
+        .group_by(products.c.id)
+        .order_by(desc("total_quantity"), products.c.id)
+        .limit(LIMIT)
+    )
+
+def _build_top_products_detailed() -> Select:
+    """Desempenho detalhado dos produtos (agente profissional)"""
+    revenue = func.sum(sales.c.total_amount_cents)
+    unique_customers = func.count(distinct(sales.c.customer_id))
+    return (
+        select(
+            products.c.name.label("product_name"),
+            products.c.sku,
+            products.c.category,
+            _money(products.c.price_cents).label("unit_price"),
+            func.sum(sales.c.quantity).label("total_quantity_sold"),
+            _money(revenue).label("total_revenue"),
+            func.count(sales.c.id).label("total_orders"),
+            _as_float(func.avg(sales.c.quantity)).label("avg_quantity_per_order"),
+            _money(func.avg(sales.c.total_amount_cents)).label("avg_order_value"),
+            func.min(sales.c.sale_date).label("first_sale_date"),
+            func.max(sales.c.sale_date).label("last_sale_date"),
+            _as_float(_share_of_window(revenue)).label("revenue_percentage"),
+            unique_customers.label("unique_customers"),
+            _as_float(func.round(_reais(revenue) / unique_customers, 2)).label("revenue_per_customer")
+        )
+        .select_from(products.join(sales, products.c.id == sales.c.product_id))
+        .where(_in_window(sales))
+        .group_by(products.c.id, products.c.name, products.c.sku, products.c.category, products.c.price_cents)
+        .order_by(desc("total_quantity_sold"), products.c.id)
+        .limit(LIMIT)
+    )
+
+def _build_executive_summary() -> Select:
+    """
+    Resumo executivo do período (agente profissional)
+
+    As vendas da janela são lidas uma única vez em uma CTE materializada; o
+    produto e o cliente de destaque saem de rankings sobre a CTE e os números
+    da última semana de agregações condicionais, sem reler a tabela sales.
+    """
+    window_sales = (
+        select(
+            sales.c.id,
+            sales.c.product_id,
+            sales.c.customer_id,
+            sales.c.quantity,
+            sales.c.total_amount_cents,
+            sales.c.sale_epoch
+        )
+        .where(_in_window(sales))
+        .cte("window_sales")
+        # Só SQLite (3.35+) e PostgreSQL (12+) aceitam a dica; os demais dialetos a omitem
+        .prefix_with("MATERIALIZED", dialect="sqlite")
+        .prefix_with("MATERIALIZED", dialect="postgresql")
+    )
+    is_recent = window_sales.c.sale_epoch >= RECENT_START_EPOCH
+
+    top_product = (
+        select(products.c.name)
+        .select_from(window_sales.join(products, products.c.id == window_sales.c.product_id))
+        .group_by(products.c.id)
+        .order_by(desc(func.sum(window_sales.c.quantity)))
+        .limit(1)
+        .scalar_subquery()
+    )
+    top_customer = (
+        select(customers.c.name)
+        .select_from(window_sales.join(customers, customers.c.id == window_sales.c.customer_id))
+        .group_by(customers.c.id)
+        .order_by(desc(func.sum(window_sales.c.total_amount_cents)))
+        .limit(1)
+        .scalar_subquery()
+    )
+
+    return (
+        select(
+            func.count(distinct(window_sales.c.id)).label("total_transactions"),
+            _money(func.sum(window_sales.c.total_amount_cents)).label("total_revenue"),
+            func.count(distinct(products.c.id)).label("products_sold"),
+            func.count(distinct(customers.c.id)).label("active_customers"),
+            _money(func.avg(window_sales.c.total_amount_cents)).label("average_order_value"),
+            func.sum(window_sales.c.quantity).label("total_items_sold"),
+            _money(func.max(window_sales.c.total_amount_cents)).label("highest_sale"),
+            _money(func.min(window_sales.c.total_amount_cents)).label("lowest_sale"),
+            _as_float(func.round(func.avg(window_sales.c.quantity), 2)).label("avg_items_per_sale"),
+            _as_float(func.round(
+                _reais(func.sum(window_sales.c.total_amount_cents)) / func.count(distinct(customers.c.id)), 2
+            )).label("revenue_per_customer"),
+            top_product.label("top_product_by_quantity"),
+            top_customer.label("top_customer"),
+            func.count(case((is_recent, window_sales.c.id))).label("sales_last_week"),
+            _money(func.sum(case((is_recent, window_sales.c.total_amount_cents)))).label("revenue_last_week")
+        )
+        .select_from(
+            window_sales.join(products, window_sales.c.product_id == products.c.id)
+            .join(customers, window_sales.c.customer_id == customers.c.id)
+        )
+    )
+
+def _build_customer_ranking() -> Select:
+    """Ranking e segmentação de clientes (agente profissional)"""
+    spent = func.sum(sales.c.total_amount_cents)
+    return (
+        select(
+            customers.c.name.label("customer_name"),
+            customers.c.email.label("customer_email"),
+            func.count(sales.c.id).label("total_purchases"),
+            _money(spent).label("total_spent"),
+            _money(func.avg(sales.c.total_amount_cents)).label("average_order_value"),
+            func.sum(sales.c.quantity).label("total_items_purchased"),
+            func.min(sales.c.sale_date).label("first_purchase_date"),
+            func.max(sales.c.sale_date).label("last_purchase_date"),
+            _as_float(_share_of_window(spent)).label("revenue_contribution_percentage"),
+            func.count(distinct(sales.c.product_id)).label("unique_products_purchased")
+        )
+        .select_from(customers.join(sales, customers.c.id == sales.c.customer_id))
+        .where(_in_window(sales))
+        .group_by(customers.c.id, customers.c.name, customers.c.email)
+        .order_by(desc("total_spent"), customers.c.id)
+        .limit(LIMIT)
+    )
+
+def _build_customer_stats_ranking() -> Select:
+    """
+    Ranking RFM de clientes lido de customer_stats (agente profissional)
+
+    Leitura top-N pelo índice ix_customer_stats_ranking; a participação na
+    receita usa a soma da própria tabela de agregados, sem reler as vendas.
+    """
+    spent = customer_stats.c.total_spent_cents
+    total_spent = select(func.sum(spent)).scalar_subquery()
+    return (
+        select(
+            customers.c.name.label("customer_name"),
+            customers.c.email.label("customer_email"),
+            customer_stats.c.total_purchases,
+            _money(spent).label("total_spent"),
+            _as_float(_reais(spent) / customer_stats.c.total_purchases).label("average_order_value"),
+            customer_stats.c.total_items.label("total_items_purchased"),
+            customer_stats.c.first_purchase_date,
+            customer_stats.c.last_purchase_date,
+            _as_float(func.round(spent * 100.0 / total_spent, 2)).label("revenue_contribution_percentage"),
+            customer_stats.c.unique_products.label("unique_products_purchased")
+        )
+        .select_from(customer_stats.join(customers, customers.c.id == customer_stats.c.customer_id))
+        .order_by(spent.desc(), customer_stats.c.customer_id)
+        .limit(LIMIT)
+    )
+
+def _build_daily_trend() -> Select:
+    """
+    Série diária de transações e receita (agente profissional)
+
+    Agrupa pelo inteiro sale_day; a data em texto é montada só uma vez por dia.
+    """
+    return (
+        select(
+            epoch_date(sales.c.sale_day * 86400).label("sale_date"),
+            func.count(sales.c.id).label("daily_transactions"),
+            _money(func.sum(sales.c.total_amount_cents)).label("daily_revenue"),
+            func.sum(sales.c.quantity).label("daily_items_sold"),
+            _money(func.avg(sales.c.total_amount_cents)).label("daily_avg_order_value"),
+            func.count(distinct(sales.c.customer_id)).label("daily_unique_customers"),
+            func.count(distinct(sales.c.product_id)).label("daily_unique_products")
+        )
+        .where(_in_window(sales))
+        .group_by(sales.c.sale_day)
+        .order_by(sales.c.sale_day.desc())
+        .limit(LIMIT)
+    )
+
+def _build_period_overview() -> Select:
+    """Análise geral do período (consulta padrão do agente profissional)"""
+    return (
+        select(
+            literal("Comprehensive Sales Analysis").label("analysis_type"),
+            func.count(sales.c.id).label("total_sales"),
+            _money(func.sum(sales.c.total_amount_cents)).label("total_revenue"),
+            _money(func.avg(sales.c.total_amount_cents)).label("average_order_value"),
+            func.count(distinct(sales.c.product_id)).label("products_in_sales"),
+            func.count(distinct(sales.c.customer_id)).label("active_customers"),
+            func.sum(sales.c.quantity).label("total_items"),
+            _money(func.max(sales.c.total_amount_cents)).label("peak_sale_value"),
+            _money(func.min(sales.c.total_amount_cents)).label("minimum_sale_value"),
+            _as_float(func.round(_reais(func.sum(sales.c.total_amount_cents)) / DAYS, 2)).label("daily_average_revenue"),
+            _as_float(func.round(func.count(sales.c.id) / DAYS, 2)).label("daily_average_transactions")
+        )
+        .where(_in_window(sales))
+    )
+
+def _build_period_totals() -> Select:
+    """Total de vendas e receita do período"""
+    return (
+        select(
+            func.count(sales.c.id).label("total_sales"),
+            _money(func.sum(sales.c.total_amount_cents)).label("total_revenue")
+        )
+        .where(_in_window(sales))
+    )
+
+def _build_sales_overview() -> Select:
+    """Resumo de todas as vendas registradas (sem filtro de período)"""
+    return (
+        select(
+            func.count(distinct(sales.c.id)).label("total_sales"),
+            _money(func.sum(sales.c.total_amount_cents)).label("total_revenue"),
+            func.count(distinct(products.c.id)).label("products_sold"),
+            func.count(distinct(customers.c.id)).label("active_customers"),
+            _money(func.avg(sales.c.total_amount_cents)).label("average_order_value")
+        )
+        .select_from(
+            sales.join(products, sales.c.product_id == products.c.id)
+            .join(customers, sales.c.customer_id == customers.c.id)
+        )
+    )
+
+def _build_catalog_summary() -> Select:
+    """Totais gerais de vendas, receita, produtos e clientes em uma única consulta"""
+    return select(
+        select(func.count(sales.c.id)).scalar_subquery().label("total_sales"),
+        _money(select(func.sum(sales.c.total_amount_cents)).scalar_subquery()).label("total_revenue"),
+        select(func.count(products.c.id)).scalar_subquery().label("total_products"),
+        select(func.count(customers.c.id)).scalar_subquery().label("total_customers")
+    )
+
+def _days_since(column: str, label: str) -> Callable[[Dict[str, Any], Dict[str, Any]], None]:
+    """Calcula em Python os dias desde a data da coluna até o fim da janela"""
+    def postprocess(row: Dict[str, Any], params: Dict[str, Any]):
+        value = row.get(column)
+        row[label] = (params["end_date"] - value).total_seconds() / 86400 if value else None
+    return postprocess
+
+def _period_metadata(row: Dict[str, Any], params: Dict[str, Any]):
+    """Acrescenta a data e o período da análise"""
+    row["analysis_date"] = params["end_date"].date().isoformat()
+    row["analysis_period"] = f"Last {int(params['days'])} days"
+
+class AnalyticsQuery:
+    """
+    Consulta analítica registrada: statement Core, limite padrão e pós-processamento
+    """
+
+    def __init__(
+        self,
+        name: str,
+        statement: Select,
+        default_limit: Optional[int] = None,
+        postprocess: Optional[Callable[[Dict[str, Any], Dict[str, Any]], None]] = None
+    ):
+        self.name = name
+        self.statement = statement
+        self.default_limit = default_limit
+        self.postprocess = postprocess
+
+# Registro global das consultas analíticas
+ANALYTICS_QUERIES: Dict[str, AnalyticsQuery] = {
+    query.name: query for query in [
+        AnalyticsQuery("top_products", _build_top_products(), default_limit=5),
+        AnalyticsQuery(
+            "top_products_detailed", _build_top_products_detailed(), default_limit=10,
+            postprocess=_days_since("last_sale_date", "days_since_last_sale")
+        ),
+        AnalyticsQuery("executive_summary", _build_executive_summary()),
+        AnalyticsQuery(
+            "customer_ranking", _build_customer_ranking(), default_limit=15,
+            postprocess=_days_since("last_purchase_date", "days_since_last_purchase")
+        ),
+        AnalyticsQuery(
+            "customer_stats_ranking", _build_customer_stats_ranking(), default_limit=15,
+            postprocess=_days_since("last_purchase_date", "days_since_last_purchase")
+        ),
+        AnalyticsQuery("daily_trend", _build_daily_trend(), default_limit=30),
+        AnalyticsQuery("period_overview", _build_period_overview(), postprocess=_period_metadata),
+        AnalyticsQuery("period_totals", _build_period_totals()),
+        AnalyticsQuery("sales_overview", _build_sales_overview()),
+        AnalyticsQuery("catalog_summary", _build_catalog_summary())
+    ]
+}
+
+# Caminhos rápidos (fora do SQL) registrados para consultas do registro
+_FAST_PATHS: Dict[str, Callable[..., Optional[List[Dict[str, Any]]]]] = {}
+
+def register_fast_path(name: str, handler: Callable[..., Optional[List[Dict[str, Any]]]]):
+    """
+    Registra um caminho rápido para a consulta `name`
+
+    O handler recebe a sessão e os parâmetros de janela de run_analytics_query
+    e retorna as linhas, ou None quando não atende a janela (executa o SQL).
+    """
+    _FAST_PATHS[name] = handler
+
+def analytics_window(days: int = DEFAULT_WINDOW_DAYS, end_date: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    """
+    Janela [início, fim) das análises
+    O início é a meia-noite de `days` dias antes do fim (como date('now', '-N days'))
+    """
+    end_date = end_date or datetime.now()
+    start_date = datetime.combine(end_date.date() - timedelta(days=days), time.min)
+    return start_date, end_date
+
+def build_params(
+    name: str,
+    days: int = DEFAULT_WINDOW_DAYS,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    limit: Optional[int] = None
+) -> Dict[str, Any]:
+    """Monta os parâmetros vinculados de uma consulta do registro"""
+    window_start, end_date = analytics_window(days, end_date)
+    start_date = start_date or window_start
+    query = ANALYTICS_QUERIES[name]
+    # A subjanela recente fica sempre contida na janela principal
+    recent_start = max(start_date, analytics_window(RECENT_WINDOW_DAYS, end_date)[0])
+    start_epoch = epoch_seconds(start_date)
+    # Fim arredondado para cima: inclui as vendas do último segundo parcial
+    end_epoch = math.ceil((end_date - EPOCH).total_seconds())
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "recent_start": recent_start,
+        "start_day": start_epoch // 86400,
+        "end_day": end_epoch // 86400,
+        "start_epoch": start_epoch,
+        "end_epoch": end_epoch,
+        "recent_start_epoch": epoch_seconds(recent_start),
+        "limit": limit or query.default_limit,
+        "days": float(days)
+    }
+
+def run_analytics_query(db: Session, name: str, **window: Any) -> List[Dict[str, Any]]:
+    """
+    Executa uma consulta do registro e retorna as linhas como dicionários
+
+    Args:
+        db: Sessão do banco
+        name: Nome da consulta no registro
+        window: days, start_date, end_date e/ou limit
+    """
+    fast_path = _FAST_PATHS.get(name)
+    if fast_path is not None:
+        rows = fast_path(db, **window)
+        if rows is not None:
+            return rows
+
+    query = ANALYTICS_QUERIES[name]
+    params = build_params(name, **window)
+    rows = [dict(row) for row in db.execute(query.statement, params).mappings()]
+    if query.postprocess:
+        for row in rows:
+            query.postprocess(row, params)
+    return rows
+
+@lru_cache(maxsize=None)
+def _compiled_sql(name: str, dialect: Dialect) -> str:
+    return str(ANALYTICS_QUERIES[name].statement.compile(dialect=dialect))
+
+def compiled_sql(name: str, dialect: Optional[Dialect] = None) -> str:
+    """Texto SQL da consulta compilado para o dialeto (compilado uma vez e memorizado)"""
+    if dialect is None:
+        from app.database import engine
+        dialect = engine.dialect
+    return _compiled_sql(name, dialect)
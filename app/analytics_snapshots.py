@@ -0,0 +1,270 @@
+"""
+Snapshots agendados das consultas analíticas do agente profissional
+
+O agente profissional recalculava a análise de produtos, o resumo executivo,
+o ranking de clientes dos últimos 30 dias, a tendência diária e a visão
+geral a partir das vendas a cada pergunta. Um agendador (thread no processo
+ou CLI) atualiza os cinco resultados em uma tabela de snapshots a cada
+intervalo ou quando a versão dos dados muda; as perguntas leem o snapshot
+enquanto ele for mais recente que o limite de defasagem e, caso contrário,
+executam a consulta ao vivo. O ranking de clientes de todo o histórico não
+entra: é uma leitura indexada da tabela customer_stats, sempre atualizada.
+
+Uso (fora do processo da API):
+    python -m app.analytics_snapshots [--once] [--interval 300]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Any
+
+from app import crud
+from app.analytics_queries import run_analytics_query
+from app.answer_cache import ANSWER_CACHE_PATH
+from app.database import SessionLocal
+
+# Configurações dos snapshots
+ANALYTICS_SNAPSHOTS_ENABLED = os.getenv("ANALYTICS_SNAPSHOTS_ENABLED", "True").lower() == "true"
+ANALYTICS_SNAPSHOT_PATH = os.getenv("ANALYTICS_SNAPSHOT_PATH", ANSWER_CACHE_PATH)
+ANALYTICS_SNAPSHOT_INTERVAL = int(os.getenv("ANALYTICS_SNAPSHOT_INTERVAL", "300"))
+ANALYTICS_SNAPSHOT_POLL_SECONDS = int(os.getenv("ANALYTICS_SNAPSHOT_POLL_SECONDS", "10"))
+ANALYTICS_SNAPSHOT_MAX_STALENESS = int(os.getenv("ANALYTICS_SNAPSHOT_MAX_STALENESS", "600"))
+ANALYTICS_SNAPSHOT_SCHEDULER = os.getenv("ANALYTICS_SNAPSHOT_SCHEDULER", "True").lower() == "true"
+
+# Consultas do registro com snapshot (análises do agente profissional que agregam as vendas)
+SNAPSHOT_QUERIES = (
+    "top_products_detailed",
+    "executive_summary",
+    "customer_ranking",
+    "daily_trend",
+    "period_overview"
+)
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    return str(value)
+
+def _decode(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1 and "$datetime" in obj:
+        return datetime.fromisoformat(obj["$datetime"])
+    return obj
+
+class AnalyticsSnapshotStore:
+    """
+    Resultados das consultas analíticas em SQLite, um snapshot por consulta
+    """
+
+    def __init__(self, path: Optional[str] = None, max_staleness: Optional[int] = None):
+        self.path = path or ANALYTICS_SNAPSHOT_PATH
+        self.max_staleness = max_staleness or ANALYTICS_SNAPSHOT_MAX_STALENESS
+        self.hits = 0
+        self.stale = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.last_error: Optional[str] = None
+        self._connect()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._connect)
+
+    def _connect(self):
+        """Abre a conexão com o SQLite e cria a tabela de snapshots"""
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS analytics_snapshots (
+                query_name TEXT PRIMARY KEY,
+                data_version TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                row_count INTEGER NOT NULL,
+                refresh_ms REAL NOT NULL,
+                refreshed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def refresh(self, db, names: Iterable[str] = SNAPSHOT_QUERIES,
+                data_version: Optional[str] = None) -> Dict[str, float]:
+        """
+        Recalcula e grava os snapshots das consultas
+
+        Returns:
+            Dict: Tempo de atualização (ms) por consulta
+        """
+        data_version = data_version or crud.get_data_version(db)
+        timings = {}
+        for name in names:
+            start = time.perf_counter()
+            rows = run_analytics_query(db, name)
+            refresh_ms = (time.perf_counter() - start) * 1000
+            payload = json.dumps(rows, default=_encode, ensure_ascii=False)
+
+            with self._lock:
+                self._conn.execute(
+                    """
+                    INSERT OR REPLACE INTO analytics_snapshots
+                        (query_name, data_version, payload, row_count, refresh_ms, refreshed_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    (name, data_version, payload, len(rows), refresh_ms, time.time())
+                )
+                self._conn.commit()
+            timings[name] = round(refresh_ms, 3)
+
+        self.refreshes += 1
+        return timings
+
+    def get(self, name: str, max_staleness: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Busca o snapshot da consulta se estiver dentro do limite de defasagem
+
+        Returns:
+            Dict com 'rows', 'data_version' e 'age_seconds', ou None
+        """
+        max_staleness = max_staleness or self.max_staleness
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, data_version, refreshed_at FROM analytics_snapshots WHERE query_name = ?",
+                (name,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            payload, data_version, refreshed_at = row
+            age = time.time() - refreshed_at
+            if age > max_staleness:
+                self.stale += 1
+                return None
+            self.hits += 1
+
+        return {
+            'rows': json.loads(payload, object_hook=_decode),
+            'data_version': data_version,
+            'age_seconds': round(age, 1)
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Idade e tempo de atualização de cada snapshot, além dos acertos"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT query_name, data_version, row_count, refresh_ms, refreshed_at "
+                "FROM analytics_snapshots ORDER BY query_name"
+            ).fetchall()
+        now = time.time()
+        return {
+            'enabled': ANALYTICS_SNAPSHOTS_ENABLED,
+            'max_staleness_seconds': self.max_staleness,
+            'hits': self.hits,
+            'stale': self.stale,
+            'misses': self.misses,
+            'refreshes': self.refreshes,
+            'last_error': self.last_error,
+            'snapshots': {
+                name: {
+                    'data_version': data_version,
+                    'row_count': row_count,
+                    'refresh_ms': round(refresh_ms, 3),
+                    'refreshed_at': datetime.fromtimestamp(refreshed_at).isoformat(),
+                    'age_seconds': round(now - refreshed_at, 1)
+                }
+                for name, data_version, row_count, refresh_ms, refreshed_at in rows
+            }
+        }
+
+# Instância global dos snapshots
+analytics_snapshots = AnalyticsSnapshotStore()
+
+class SnapshotScheduler:
+    """
+    Atualiza os snapshots a cada intervalo ou quando a versão dos dados muda
+    """
+
+    def __init__(self, store: AnalyticsSnapshotStore = analytics_snapshots,
+                 interval: Optional[int] = None, poll_seconds: Optional[int] = None):
+        self.store = store
+        self.interval = interval or ANALYTICS_SNAPSHOT_INTERVAL
+        self.poll_seconds = poll_seconds or ANALYTICS_SNAPSHOT_POLL_SECONDS
+        self.last_version: Optional[str] = None
+        self.last_refresh = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self, force: bool = False) -> Optional[Dict[str, float]]:
+        """Atualiza os snapshots se a versão mudou ou o intervalo venceu"""
+        try:
+            with SessionLocal() as db:
+                version = crud.get_data_version(db)
+                due = time.monotonic() - self.last_refresh >= self.interval
+                if not (force or due or version != self.last_version):
+                    return None
+
+                timings = self.store.refresh(db, data_version=version)
+            self.last_version = version
+            self.last_refresh = time.monotonic()
+            self.store.last_error = None
+            return timings
+        except Exception as e:
+            self.store.last_error = str(e)
+            print(f"❌ Erro ao atualizar snapshots analíticos: {e}")
+            return None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.poll_seconds)
+
+    def start(self):
+        """Inicia a thread do agendador (idempotente)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="analytics-snapshots", daemon=True)
+        self._thread.start()
+        print(f"✅ Snapshots analíticos: atualização a cada {self.interval}s ou por nova versão dos dados")
+
+    def stop(self):
+        """Encerra a thread do agendador"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+# Agendador global (iniciado pela API quando ANALYTICS_SNAPSHOT_SCHEDULER=True)
+snapshot_scheduler = SnapshotScheduler()
+
+def main():
+    parser = argparse.ArgumentParser(description="Atualiza os snapshots analíticos")
+    parser.add_argument("--once", action="store_true", help="Atualiza uma vez e encerra")
+    parser.add_argument("--interval", type=int, default=ANALYTICS_SNAPSHOT_INTERVAL,
+                        help="Segundos entre atualizações completas")
+    args = parser.parse_args()
+
+    scheduler = SnapshotScheduler(interval=args.interval)
+    if args.once:
+        print(json.dumps(scheduler.run_once(force=True), indent=2))
+        return
+
+    print(f"🔄 Atualizando snapshots a cada {scheduler.interval}s (Ctrl+C para encerrar)")
+    try:
+        while True:
+            timings = scheduler.run_once()
+            if timings:
+                print(f"✅ Snapshots atualizados ({scheduler.last_version}): {timings}")
+            time.sleep(scheduler.poll_seconds)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Cache persistente de respostas do endpoint /sales-insights
+
+Armazena em SQLite local as respostas já geradas, indexadas pela pergunta
+normalizada, pela intenção detectada e pela versão dos dados de vendas.
+Perguntas repetidas são respondidas sem recalcular contexto nem chamar o LLM.
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, Optional, Any
+
+from app.intent_router import normalize_text
+
+# Configurações do cache
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "True").lower() == "true"
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", "./answer_cache.db")
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+def normalize_question(question: str) -> str:
+    """Normaliza a pergunta (minúsculas, sem acentos, pontuação e espaços repetidos)"""
+    question = _PUNCTUATION_RE.sub(" ", normalize_text(question))
+    return _WHITESPACE_RE.sub(" ", question).strip()
+
+class AnswerCache:
+    """
+    Cache de respostas em SQLite com despejo por uso menos recente (LRU)
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: Optional[int] = None):
+        self.path = path or ANSWER_CACHE_PATH
+        self.max_entries = max_entries or ANSWER_CACHE_MAX_ENTRIES
+        self.hits = 0
+        self.misses = 0
+        self._connect()
+        # Conexões SQLite não devem atravessar um fork (servidor pré-forkado)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._connect)
+
+    def _connect(self):
+        """Abre a conexão com o SQLite e cria as tabelas"""
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS answers (
+                cache_key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_answers_last_access ON answers (last_access)"
+        )
+        self._conn.commit()
+
+    def make_key(self, question: str, intent: str, data_version: str) -> str:
+        """Gera a chave do cache a partir da pergunta, intenção e versão dos dados"""
+        raw = f"{normalize_question(question)}|{intent}|{data_version}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Busca uma resposta no cache, atualizando o último acesso"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM answers WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE answers SET last_access = ? WHERE cache_key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, payload: Dict[str, Any]):
+        """Armazena uma resposta e despeja as entradas mais antigas acima do limite"""
+        now = time.time()
+        data = json.dumps(payload, default=str, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers (cache_key, payload, created_at, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                (key, data, now, now)
+            )
+            self._conn.execute(
+                """
+                DELETE FROM answers WHERE cache_key IN (
+                    SELECT cache_key FROM answers
+                    ORDER BY last_access DESC
+                    LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def clear(self):
+        """Remove todas as respostas do cache"""
+        with self._lock:
+            self._conn.execute("DELETE FROM answers")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas de uso do cache"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        return {
+            'enabled': ANSWER_CACHE_ENABLED,
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+# Instância global do cache de respostas
+answer_cache = AnswerCache()
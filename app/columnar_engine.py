@@ -0,0 +1,403 @@
+"""
+Motor analítico colunar em memória (NumPy) para a tabela de vendas
+
+Opcional (COLUMNAR_ENGINE_ENABLED). Mantém a tabela fato `sales` como
+colunas NumPy: data/hora em microssegundos e dia (int64, desde a época),
+ids e quantidade (int32) e valor em centavos (int64). As linhas ficam
+ordenadas por data, de modo que uma janela é uma fatia obtida por busca
+binária; vendas novas (por id) entram em um bloco de cauda que é incorporado
+e reordenado quando cresce. Os agregados de produtos, ranking de clientes e
+tendência diária são calculados de forma vetorizada (bincount/unique) e
+atendem as consultas do registro analítico pelo caminho rápido.
+
+Os resultados são validados contra o SQL com `validate_against_sql`
+(ver benchmarks/bench_columnar_engine.py).
+"""
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Any
+
+import numpy as np
+from sqlalchemy import String, func, select, type_coerce
+from sqlalchemy.orm import Session
+
+from app import models
+from app.analytics_queries import ANALYTICS_QUERIES, build_params, register_fast_path
+from app.top_products_tracker import TOP_PRODUCTS_TRACKER_ENABLED
+
+# Configurações do motor colunar
+COLUMNAR_ENGINE_ENABLED = os.getenv("COLUMNAR_ENGINE_ENABLED", "False").lower() == "true"
+COLUMNAR_REFRESH_SECONDS = float(os.getenv("COLUMNAR_REFRESH_SECONDS", "1"))
+COLUMNAR_LOAD_CHUNK = int(os.getenv("COLUMNAR_LOAD_CHUNK", "200000"))
+COLUMNAR_TAIL_RATIO = float(os.getenv("COLUMNAR_TAIL_RATIO", "0.05"))
+
+sales = models.Sale.__table__
+products = models.Product.__table__
+customers = models.Customer.__table__
+
+US_PER_DAY = 86_400_000_000
+# Tamanho máximo (dias x ids) do mapa de bits das contagens distintas; acima, np.unique
+DISTINCT_BITMAP_MAX = 64_000_000
+EPOCH = datetime(1970, 1, 1)
+
+COLUMN_TYPES = {
+    'ts': np.int64,
+    'day': np.int64,
+    'product_id': np.int32,
+    'customer_id': np.int32,
+    'quantity': np.int32,
+    'cents': np.int64
+}
+
+Columns = Dict[str, np.ndarray]
+
+def _empty() -> Columns:
+    return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMN_TYPES.items()}
+
+def _concat(*blocks: Columns) -> Columns:
+    return {name: np.concatenate([block[name] for block in blocks]) for name in COLUMN_TYPES}
+
+def _to_us(value: datetime) -> int:
+    return int(np.datetime64(value, "us").astype(np.int64))
+
+def _from_us(value: int) -> datetime:
+    return EPOCH + timedelta(microseconds=int(value))
+
+def _money(cents: float) -> float:
+    return round(cents / 100, 2)
+
+class ColumnarSalesEngine:
+    """
+    Colunas NumPy da tabela de vendas, ordenadas por data, com atualização incremental
+    """
+
+    def __init__(self, chunk_size: Optional[int] = None, tail_ratio: Optional[float] = None):
+        self.chunk_size = chunk_size or COLUMNAR_LOAD_CHUNK
+        self.tail_ratio = tail_ratio or COLUMNAR_TAIL_RATIO
+        self.loaded = False
+        self.load_ms = 0.0
+        self.refreshes = 0
+        self.merges = 0
+        self.queries = 0
+        self._query_seconds = 0.0
+        self._lock = threading.Lock()
+        # Serializa carga e refresh (leitura do maior id, _fetch e acréscimo à
+        # cauda); as consultas só usam _lock e não esperam pelo banco
+        self._refresh_lock = threading.RLock()
+        self._main: Columns = _empty()
+        self._tail: Columns = _empty()
+        self._last_sale_id = 0
+        self._last_refresh = 0.0
+
+    def _fetch(self, db: Session, after_id: int) -> Columns:
+        """Lê as vendas com id > after_id em blocos, direto para colunas"""
+        statement = (
+            select(
+                sales.c.id,
+                sales.c.product_id,
+                sales.c.customer_id,
+                sales.c.quantity,
+                sales.c.total_amount_cents,
+                # Sem conversão linha a linha para datetime: o NumPy interpreta o texto
+                type_coerce(sales.c.sale_date, String)
+            )
+            .order_by(sales.c.id)
+            .limit(self.chunk_size)
+        )
+
+        blocks = []
+        while True:
+            rows = db.execute(statement.where(sales.c.id > after_id)).all()
+            if not rows:
+                break
+            ids, product_ids, customer_ids, quantities, cents, sale_dates = zip(*rows)
+            ts = np.array(sale_dates, dtype="datetime64[us]").astype(np.int64)
+            blocks.append({
+                'ts': ts,
+                'day': ts // US_PER_DAY,
+                'product_id': np.array(product_ids, dtype=np.int32),
+                'customer_id': np.array(customer_ids, dtype=np.int32),
+                'quantity': np.array(quantities, dtype=np.int32),
+                'cents': np.array(cents, dtype=np.int64)
+            })
+            after_id = ids[-1]
+            self._last_sale_id = max(self._last_sale_id, after_id)
+            if len(rows) < self.chunk_size:
+                break
+        return _concat(*blocks) if blocks else _empty()
+
+    @staticmethod
+    def _sorted(columns: Columns) -> Columns:
+        order = np.argsort(columns['ts'], kind="stable")
+        return {name: values[order] for name, values in columns.items()}
+
+    def load(self, db: Session):
+        """Carrega toda a tabela de vendas"""
+        start = time.perf_counter()
+        with self._refresh_lock:
+            self._last_sale_id = 0
+            columns = self._sorted(self._fetch(db, 0))
+            with self._lock:
+                self._main, self._tail = columns, _empty()
+                self._last_refresh = time.monotonic()
+                self.loaded = True
+        self.load_ms = (time.perf_counter() - start) * 1000
+        print(f"✅ Motor colunar: {len(columns['ts']):,} vendas carregadas em {self.load_ms:.0f} ms")
+
+    def ensure_loaded(self, db: Session):
+        """Carrega a tabela apenas se ainda não foi carregada"""
+        if not self.loaded:
+            self.load(db)
+
+    def refresh(self, db: Session, force: bool = False):
+        """Incorpora as vendas novas (no máximo a cada COLUMNAR_REFRESH_SECONDS)"""
+        if not force and time.monotonic() - self._last_refresh < COLUMNAR_REFRESH_SECONDS:
+            return
+        with self._refresh_lock:
+            # Outro refresh pode ter terminado enquanto esperávamos o lock
+            if not force and time.monotonic() - self._last_refresh < COLUMNAR_REFRESH_SECONDS:
+                return
+            last_sale_id = db.execute(select(func.max(sales.c.id))).scalar() or 0
+            if last_sale_id < self._last_sale_id:
+                # Vendas removidas: recarrega tudo
+                self.load(db)
+                return
+
+            new_rows = self._fetch(db, self._last_sale_id) if last_sale_id > self._last_sale_id else None
+            with self._lock:
+                if new_rows is not None and len(new_rows['ts']):
+                    self._tail = _concat(self._tail, new_rows)
+                    self.refreshes += 1
+                    if len(self._tail['ts']) > self.tail_ratio * max(len(self._main['ts']), 1):
+                        self._main, self._tail = self._sorted(_concat(self._main, self._tail)), _empty()
+                        self.merges += 1
+                self._last_refresh = time.monotonic()
+
+    def _window(self, start_date: datetime, end_date: datetime) -> Columns:
+        """Linhas com start_date <= sale_date < end_date"""
+        start_us, end_us = _to_us(start_date), _to_us(end_date)
+        with self._lock:
+            main, tail = self._main, self._tail
+        low, high = np.searchsorted(main['ts'], [start_us, end_us], side="left")
+        window = {name: values[low:high] for name, values in main.items()}
+        if len(tail['ts']):
+            mask = (tail['ts'] >= start_us) & (tail['ts'] < end_us)
+            window = _concat(window, {name: values[mask] for name, values in tail.items()})
+        return window
+
+    def top_products(self, db: Session, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Equivalente à consulta `top_products` do registro"""
+        window = self._window(params['start_date'], params['end_date'])
+        product_ids = window['product_id']
+        if not len(product_ids):
+            return []
+
+        orders = np.bincount(product_ids)
+        quantity = np.bincount(product_ids, weights=window['quantity']).astype(np.int64)
+        cents = np.bincount(product_ids, weights=window['cents'])
+        present = np.flatnonzero(orders)
+        ranked = present[np.lexsort((present, -quantity[present]))][:params['limit']]
+
+        dimension = {
+            row.id: row for row in db.execute(
+                select(products.c.id, products.c.name, products.c.sku, products.c.category, products.c.price_cents)
+                .where(products.c.id.in_(ranked.tolist()))
+            )
+        }
+        return [
+            {
+                'id': int(product_id),
+                'name': dimension[product_id].name,
+                'sku': dimension[product_id].sku,
+                'category': dimension[product_id].category,
+                'price': _money(dimension[product_id].price_cents) if dimension[product_id].price_cents is not None else None,
+                'total_quantity': int(quantity[product_id]),
+                'total_revenue': _money(cents[product_id]),
+                'total_orders': int(orders[product_id])
+            }
+            for product_id in ranked.tolist() if product_id in dimension
+        ]
+
+    def customer_ranking(self, db: Session, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Equivalente à consulta `customer_ranking` do registro"""
+        window = self._window(params['start_date'], params['end_date'])
+        customer_ids = window['customer_id']
+        if not len(customer_ids):
+            return []
+
+        purchases = np.bincount(customer_ids)
+        cents = np.bincount(customer_ids, weights=window['cents'])
+        items = np.bincount(customer_ids, weights=window['quantity']).astype(np.int64)
+        total_cents = cents.sum()
+        present = np.flatnonzero(purchases)
+        ranked = present[np.lexsort((present, -cents[present]))][:params['limit']]
+
+        # Datas e produtos distintos apenas dos clientes do ranking
+        selected = np.isin(customer_ids, ranked)
+        selected_customers = customer_ids[selected]
+        selected_ts = window['ts'][selected]
+        selected_products = window['product_id'][selected]
+
+        dimension = {
+            row.id: row for row in db.execute(
+                select(customers.c.id, customers.c.name, customers.c.email)
+                .where(customers.c.id.in_(ranked.tolist()))
+            )
+        }
+        rows = []
+        for customer_id in ranked.tolist():
+            if customer_id not in dimension:
+                continue
+            mine = selected_customers == customer_id
+            ts = selected_ts[mine]
+            rows.append({
+                'customer_name': dimension[customer_id].name,
+                'customer_email': dimension[customer_id].email,
+                'total_purchases': int(purchases[customer_id]),
+                'total_spent': _money(cents[customer_id]),
+                'average_order_value': cents[customer_id] / purchases[customer_id] / 100,
+                'total_items_purchased': int(items[customer_id]),
+                'first_purchase_date': _from_us(ts.min()),
+                'last_purchase_date': _from_us(ts.max()),
+                'revenue_contribution_percentage': round(cents[customer_id] * 100.0 / total_cents, 2),
+                'unique_products_purchased': int(len(np.unique(selected_products[mine])))
+            })
+        return rows
+
+    def daily_trend(self, db: Session, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Equivalente à consulta `daily_trend` do registro"""
+        window = self._window(params['start_date'], params['end_date'])
+        if not len(window['day']):
+            return []
+
+        first_day = int(window['day'].min())
+        day_index = window['day'] - first_day
+        transactions = np.bincount(day_index)
+        cents = np.bincount(day_index, weights=window['cents'])
+        items = np.bincount(day_index, weights=window['quantity']).astype(np.int64)
+
+        # Contagens distintas apenas dos dias retornados (os mais recentes)
+        days = np.flatnonzero(transactions)[::-1][:params['limit']]
+        in_days = day_index >= days.min()
+        selected_days = day_index[in_days]
+
+        def distinct_per_day(ids: np.ndarray) -> np.ndarray:
+            width = int(ids.max()) + 1
+            keys = selected_days * width + ids
+            if len(transactions) * width <= DISTINCT_BITMAP_MAX:
+                seen = np.zeros(len(transactions) * width, dtype=bool)
+                seen[keys] = True
+                return seen.reshape(len(transactions), width).sum(axis=1)
+            return np.bincount(np.unique(keys) // width, minlength=len(transactions))
+
+        unique_customers = distinct_per_day(window['customer_id'][in_days].astype(np.int64))
+        unique_products = distinct_per_day(window['product_id'][in_days].astype(np.int64))
+
+        return [
+            {
+                'sale_date': (EPOCH + timedelta(days=first_day + int(day))).date().isoformat(),
+                'daily_transactions': int(transactions[day]),
+                'daily_revenue': _money(cents[day]),
+                'daily_items_sold': int(items[day]),
+                'daily_avg_order_value': cents[day] / transactions[day] / 100,
+                'daily_unique_customers': int(unique_customers[day]),
+                'daily_unique_products': int(unique_products[day])
+            }
+            for day in days.tolist()
+        ]
+
+    def run(self, db: Session, name: str, **window: Any) -> List[Dict[str, Any]]:
+        """
+        Executa uma consulta do registro no motor colunar (mesmos parâmetros e
+        pós-processamento de run_analytics_query)
+        """
+        self.ensure_loaded(db)
+        self.refresh(db)
+
+        start = time.perf_counter()
+        params = build_params(name, **window)
+        rows = COLUMNAR_QUERIES[name](self, db, params)
+        query = ANALYTICS_QUERIES[name]
+        if query.postprocess:
+            for row in rows:
+                query.postprocess(row, params)
+        self.queries += 1
+        self._query_seconds += time.perf_counter() - start
+        return rows
+
+    def fast_path(self, name: str) -> Callable[..., Optional[List[Dict[str, Any]]]]:
+        """Handler do caminho rápido do registro para a consulta `name`"""
+        def handler(db: Session, **window: Any) -> Optional[List[Dict[str, Any]]]:
+            return self.run(db, name, **window)
+        return handler
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna o tamanho, a memória e a latência média do motor"""
+        with self._lock:
+            main, tail = self._main, self._tail
+        return {
+            'enabled': COLUMNAR_ENGINE_ENABLED,
+            'loaded': self.loaded,
+            'rows': int(len(main['ts']) + len(tail['ts'])),
+            'tail_rows': int(len(tail['ts'])),
+            'memory_mb': round(sum(values.nbytes for values in (*main.values(), *tail.values())) / 1048576, 1),
+            'last_sale_id': self._last_sale_id,
+            'load_ms': round(self.load_ms, 1),
+            'refreshes': self.refreshes,
+            'merges': self.merges,
+            'queries': self.queries,
+            'avg_query_ms': round(self._query_seconds / self.queries * 1000, 3) if self.queries else 0.0
+        }
+
+# Consultas do registro atendidas pelo motor colunar
+COLUMNAR_QUERIES: Dict[str, Callable[[ColumnarSalesEngine, Session, Dict[str, Any]], List[Dict[str, Any]]]] = {
+    'top_products': ColumnarSalesEngine.top_products,
+    'customer_ranking': ColumnarSalesEngine.customer_ranking,
+    'daily_trend': ColumnarSalesEngine.daily_trend
+}
+
+def _values_match(expected: Any, actual: Any) -> bool:
+    if isinstance(expected, float) or isinstance(actual, float):
+        # Somas em float no SQL x centavos inteiros: diferenças só no arredondamento
+        return expected is not None and actual is not None and math.isclose(expected, actual, rel_tol=1e-9, abs_tol=0.01)
+    return expected == actual
+
+def validate_against_sql(db: Session, engine: "ColumnarSalesEngine", **window: Any) -> Dict[str, List[str]]:
+    """
+    Compara as consultas do motor colunar com o SQL do registro
+
+    Returns:
+        Dict: Divergências por consulta (listas vazias quando tudo confere)
+    """
+    mismatches: Dict[str, List[str]] = {}
+    for name in COLUMNAR_QUERIES:
+        query = ANALYTICS_QUERIES[name]
+        params = build_params(name, **window)
+        expected = [dict(row) for row in db.execute(query.statement, params).mappings()]
+        if query.postprocess:
+            for row in expected:
+                query.postprocess(row, params)
+        actual = engine.run(db, name, **window)
+
+        problems = []
+        if len(expected) != len(actual):
+            problems.append(f"{len(expected)} linhas no SQL, {len(actual)} no motor colunar")
+        for index, (expected_row, actual_row) in enumerate(zip(expected, actual)):
+            for key, value in expected_row.items():
+                if not _values_match(value, actual_row.get(key)):
+                    problems.append(f"linha {index}, {key}: SQL={value!r} colunar={actual_row.get(key)!r}")
+        mismatches[name] = problems
+    return mismatches
+
+# Instância global do motor colunar
+columnar_engine = ColumnarSalesEngine()
+
+if COLUMNAR_ENGINE_ENABLED:
+    for _name in COLUMNAR_QUERIES:
+        # top_products já é atendida pelo ranking incremental quando ativo
+        if _name == 'top_products' and TOP_PRODUCTS_TRACKER_ENABLED:
+            continue
+        register_fast_path(_name, columnar_engine.fast_path(_name))
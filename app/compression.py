@@ -0,0 +1,273 @@
+"""
+Compressão das respostas HTTP (gzip e brotli) negociada por Accept-Encoding
+
+Middleware ASGI para as listagens JSON, as respostas do agente e o
+frontend. Respostas completas só são comprimidas a partir de
+COMPRESSION_MIN_SIZE bytes; respostas em streaming (StreamingResponse, SSE)
+são comprimidas bloco a bloco com flush a cada bloco, então cada evento
+chega ao cliente assim que é produzido. Respostas que já têm
+Content-Encoding (ex.: assets pré-comprimidos) e tipos que não comprimem
+(imagens, binários) passam intactas.
+
+O brotli é opcional (pacote `brotli`); sem ele só o gzip é oferecido. Os
+bytes economizados e o tempo de CPU gasto comprimindo ficam em
+`compression_stats` (por worker).
+"""
+import os
+import threading
+import time
+import zlib
+from typing import Dict, Optional, Tuple, Any
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# Configurações da compressão
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "True").lower() == "true"
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+COMPRESSIBLE_TYPES = (
+    "text/", "application/json", "application/javascript", "application/xml", "image/svg+xml"
+)
+
+def supported_encodings() -> Tuple[str, ...]:
+    """Codificações oferecidas, em ordem de preferência do servidor"""
+    return ("br", "gzip") if BROTLI_AVAILABLE else ("gzip",)
+
+def choose_encoding(accept_encoding: str, available: Optional[Tuple[str, ...]] = None) -> Optional[str]:
+    """
+    Escolhe a codificação pelo cabeçalho Accept-Encoding
+
+    Respeita os pesos q (q=0 recusa) e o curinga `*`; em empate vale a
+    preferência do servidor (brotli antes de gzip).
+    """
+    if available is None:
+        available = supported_encodings()
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if name:
+            weights[name.strip()] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in available:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+class _Encoder:
+    """Compressor incremental de uma resposta (gzip via zlib ou brotli)"""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        """Comprime um bloco; com flush, devolve tudo o que já pode ser descomprimido"""
+        if self.encoding == "br":
+            return self._brotli.process(data) + (self._brotli.flush() if flush else b"")
+        return self._zlib.compress(data) + (self._zlib.flush(zlib.Z_SYNC_FLUSH) if flush else b"")
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush(zlib.Z_FINISH)
+
+class CompressionStats:
+    """
+    Contadores de compressão por codificação (thread-safe)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._encodings: Dict[str, Dict[str, float]] = {}
+            self.skipped: Dict[str, int] = {'not_accepted': 0, 'below_min_size': 0, 'content_type': 0, 'already_encoded': 0}
+
+    def record(self, encoding: str, original: int, compressed: int, cpu_seconds: float, streamed: bool):
+        with self._lock:
+            entry = self._encodings.setdefault(encoding, {
+                'responses': 0, 'streamed': 0, 'original_bytes': 0, 'compressed_bytes': 0, 'cpu_seconds': 0.0
+            })
+            entry['responses'] += 1
+            entry['streamed'] += int(streamed)
+            entry['original_bytes'] += original
+            entry['compressed_bytes'] += compressed
+            entry['cpu_seconds'] += cpu_seconds
+
+    def skip(self, reason: str):
+        with self._lock:
+            self.skipped[reason] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Bytes economizados, razão de compressão e CPU (total e por MB de entrada)"""
+        with self._lock:
+            encodings = {}
+            for encoding, entry in self._encodings.items():
+                original_mb = entry['original_bytes'] / (1024 * 1024)
+                encodings[encoding] = {
+                    'responses': entry['responses'],
+                    'streamed': entry['streamed'],
+                    'original_bytes': entry['original_bytes'],
+                    'compressed_bytes': entry['compressed_bytes'],
+                    'saved_bytes': entry['original_bytes'] - entry['compressed_bytes'],
+                    'ratio': round(entry['compressed_bytes'] / entry['original_bytes'], 4) if entry['original_bytes'] else 0.0,
+                    'cpu_ms': round(entry['cpu_seconds'] * 1000, 2),
+                    'cpu_ms_per_mb': round(entry['cpu_seconds'] * 1000 / original_mb, 2) if original_mb else 0.0
+                }
+            return {
+                'enabled': COMPRESSION_ENABLED,
+                'available_encodings': list(supported_encodings()),
+                'min_size': COMPRESSION_MIN_SIZE,
+                'gzip_level': COMPRESSION_GZIP_LEVEL,
+                'brotli_quality': COMPRESSION_BROTLI_QUALITY,
+                'saved_bytes': sum(entry['saved_bytes'] for entry in encodings.values()),
+                'encodings': encodings,
+                'skipped': dict(self.skipped)
+            }
+
+# Instância global dos contadores
+compression_stats = CompressionStats()
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI de compressão gzip/brotli
+
+    Uso:
+        app.add_middleware(CompressionMiddleware)
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: Optional[int] = None,
+        gzip_level: Optional[int] = None,
+        brotli_quality: Optional[int] = None,
+        stats: Optional[CompressionStats] = None
+    ):
+        self.app = app
+        self.minimum_size = COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+        self.gzip_level = COMPRESSION_GZIP_LEVEL if gzip_level is None else gzip_level
+        self.brotli_quality = COMPRESSION_BROTLI_QUALITY if brotli_quality is None else brotli_quality
+        self.stats = stats or compression_stats
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            self.stats.skip('not_accepted')
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+class _CompressionResponder:
+    """Estado de uma resposta: decide no primeiro bloco do corpo e comprime os seguintes"""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self._start: Optional[Message] = None
+        self._encoder: Optional[_Encoder] = None
+        self._passthrough = False
+        self._original = self._compressed = 0
+        self._cpu_seconds = 0.0
+
+    def _compress(self, data: bytes, flush: bool = False, finish: bool = False) -> bytes:
+        start = time.thread_time()
+        output = self._encoder.compress(data, flush=flush) if data else b""
+        if finish:
+            output += self._encoder.finish()
+        self._cpu_seconds += time.thread_time() - start
+        self._original += len(data)
+        self._compressed += len(output)
+        return output
+
+    def _skip_reason(self, headers: Headers, body: bytes, more_body: bool) -> Optional[str]:
+        if "content-encoding" in headers:
+            return 'already_encoded'
+        if not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES):
+            return 'content_type'
+        if not more_body and len(body) < self.middleware.minimum_size:
+            return 'below_min_size'
+        return None
+
+    def _compressed_headers(self, streaming: bool) -> MutableHeaders:
+        headers = MutableHeaders(raw=self._start["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        # O corpo muda com a codificação: o ETag forte do original deixa de valer
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+        if streaming:
+            del headers["Content-Length"]
+        return headers
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            self._start = message
+            return
+        if message["type"] != "http.response.body" or self._passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self._encoder is None:
+            reason = self._skip_reason(Headers(raw=self._start["headers"]), body, more_body)
+            if reason:
+                self.middleware.stats.skip(reason)
+                self._passthrough = True
+                await self._send(self._start)
+                await self._send(message)
+                return
+
+            self._encoder = _Encoder(self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality)
+            headers = self._compressed_headers(streaming=more_body)
+            if not more_body:
+                body = self._compress(body, finish=True)
+                headers["Content-Length"] = str(len(body))
+                await self._send(self._start)
+                await self._send({"type": "http.response.body", "body": body})
+                self._record(streamed=False)
+                return
+            await self._send(self._start)
+
+        if more_body:
+            await self._send({"type": "http.response.body", "body": self._compress(body, flush=True), "more_body": True})
+        else:
+            await self._send({"type": "http.response.body", "body": self._compress(body, finish=True)})
+            self._record(streamed=True)
+
+    def _record(self, streamed: bool):
+        self.middleware.stats.record(self.encoding, self._original, self._compressed, self._cpu_seconds, streamed)
@@ -0,0 +1,122 @@
+"""
+Cache do contexto enviado ao modelo de IA
+
+O contexto (resumo das vendas + top 3 produtos) depende apenas da versão dos
+dados, então é construído uma vez por versão e compartilhado entre requisições
+(memória do processo) e entre workers (tabela no arquivo SQLite de cache).
+Junto com o contexto fica o tempo gasto para construí-lo, reportado nas
+respostas que o reutilizam.
+"""
+import os
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple, Any
+
+from app.answer_cache import ANSWER_CACHE_PATH
+
+# Configurações do cache de contexto
+CONTEXT_CACHE_PATH = os.getenv("CONTEXT_CACHE_PATH", ANSWER_CACHE_PATH)
+CONTEXT_CACHE_MAX_VERSIONS = int(os.getenv("CONTEXT_CACHE_MAX_VERSIONS", "8"))
+
+class ContextCache:
+    """
+    Contextos pré-computados por versão dos dados (memória + SQLite compartilhado)
+    """
+
+    def __init__(self, path: Optional[str] = None, max_versions: Optional[int] = None):
+        self.path = path or CONTEXT_CACHE_PATH
+        self.max_versions = max_versions or CONTEXT_CACHE_MAX_VERSIONS
+        self.hits = 0
+        self.misses = 0
+        self._local: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._connect()
+        # Cada processo do servidor pré-forkado (app.server) abre a própria conexão
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._connect)
+
+    def _connect(self):
+        """Abre a conexão com o SQLite e cria as tabelas"""
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS contexts (
+                data_version TEXT PRIMARY KEY,
+                context TEXT NOT NULL,
+                build_ms REAL NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def _remember(self, data_version: str, context: str, build_ms: float):
+        """Guarda o contexto na memória do processo respeitando o limite de versões"""
+        self._local[data_version] = (context, build_ms)
+        self._local.move_to_end(data_version)
+        while len(self._local) > self.max_versions:
+            self._local.popitem(last=False)
+
+    def get_entry(self, data_version: str) -> Optional[Tuple[str, float]]:
+        """
+        Busca o contexto da versão na memória e, se ausente, no SQLite compartilhado
+
+        Returns:
+            (contexto, build_ms) ou None se a versão não está em cache
+        """
+        with self._lock:
+            entry = self._local.get(data_version)
+            if entry is None:
+                row = self._conn.execute(
+                    "SELECT context, build_ms FROM contexts WHERE data_version = ?", (data_version,)
+                ).fetchone()
+                if row is not None:
+                    entry = (row[0], row[1])
+                    self._remember(data_version, *entry)
+
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def get(self, data_version: str) -> Optional[str]:
+        """Busca apenas o texto do contexto da versão"""
+        entry = self.get_entry(data_version)
+        return entry[0] if entry is not None else None
+
+    def set(self, data_version: str, context: str, build_ms: float):
+        """Armazena o contexto construído para a versão e descarta versões antigas"""
+        with self._lock:
+            self._remember(data_version, context, build_ms)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO contexts (data_version, context, build_ms, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (data_version, context, build_ms, time.time())
+            )
+            self._conn.execute(
+                """
+                DELETE FROM contexts WHERE data_version IN (
+                    SELECT data_version FROM contexts
+                    ORDER BY created_at DESC
+                    LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_versions,)
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas de uso do cache de contexto"""
+        return {
+            'versions_in_memory': len(self._local),
+            'max_versions': self.max_versions,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+# Instância global do cache de contexto
+context_cache = ContextCache()
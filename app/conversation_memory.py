@@ -0,0 +1,158 @@
+"""
+Memória de conversa por sessão para o agente profissional
+
+Substitui o `ConversationBufferMemory` único do agente (compartilhado por
+todos os usuários e sem limite de tamanho) por uma memória por sessão:
+apenas as últimas N trocas de cada sessão são mantidas, as sessões ficam em
+um mapa LRU com limite de sessões e de bytes, e sessões ociosas expiram. O
+histórico da sessão entra no prompt da pergunta seguinte (format_history),
+com cada mensagem limitada a CONVERSATION_PROMPT_CHARS caracteres.
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any
+
+from langchain.memory import ConversationBufferWindowMemory
+
+# Configurações da memória de conversa
+CONVERSATION_MAX_TURNS = int(os.getenv("CONVERSATION_MAX_TURNS", "5"))
+CONVERSATION_MAX_SESSIONS = int(os.getenv("CONVERSATION_MAX_SESSIONS", "1000"))
+CONVERSATION_MAX_BYTES = int(os.getenv("CONVERSATION_MAX_BYTES", str(5 * 1024 * 1024)))
+CONVERSATION_IDLE_SECONDS = int(os.getenv("CONVERSATION_IDLE_SECONDS", "1800"))
+CONVERSATION_PROMPT_CHARS = int(os.getenv("CONVERSATION_PROMPT_CHARS", "400"))
+
+# Rótulo de cada tipo de mensagem no histórico enviado ao modelo
+HISTORY_ROLE_LABELS = {'human': 'User', 'ai': 'Analyst'}
+
+def _memory_size(memory: ConversationBufferWindowMemory) -> int:
+    """Tamanho aproximado (bytes) das mensagens armazenadas"""
+    return sum(len(message.content.encode("utf-8")) for message in memory.chat_memory.messages)
+
+class SessionMemoryStore:
+    """
+    Memórias de conversa por sessão em um mapa LRU limitado
+    """
+
+    def __init__(
+        self,
+        max_turns: Optional[int] = None,
+        max_sessions: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        idle_seconds: Optional[int] = None
+    ):
+        self.max_turns = max_turns or CONVERSATION_MAX_TURNS
+        self.max_sessions = max_sessions or CONVERSATION_MAX_SESSIONS
+        self.max_bytes = max_bytes or CONVERSATION_MAX_BYTES
+        self.idle_seconds = idle_seconds or CONVERSATION_IDLE_SECONDS
+        self.evictions = 0
+        self.expirations = 0
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def _expire_idle(self, now: float):
+        """Remove as sessões sem acesso há mais de idle_seconds (as mais antigas primeiro)"""
+        while self._sessions:
+            session_id, entry = next(iter(self._sessions.items()))
+            if now - entry['last_access'] <= self.idle_seconds:
+                break
+            self._drop(session_id)
+            self.expirations += 1
+
+    def _drop(self, session_id: str):
+        entry = self._sessions.pop(session_id)
+        self._total_bytes -= entry['bytes']
+
+    def _enforce_limits(self, keep: str):
+        """Despeja as sessões menos recentes acima dos limites de quantidade e bytes"""
+        while len(self._sessions) > self.max_sessions or self._total_bytes > self.max_bytes:
+            session_id = next(iter(self._sessions))
+            if session_id == keep:
+                break
+            self._drop(session_id)
+            self.evictions += 1
+
+    def _entry(self, session_id: str, now: float) -> Dict[str, Any]:
+        """Entrada da sessão (criada se necessário); chamada com o lock adquirido"""
+        self._expire_idle(now)
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            entry = {
+                'memory': ConversationBufferWindowMemory(k=self.max_turns, memory_key="chat_history"),
+                'bytes': 0,
+                'last_access': now
+            }
+            self._sessions[session_id] = entry
+            self._enforce_limits(keep=session_id)
+        else:
+            entry['last_access'] = now
+            self._sessions.move_to_end(session_id)
+        return entry
+
+    def get(self, session_id: str) -> ConversationBufferWindowMemory:
+        """Retorna (criando se necessário) a memória da sessão"""
+        with self._lock:
+            return self._entry(session_id, time.time())['memory']
+
+    def save_turn(self, session_id: str, question: str, answer: str):
+        """Registra uma troca (pergunta/resposta) mantendo só as últimas N na sessão"""
+        # Busca e contabilização sob o mesmo lock: a sessão não pode ser despejada entre as duas
+        with self._lock:
+            entry = self._entry(session_id, time.time())
+            memory = entry['memory']
+            memory.save_context({"input": question}, {"output": answer})
+            # A janela do LangChain só limita a leitura; aqui o histórico armazenado também é podado
+            del memory.chat_memory.messages[:-2 * self.max_turns]
+
+            size = _memory_size(memory)
+            self._total_bytes += size - entry['bytes']
+            entry['bytes'] = size
+            self._enforce_limits(keep=session_id)
+
+    def history(self, session_id: str) -> List[Dict[str, str]]:
+        """Histórico da sessão como lista de {'role', 'content'}"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return []
+            return [
+                {'role': message.type, 'content': message.content}
+                for message in entry['memory'].chat_memory.messages
+            ]
+
+    def clear(self, session_id: Optional[str] = None):
+        """Remove uma sessão (ou todas)"""
+        with self._lock:
+            if session_id is None:
+                self._sessions.clear()
+                self._total_bytes = 0
+            elif session_id in self._sessions:
+                self._drop(session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna o uso de memória das conversas"""
+        with self._lock:
+            self._expire_idle(time.time())
+            return {
+                'sessions': len(self._sessions),
+                'max_sessions': self.max_sessions,
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'max_turns': self.max_turns,
+                'idle_seconds': self.idle_seconds,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+def format_history(history: List[Dict[str, str]], max_chars: Optional[int] = None) -> str:
+    """Histórico da sessão como texto para o prompt, com cada mensagem truncada em max_chars"""
+    max_chars = max_chars or CONVERSATION_PROMPT_CHARS
+    lines = []
+    for message in history:
+        content = " ".join(message['content'].split())
+        if len(content) > max_chars:
+            content = content[:max_chars].rstrip() + "..."
+        lines.append(f"{HISTORY_ROLE_LABELS.get(message['role'], message['role'])}: {content}")
+    return "\n".join(lines)
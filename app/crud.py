@@ -4,8 +4,14 @@ Operações CRUD (Create, Read, Update, Delete) para o banco de dados
 from datetime import datetime, timedelta
 from typing import List, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, func, and_
+from sqlalchemy import desc, func
 from app import models, schemas
+from app.analytics_queries import in_sale_period, run_analytics_query
+from app.top_products_tracker import top_products_tracker
+from app import columnar_engine  # registra o motor colunar no registro analítico, se ativo
+from app.sales_archive import SALES_ARCHIVE_ENABLED, sales_archive
+from app.customer_stats import apply_new_sales
+from app.sql_time import epoch_month
 
 def get_product(db: Session, product_id: int) -> Optional[models.Product]:
     """Busca um produto por ID"""
@@ -36,50 +42,45 @@ def get_sales(db: Session, skip: int = 0, limit: int = 100) -> List[models.Sale]
     return db.query(models.Sale).offset(skip).limit(limit).all()
 
 def get_sales_by_date_range(db: Session, start_date: datetime, end_date: datetime) -> List[models.Sale]:
-    """Busca vendas por período"""
-    return db.query(models.Sale).filter(
-        and_(models.Sale.sale_date >= start_date, models.Sale.sale_date <= end_date)
-    ).all()
+    """Busca vendas por período (incluindo as já movidas para o arquivo Parquet)"""
+    hot_sales = db.query(models.Sale).filter(in_sale_period(start_date, end_date, include_end=True)).all()
+    if not SALES_ARCHIVE_ENABLED:
+        return hot_sales
+    return sales_archive.sales_between(start_date, end_date) + hot_sales
+
+def create_sale(db: Session, sale: schemas.SaleCreate) -> models.Sale:
+    """
+    Registra uma venda, atualiza customer_stats na mesma transação e a
+    acumula no ranking de produtos em memória
+    """
+    db_sale = models.Sale(**sale.model_dump())
+    db.add(db_sale)
+    db.flush()
+    apply_new_sales(db)
+    db.commit()
+    db.refresh(db_sale)
+    top_products_tracker.record_sale(db_sale)
+    return db_sale
 
 def get_top_products_last_month(db: Session, limit: int = 5) -> List[dict]:
     """
     Retorna os produtos mais vendidos no último mês
     """
-    # Calcula data de um mês atrás
-    one_month_ago = datetime.now() - timedelta(days=30)
-    
-    # Query para produtos mais vendidos
-    result = db.query(
-        models.Product.id,
-        models.Product.name,
-        models.Product.sku,
-        models.Product.category,
-        models.Product.price,
-        func.sum(models.Sale.quantity).label('total_quantity'),
-        func.sum(models.Sale.total_amount).label('total_revenue'),
-        func.count(models.Sale.id).label('total_orders')
-    ).join(
-        models.Sale, models.Product.id == models.Sale.product_id
-    ).filter(
-        models.Sale.sale_date >= one_month_ago
-    ).group_by(
-        models.Product.id
-    ).order_by(
-        desc('total_quantity')
-    ).limit(limit).all()
+    # Consulta do registro analítico (últimos 30 dias), atendida pelo ranking em memória
+    result = run_analytics_query(db, 'top_products', days=30, limit=limit)
     
     # Converte resultado para lista de dicionários
     top_products = []
     for row in result:
         top_products.append({
-            'id': row.id,
-            'name': row.name,
-            'sku': row.sku,
-            'category': row.category,
-            'price': float(row.price) if row.price else 0,
-            'total_quantity': row.total_quantity,
-            'total_revenue': float(row.total_revenue),
-            'total_orders': row.total_orders
+            'id': row['id'],
+            'name': row['name'],
+            'sku': row['sku'],
+            'category': row['category'],
+            'price': row['price'] or 0,
+            'total_quantity': row['total_quantity'],
+            'total_revenue': row['total_revenue'],
+            'total_orders': row['total_orders']
         })
     
     return top_products
@@ -88,17 +89,51 @@ def get_sales_summary(db: Session) -> dict:
     """
     Retorna resumo geral das vendas
     """
-    total_sales = db.query(func.count(models.Sale.id)).scalar()
-    total_revenue = db.query(func.sum(models.Sale.total_amount)).scalar()
-    total_products = db.query(func.count(models.Product.id)).scalar()
-    total_customers = db.query(func.count(models.Customer.id)).scalar()
+    summary = run_analytics_query(db, 'catalog_summary')[0]
+    archived = sales_archive.totals() if SALES_ARCHIVE_ENABLED else {'sales': 0, 'revenue': 0}
     
     return {
-        'total_sales': total_sales or 0,
-        'total_revenue': float(total_revenue) if total_revenue else 0,
-        'total_products': total_products or 0,
-        'total_customers': total_customers or 0
+        'total_sales': (summary['total_sales'] or 0) + archived['sales'],
+        'total_revenue': round((summary['total_revenue'] or 0) + archived['revenue'], 2),
+        'total_products': summary['total_products'] or 0,
+        'total_customers': summary['total_customers'] or 0
+    }
+
+def get_monthly_sales_report(db: Session, start_date: datetime, end_date: datetime) -> List[dict]:
+    """
+    Transações, receita e itens por mês no período [start_date, end_date)
+
+    Combina a tabela quente com os meses arquivados em Parquet.
+    """
+    month = epoch_month(models.Sale.sale_epoch)
+    rows = db.query(
+        month,
+        func.count(models.Sale.id),
+        func.sum(models.Sale.total_amount_cents),
+        func.sum(models.Sale.quantity)
+    ).filter(in_sale_period(start_date, end_date)).group_by(month).all()
+
+    # Receita somada em centavos; convertida para reais só na saída
+    months = {
+        sale_month: {'transactions': transactions, 'cents': cents or 0, 'items': items or 0}
+        for sale_month, transactions, cents, items in rows
     }
+    if SALES_ARCHIVE_ENABLED:
+        for sale_month, totals in sales_archive.monthly_totals(start_date, end_date).items():
+            current = months.setdefault(sale_month, {'transactions': 0, 'cents': 0, 'items': 0})
+            current['transactions'] += totals['transactions']
+            current['cents'] += totals['revenue_cents']
+            current['items'] += totals['items']
+
+    return [
+        {
+            'month': sale_month,
+            'transactions': totals['transactions'],
+            'revenue': totals['cents'] / 100,
+            'items': totals['items']
+        }
+        for sale_month, totals in sorted(months.items())
+    ]
 
 def search_sales_by_product_name(db: Session, product_name: str) -> List[models.Sale]:
     """
@@ -120,3 +155,24 @@ def get_sales_by_customer_name(db: Session, customer_name: str) -> List[models.S
         models.Customer.name.ilike(f"%{customer_name}%")
     ).all()
 
+
+def get_data_version(db: Session) -> str:
+    """
+    Retorna a versão atual dos dados de vendas
+
+    Combina o dia corrente (as análises usam janelas relativas a hoje) com o
+    contador de data_version, incrementado por gatilhos a cada INSERT, UPDATE
+    ou DELETE em vendas, produtos e clientes: uma leitura de uma linha, sem
+    contar as tabelas.
+    """
+    version = db.query(models.DataVersion.version).filter(models.DataVersion.id == 1).scalar()
+    if version is None:
+        # Banco sem as migrações aplicadas: último id de cada tabela (busca no índice)
+        row = db.query(
+            func.max(models.Sale.id),
+            db.query(func.max(models.Product.id)).scalar_subquery(),
+            db.query(func.max(models.Customer.id)).scalar_subquery()
+        ).one()
+        version = "ids-" + "-".join(str(value or 0) for value in row)
+
+    return f"{datetime.now().date().isoformat()}:{version}"
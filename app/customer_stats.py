@@ -0,0 +1,155 @@
+"""
+Manutenção incremental da tabela customer_stats (agregados RFM por cliente)
+
+O ramo de clientes do agente profissional agregava todas as vendas de cada
+cliente (totais, primeira e última compra, produtos distintos) e ainda
+relia a tabela para a receita total a cada pergunta. A tabela
+`customer_stats` guarda esses agregados e é atualizada na mesma transação de
+cada venda (crud.create_sale): apenas as vendas com id acima da marca d'água
+(o maior last_sale_id incorporado) são agregadas e somadas às linhas dos seus
+clientes. Vendas inseridas por fora da API (cargas em lote, outros processos)
+são incorporadas na próxima venda ou na inicialização, pelo mesmo caminho; a
+carga inicial é o mesmo cálculo a partir da marca d'água zero.
+
+Os produtos distintos de cada cliente consideram apenas pares
+(cliente, produto) ainda presentes na tabela `sales`: vendas movidas para o
+arquivo frio continuam nos totais, mas uma nova compra de um produto só
+comprado em meses arquivados conta como produto novo.
+"""
+import time
+from typing import Dict, List, Any
+
+from sqlalchemy import and_, bindparam, distinct, exists, func, select
+from sqlalchemy.orm import Session, aliased
+
+from app import models
+
+sales = models.Sale.__table__
+customer_stats = models.CustomerStats.__table__
+
+# Limite de parâmetros por IN (...) ao ler as linhas existentes
+_IN_CHUNK = 500
+
+_update_statement = (
+    customer_stats.update()
+    .where(customer_stats.c.customer_id == bindparam("b_customer_id"))
+    .values(
+        total_purchases=bindparam("total_purchases"),
+        total_spent_cents=bindparam("total_spent_cents"),
+        total_items=bindparam("total_items"),
+        first_purchase_date=bindparam("first_purchase_date"),
+        last_purchase_date=bindparam("last_purchase_date"),
+        unique_products=bindparam("unique_products"),
+        last_sale_id=bindparam("last_sale_id")
+    )
+)
+
+def _watermark(db: Session) -> int:
+    return db.execute(select(func.max(customer_stats.c.last_sale_id))).scalar() or 0
+
+def _new_sales_by_customer(db: Session, watermark: int) -> Dict[int, Dict[str, Any]]:
+    """Agrega por cliente as vendas com id acima da marca d'água"""
+    is_new = sales.c.id > watermark
+    rows = db.execute(
+        select(
+            sales.c.customer_id,
+            func.count(sales.c.id),
+            func.sum(sales.c.total_amount_cents),
+            func.sum(sales.c.quantity),
+            func.min(sales.c.sale_date),
+            func.max(sales.c.sale_date),
+            func.max(sales.c.id)
+        )
+        .where(is_new)
+        .group_by(sales.c.customer_id)
+    ).all()
+
+    # Produtos comprados pela primeira vez (sem venda anterior do mesmo par,
+    # verificado pelo índice ix_sales_customer_product)
+    earlier = aliased(sales)
+    already_bought = exists().where(and_(
+        earlier.c.customer_id == sales.c.customer_id,
+        earlier.c.product_id == sales.c.product_id,
+        earlier.c.id <= watermark
+    ))
+    new_products = dict(db.execute(
+        select(sales.c.customer_id, func.count(distinct(sales.c.product_id)))
+        .where(and_(is_new, ~already_bought))
+        .group_by(sales.c.customer_id)
+    ).all())
+
+    return {
+        customer_id: {
+            'total_purchases': purchases,
+            'total_spent_cents': spent or 0,
+            'total_items': items or 0,
+            'first_purchase_date': first,
+            'last_purchase_date': last,
+            'unique_products': new_products.get(customer_id, 0),
+            'last_sale_id': last_id
+        }
+        for customer_id, purchases, spent, items, first, last, last_id in rows
+    }
+
+def apply_new_sales(db: Session) -> int:
+    """
+    Incorpora a customer_stats as vendas ainda não agregadas
+
+    Não faz commit: chamado dentro da transação da venda (ou da inicialização).
+
+    Returns:
+        int: Número de clientes atualizados ou inseridos
+    """
+    watermark = _watermark(db)
+    increments = _new_sales_by_customer(db, watermark)
+    if not increments:
+        return 0
+
+    customer_ids = list(increments)
+    existing: Dict[int, Any] = {}
+    for start in range(0, len(customer_ids), _IN_CHUNK):
+        chunk = customer_ids[start:start + _IN_CHUNK]
+        for row in db.execute(select(customer_stats).where(customer_stats.c.customer_id.in_(chunk))):
+            existing[row.customer_id] = row
+
+    updates: List[Dict[str, Any]] = []
+    inserts: List[Dict[str, Any]] = []
+    for customer_id, increment in increments.items():
+        current = existing.get(customer_id)
+        if current is None:
+            inserts.append({'customer_id': customer_id, **increment})
+            continue
+        updates.append({
+            'b_customer_id': customer_id,
+            'total_purchases': current.total_purchases + increment['total_purchases'],
+            'total_spent_cents': current.total_spent_cents + increment['total_spent_cents'],
+            'total_items': current.total_items + increment['total_items'],
+            'first_purchase_date': min(filter(None, (current.first_purchase_date, increment['first_purchase_date']))),
+            'last_purchase_date': max(filter(None, (current.last_purchase_date, increment['last_purchase_date']))),
+            'unique_products': current.unique_products + increment['unique_products'],
+            'last_sale_id': max(current.last_sale_id, increment['last_sale_id'])
+        })
+
+    if inserts:
+        db.execute(customer_stats.insert(), inserts)
+    if updates:
+        db.execute(_update_statement, updates)
+    return len(inserts) + len(updates)
+
+def ensure_customer_stats(db: Session):
+    """
+    Cria a tabela e o índice ausentes e incorpora as vendas pendentes
+
+    Na primeira execução (tabela vazia) faz a carga completa a partir de `sales`.
+    O índice ix_sales_customer_product é criado pelas migrações (app.migrations).
+    """
+    connection = db.connection()
+    customer_stats.create(connection, checkfirst=True)
+    for index in customer_stats.indexes:
+        index.create(connection, checkfirst=True)
+
+    start = time.perf_counter()
+    updated = apply_new_sales(db)
+    db.commit()
+    if updated:
+        print(f"✅ customer_stats: {updated:,} clientes atualizados em {(time.perf_counter() - start) * 1000:.0f} ms")
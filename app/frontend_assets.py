@@ -0,0 +1,209 @@
+"""
+Assets do frontend residentes em memória, com variantes pré-comprimidas
+
+Os arquivos de FRONTEND_ASSETS_PATH são lidos uma vez na inicialização e,
+para cada um, ficam em memória o conteúdo original e as variantes gzip
+(nível 9) e brotli (qualidade 11, se o pacote estiver instalado), calculadas
+uma única vez. Cada requisição escolhe a variante pelo Accept-Encoding, sem
+abrir arquivo nem comprimir; o CompressionMiddleware deixa passar as
+respostas que já têm Content-Encoding.
+
+Cada variante tem um ETag forte derivado do SHA-256 do conteúdo, e
+If-None-Match responde 304. Os nomes com hash (`/assets/index.<hash>.html`,
+gerados por `asset_url`) mudam a cada alteração do arquivo e são servidos
+com Cache-Control de um ano e `immutable`; os nomes simples (incluindo o
+`index.html` da raiz) usam `no-cache`, ou seja, sempre revalidam pelo ETag.
+
+Em desenvolvimento (FRONTEND_ASSETS_RELOAD) cada requisição confere mtime e
+tamanho do arquivo e recarrega o asset alterado.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+import time
+from typing import Dict, Optional, Any
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.compression import BROTLI_AVAILABLE, choose_encoding
+
+if BROTLI_AVAILABLE:
+    import brotli
+
+# Configurações dos assets do frontend
+FRONTEND_ASSETS_PATH = os.getenv("FRONTEND_ASSETS_PATH", "frontend")
+FRONTEND_ASSETS_RELOAD = os.getenv("FRONTEND_ASSETS_RELOAD", "False").lower() == "true"
+FRONTEND_ASSETS_MAX_AGE = int(os.getenv("FRONTEND_ASSETS_MAX_AGE", "31536000"))
+
+HASHED_CACHE_CONTROL = f"public, max-age={FRONTEND_ASSETS_MAX_AGE}, immutable"
+PLAIN_CACHE_CONTROL = "no-cache"
+
+class FrontendAsset:
+    """Um arquivo do frontend: conteúdo, variantes comprimidas e ETags"""
+
+    def __init__(self, name: str, path: str):
+        self.name = name
+        self.path = path
+        stat = os.stat(path)
+        self.signature = (stat.st_mtime_ns, stat.st_size)
+        with open(path, "rb") as f:
+            body = f.read()
+
+        content_type, _ = mimetypes.guess_type(name)
+        content_type = content_type or "application/octet-stream"
+        # O Response do Starlette só acrescenta o charset aos tipos text/*
+        if content_type in ("application/javascript", "application/json"):
+            content_type += "; charset=utf-8"
+        self.content_type = content_type
+
+        self.digest = hashlib.sha256(body).hexdigest()
+        stem, suffix = os.path.splitext(name)
+        self.hashed_name = f"{stem}.{self.digest[:12]}{suffix}"
+
+        # Variantes por Content-Encoding (None = original); só as que ficam menores
+        self.variants: Dict[Optional[str], bytes] = {None: body}
+        compressed = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+        if BROTLI_AVAILABLE:
+            compressed["br"] = brotli.compress(body, quality=11)
+        for encoding, data in compressed.items():
+            if len(data) < len(body):
+                self.variants[encoding] = data
+
+    def etag(self, encoding: Optional[str]) -> str:
+        # Um ETag forte por representação: o corpo de cada variante é diferente
+        return f'"{self.digest[:32]}{"-" + encoding if encoding else ""}"'
+
+    def changed(self) -> bool:
+        """Se o arquivo em disco mudou (ou sumiu) desde a carga"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return True
+        return (stat.st_mtime_ns, stat.st_size) != self.signature
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Comparação fraca do If-None-Match (RFC 9110), incluindo `*`"""
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in candidates
+
+class FrontendAssets:
+    """
+    Assets do frontend em memória, por nome simples e por nome com hash
+    """
+
+    def __init__(self, path: Optional[str] = None, reload: Optional[bool] = None):
+        self.path = path or FRONTEND_ASSETS_PATH
+        self.reload = FRONTEND_ASSETS_RELOAD if reload is None else reload
+        self.loaded = False
+        self.load_ms = 0.0
+        self.reloads = 0
+        self.hits = 0
+        self.not_modified = 0
+        self._assets: Dict[str, FrontendAsset] = {}
+        self._hashed: Dict[str, FrontendAsset] = {}
+        self._lock = threading.RLock()
+
+    def load(self):
+        """Lê e pré-comprime todos os arquivos do diretório do frontend"""
+        start = time.perf_counter()
+        assets = {}
+        for root, _, files in os.walk(self.path):
+            for filename in files:
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, self.path).replace(os.sep, "/")
+                assets[name] = FrontendAsset(name, path)
+
+        with self._lock:
+            self._assets = assets
+            self._hashed = {asset.hashed_name: asset for asset in assets.values()}
+            self.loaded = True
+            self.load_ms = (time.perf_counter() - start) * 1000
+        print(f"✅ Frontend em memória: {len(assets)} arquivo(s), {self.load_ms:.1f} ms")
+
+    def ensure_loaded(self):
+        """Carrega os assets apenas se ainda não foram carregados"""
+        if not self.loaded:
+            self.load()
+
+    def _reload(self, asset: FrontendAsset) -> Optional[FrontendAsset]:
+        """Recarrega um asset alterado em disco (modo de desenvolvimento)"""
+        with self._lock:
+            self._assets.pop(asset.name, None)
+            self._hashed.pop(asset.hashed_name, None)
+            if not os.path.isfile(asset.path):
+                return None
+            fresh = FrontendAsset(asset.name, asset.path)
+            self._assets[fresh.name] = fresh
+            self._hashed[fresh.hashed_name] = fresh
+            self.reloads += 1
+            return fresh
+
+    def get(self, name: str) -> Optional[FrontendAsset]:
+        self.ensure_loaded()
+        asset = self._assets.get(name) or self._hashed.get(name)
+        if asset is not None and self.reload and asset.changed():
+            asset = self._reload(asset)
+        return asset
+
+    def asset_url(self, name: str) -> str:
+        """URL com hash do conteúdo (cache de longa duração) para um asset"""
+        asset = self.get(name)
+        return f"/assets/{asset.hashed_name}" if asset else f"/assets/{name}"
+
+    def response(self, request: Request, name: str) -> Optional[Response]:
+        """
+        Resposta do asset na melhor codificação aceita pelo cliente
+
+        Returns:
+            Response (200 ou 304) ou None se o asset não existir
+        """
+        asset = self.get(name)
+        if asset is None:
+            return None
+
+        encoding = choose_encoding(
+            request.headers.get("accept-encoding", ""),
+            tuple(encoding for encoding in ("br", "gzip") if encoding in asset.variants)
+        )
+        etag = asset.etag(encoding)
+        headers = {
+            "ETag": etag,
+            "Cache-Control": HASHED_CACHE_CONTROL if name == asset.hashed_name else PLAIN_CACHE_CONTROL,
+            "Vary": "Accept-Encoding"
+        }
+
+        if _etag_matches(request.headers.get("if-none-match", ""), etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        self.hits += 1
+        return Response(content=asset.variants[encoding], media_type=asset.content_type, headers=headers)
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna os assets carregados, tamanhos por variante e contadores"""
+        with self._lock:
+            return {
+                'loaded': self.loaded,
+                'reload': self.reload,
+                'load_ms': round(self.load_ms, 1),
+                'assets': {
+                    name: {
+                        'hashed_name': asset.hashed_name,
+                        'bytes': {encoding or 'identity': len(data) for encoding, data in asset.variants.items()}
+                    }
+                    for name, asset in self._assets.items()
+                },
+                'hits': self.hits,
+                'not_modified': self.not_modified,
+                'reloads': self.reloads
+            }
+
+# Instância global dos assets
+frontend_assets = FrontendAssets()
@@ -0,0 +1,161 @@
+"""
+Fila de inferência com micro-batching para o modelo local (transformers)
+
+Requisições concorrentes enviam seus prompts para uma fila; um worker coleta
+os prompts durante uma janela curta (até o tamanho máximo do lote), executa um
+único forward em lote com padding e devolve cada resultado à requisição que o
+aguarda.
+"""
+import os
+import time
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Tuple, Any, Optional
+
+# Configurações do micro-batching
+INFERENCE_BATCHING = os.getenv("INFERENCE_BATCHING", "True").lower() == "true"
+INFERENCE_BATCH_WINDOW_MS = float(os.getenv("INFERENCE_BATCH_WINDOW_MS", "20"))
+INFERENCE_MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "8"))
+INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", "120"))
+
+class InferenceBatcher:
+    """
+    Agrupa prompts concorrentes em lotes para o pipeline de geração de texto
+    """
+
+    def __init__(
+        self,
+        model,
+        generation_kwargs: Dict[str, Any],
+        window_ms: Optional[float] = None,
+        max_batch_size: Optional[int] = None
+    ):
+        self.model = model
+        self.generation_kwargs = generation_kwargs
+        self.window = (window_ms if window_ms is not None else INFERENCE_BATCH_WINDOW_MS) / 1000
+        self.max_batch_size = max_batch_size or INFERENCE_MAX_BATCH_SIZE
+
+        # Estatísticas por tamanho de lote: {tamanho: [lotes, prompts, segundos]}
+        self._stats: Dict[int, List[float]] = {}
+        self._stats_lock = threading.Lock()
+
+        # Modelos GPT-2/DialoGPT não têm token de padding; o lote é alinhado à esquerda
+        tokenizer = getattr(model, "tokenizer", None)
+        if tokenizer is not None:
+            if tokenizer.pad_token_id is None:
+                tokenizer.pad_token = tokenizer.eos_token
+            tokenizer.padding_side = "left"
+
+        self._start_worker()
+        # Threads não sobrevivem ao fork: cada worker do servidor pré-forkado
+        # (app.server) recria a fila e o worker, compartilhando o modelo
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._start_worker)
+
+    def _start_worker(self):
+        """Cria a fila e inicia o worker de inferência"""
+        self._stats_lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[Tuple[str, Future]]]" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="inference-batcher", daemon=True)
+        self._worker.start()
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """Enfileira o prompt e aguarda o texto gerado pelo lote"""
+        future: Future = Future()
+        self._queue.put((prompt, future))
+        try:
+            return future.result(timeout=timeout or INFERENCE_TIMEOUT)
+        except FutureTimeoutError:
+            # Ainda na fila: o worker descarta o prompt em vez de gerá-lo
+            future.cancel()
+            raise
+
+    def close(self):
+        """Encerra o worker após processar os prompts pendentes"""
+        self._queue.put(None)
+        self._worker.join()
+
+    def _run(self):
+        """Loop do worker: coleta um lote dentro da janela e o processa"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            try:
+                self._process_batch(batch)
+            except Exception as e:
+                # O worker nunca morre: sem ele, todas as requisições seguintes ficariam presas
+                print(f"❌ Erro no worker de inferência: {e}")
+            if stop:
+                return
+
+    def _process_batch(self, batch: List[Tuple[str, Future]]):
+        """
+        Executa o lote em um único forward e distribui os resultados
+        Qualquer erro (na geração ou na leitura das saídas) vai para todos os
+        futures ainda sem resultado
+        """
+        # Descarta os prompts cujas requisições já desistiram (timeout)
+        batch = [(prompt, future) for prompt, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        try:
+            prompts = [prompt for prompt, _ in batch]
+            start = time.perf_counter()
+            outputs = self.model(prompts, batch_size=len(prompts), **self.generation_kwargs)
+            elapsed = time.perf_counter() - start
+            if len(outputs) != len(batch):
+                raise RuntimeError(f"{len(outputs)} saídas para um lote de {len(batch)} prompts")
+
+            with self._stats_lock:
+                entry = self._stats.setdefault(len(batch), [0, 0, 0.0])
+                entry[0] += 1
+                entry[1] += len(batch)
+                entry[2] += elapsed
+
+            for (_, future), output in zip(batch, outputs):
+                # O pipeline retorna uma lista de sequências geradas por prompt
+                sequence = output[0] if isinstance(output, list) else output
+                future.set_result(sequence['generated_text'])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna a vazão (prompts/s) e latência média por tamanho de lote"""
+        with self._stats_lock:
+            by_size = {
+                size: {
+                    'batches': int(batches),
+                    'prompts': int(prompts),
+                    'prompts_per_second': round(prompts / seconds, 3) if seconds else 0.0,
+                    'avg_batch_ms': round(seconds * 1000 / batches, 3) if batches else 0.0
+                }
+                for size, (batches, prompts, seconds) in sorted(self._stats.items())
+            }
+        return {
+            'window_ms': self.window * 1000,
+            'max_batch_size': self.max_batch_size,
+            'queue_size': self._queue.qsize(),
+            'by_batch_size': by_size
+        }
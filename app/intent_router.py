@@ -0,0 +1,208 @@
+"""
+Roteador de intenções compartilhado por todos os agentes
+
+As palavras-chave de todas as intenções são compiladas uma única vez em uma
+regex combinada. A pergunta é normalizada (minúsculas, sem acentos) e
+percorrida em uma única passada, em vez de várias buscas
+`any(word in question ...)` por chamada; o resultado é memorizado por pergunta.
+Os agentes em português e o agente profissional (inglês) usam conjuntos de
+palavras-chave separados, como antes do roteador.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, Mapping, Sequence, Tuple, Any
+
+def _build_accent_table() -> Dict[int, str]:
+    """Tabela de tradução dos caracteres latinos acentuados para a forma sem acento"""
+    table = {}
+    for code in range(0x00C0, 0x0180):
+        decomposed = unicodedata.normalize("NFKD", chr(code))
+        folded = "".join(char for char in decomposed if not unicodedata.combining(char))
+        if folded != chr(code):
+            table[code] = folded
+    return table
+
+_ACCENT_TABLE = _build_accent_table()
+
+def fold_accents(text: str) -> str:
+    """Remove acentos (ex.: 'último mês' -> 'ultimo mes')"""
+    if text.isascii():
+        return text
+    return text.translate(_ACCENT_TABLE)
+
+def normalize_text(text: str) -> str:
+    """Normaliza o texto para classificação: minúsculas, sem acentos e espaços simples"""
+    return " ".join(fold_accents(text.lower()).split())
+
+# Palavras-chave com até este número de letras casam apenas a palavra inteira
+SHORT_KEYWORD_LENGTH = 4
+
+def _keyword_pattern(keyword: str) -> str:
+    """Padrão da palavra-chave normalizada, ancorado no fim se ela for curta"""
+    pattern = re.escape(keyword)
+    if len(keyword) <= SHORT_KEYWORD_LENGTH:
+        pattern += r"\b"
+    return pattern
+
+class IntentRouter:
+    """
+    Autômato de palavras-chave compilado em uma única regex
+
+    Cada palavra-chave aponta para os rótulos de intenção que ativa; uma única
+    passada `findall` sobre o texto normalizado retorna todos os rótulos. As
+    palavras-chave casam no início de uma palavra ('produto' casa 'produtos');
+    as curtas (até SHORT_KEYWORD_LENGTH letras) só casam a palavra inteira,
+    pois sem acentos 'mes' seria prefixo de 'mesmo' e 'ano' de 'anonymous'.
+    """
+
+    def __init__(self, rules: Mapping[str, Iterable[str]]):
+        keyword_labels: Dict[str, set] = {}
+        for label, keywords in rules.items():
+            for keyword in keywords:
+                keyword_labels.setdefault(normalize_text(keyword), set()).add(label)
+
+        # Uma palavra-chave longa também ativa os rótulos das que ela contém
+        # (ex.: 'produto mais vendido' contém 'produto' e 'mais vendido')
+        for keyword, labels in keyword_labels.items():
+            for other, other_labels in keyword_labels.items():
+                if other != keyword and re.search(r"\b" + _keyword_pattern(other), keyword):
+                    labels |= other_labels
+
+        self._labels = {keyword: frozenset(labels) for keyword, labels in keyword_labels.items()}
+        alternatives = sorted(self._labels, key=len, reverse=True)
+        self._regex = re.compile(r"\b(?:" + "|".join(_keyword_pattern(keyword) for keyword in alternatives) + ")")
+
+    def labels(self, normalized: str) -> FrozenSet[str]:
+        """Retorna todos os rótulos ativados pelo texto já normalizado"""
+        found = self._regex.findall(normalized)
+        if not found:
+            return frozenset()
+        return frozenset().union(*(self._labels[keyword] for keyword in found))
+
+def _first_label(labels: FrozenSet[str], prefix: str, priority: Sequence[str], default=None):
+    """Retorna o primeiro rótulo da lista de prioridade presente no conjunto"""
+    for name in priority:
+        if prefix + name in labels:
+            return name
+    return default
+
+# Palavras-chave por rótulo; o prefixo indica o classificador que usa o rótulo
+INTENT_RULES: Dict[str, Sequence[str]] = {
+    # Tipos de pergunta do SalesInsightsAI, em português (em ordem de prioridade)
+    'type:top_products': ['mais vendido', 'top', 'melhor', 'maior'],
+    'type:summary': ['total', 'soma', 'receita', 'faturamento'],
+    'type:customer_analysis': ['cliente', 'comprador'],
+    'type:time_analysis': ['período', 'mês', 'semana', 'ano'],
+
+    # Períodos de tempo mencionados na pergunta
+    'period:last_week': ['última semana', 'semana passada'],
+    'period:last_month': ['último mês', 'mês passado'],
+    'period:today': ['hoje'],
+
+    # Palavras-chave que caracterizam uma pergunta sobre vendas (validação RAG),
+    # uma lista por idioma do agente
+    'sales:pt': [
+        'venda', 'produto', 'cliente', 'receita', 'faturamento', 'total',
+        'quantidade', 'valor', 'mês', 'semana', 'período', 'data',
+        'mais vendido', 'top', 'melhor', 'maior', 'menor', 'resumo', 'relatório'
+    ],
+    'sales:en': [
+        'sales', 'revenue', 'product', 'customer', 'client',
+        'profit', 'margin', 'performance', 'growth', 'trend',
+        'analysis', 'insight', 'report', 'summary', 'top',
+        'best', 'worst', 'total', 'average', 'conversion',
+        'roi', 'kpi', 'metric', 'dashboard', 'forecast'
+    ],
+
+    # Sinais usados para escolher a consulta analítica do agente profissional (inglês)
+    'analytics:product': ['product'],
+    'analytics:top': ['top', 'best'],
+    'analytics:summary': ['summary', 'overview', 'report'],
+    'analytics:customer': ['customer', 'client'],
+    'analytics:lifetime': ['lifetime', 'all time', 'all-time', 'ever'],
+    'analytics:trend': ['trend', 'growth', 'performance'],
+
+    # Consultas RAG do agente LangChain em português
+    'rag:top_products': ['produto mais vendido', 'top produto'],
+    'rag:summary': ['resumo', 'total'],
+    'rag:last_week': ['última semana', 'semana passada']
+}
+
+QUESTION_TYPES = ('top_products', 'summary', 'customer_analysis', 'time_analysis')
+TIME_PERIODS = ('last_week', 'last_month', 'today')
+ANALYTICS_TYPES = ('summary', 'customer', 'trend')
+RAG_QUERY_TYPES = ('top_products', 'summary', 'last_week')
+
+LANGUAGES = ('pt', 'en')
+
+# Perguntas genéricas rejeitadas mesmo contendo palavras-chave (força RAG)
+GENERIC_QUESTION_RES = {
+    'pt': re.compile(
+        r"^(?:"
+        r"(?:oi|ola|hello|hi)\b"
+        r"|(?:como voce esta|tudo bem|como vai)"
+        r"|(?:qual e seu nome|quem e voce)"
+        r"|(?:o que e|defina|explique)(?!.*venda)"
+        r"|(?:conte-me sobre)(?!.*venda)"
+        r")"
+    ),
+    'en': re.compile(
+        r"^(?:"
+        r"(?:hello|hi|hey)\b"
+        r"|(?:how are you|what's up)"
+        r"|(?:what is your name|who are you)"
+        r"|(?:define|explain)(?!.*sales)"
+        r"|(?:tell me about)(?!.*sales)"
+        r")"
+    )
+}
+
+# Roteador global, compilado uma única vez na importação
+router = IntentRouter(INTENT_RULES)
+
+@lru_cache(maxsize=4096)
+def route(question: str) -> Tuple[str, FrozenSet[str]]:
+    """Normaliza a pergunta e retorna (texto normalizado, rótulos ativados)"""
+    normalized = normalize_text(question)
+    return normalized, router.labels(normalized)
+
+def analyze_question(question: str) -> Dict[str, Any]:
+    """Analisa a intenção da pergunta (tipo e período de tempo)"""
+    _, labels = route(question)
+    return {
+        'type': _first_label(labels, 'type:', QUESTION_TYPES, 'general'),
+        'entities': [],
+        'time_period': _first_label(labels, 'period:', TIME_PERIODS),
+        'metric': None
+    }
+
+def is_sales_question(question: str, language: str = 'pt') -> bool:
+    """
+    Valida se a pergunta é sobre vendas e não é uma pergunta genérica,
+    usando as palavras-chave do idioma do agente ('pt' ou 'en')
+    """
+    if language not in LANGUAGES:
+        raise ValueError(f"Idioma não suportado: {language}")
+    normalized, labels = route(question)
+    if 'sales:' + language not in labels:
+        return False
+    return GENERIC_QUESTION_RES[language].match(normalized) is None
+
+def classify_analytics(question: str) -> str:
+    """
+    Retorna 'product', 'summary', 'customer' (últimos 30 dias),
+    'customer_lifetime' (todo o histórico, pedido explicitamente), 'trend' ou 'default'
+    """
+    _, labels = route(question)
+    if 'analytics:product' in labels and 'analytics:top' in labels:
+        return 'product'
+    analytics_type = _first_label(labels, 'analytics:', ANALYTICS_TYPES, 'default')
+    if analytics_type == 'customer' and 'analytics:lifetime' in labels:
+        return 'customer_lifetime'
+    return analytics_type
+
+def classify_rag_query(question: str) -> str:
+    """Retorna 'top_products', 'summary', 'last_week' ou 'general'"""
+    _, labels = route(question)
+    return _first_label(labels, 'rag:', RAG_QUERY_TYPES, 'general')
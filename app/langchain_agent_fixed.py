@@ -3,7 +3,6 @@ Agente LangChain para processamento de perguntas sobre vendas - VERSÃO CORRIGID
 Implementa RAG (Retrieval-Augmented Generation) conforme requisitos do teste técnico
 """
 import os
-import re
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 from sqlalchemy.orm import Session
@@ -11,11 +10,8 @@ from sqlalchemy import text, create_engine
 
 # LangChain imports
 from langchain.agents import create_sql_agent
-from langchain.agents.agent_toolkits import SQLDatabaseToolkit
-from langchain.sql_database import SQLDatabase
 from langchain.llms.fake import FakeListLLM
 from langchain.schema import BaseMessage, HumanMessage, AIMessage
-from langchain.memory import ConversationBufferMemory
 from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
 
@@ -33,7 +29,29 @@ except ImportError:
     LLAMA_AVAILABLE = False
 
 from app.database import engine
-from app import crud
+from app import crud, intent_router
+from app.analytics_queries import run_analytics_query, compiled_sql
+from app.schema_cache import SQL_AGENT_PREFIX, get_sql_database
+from app.sql_result_cache import CachedSQLDatabaseToolkit, sql_result_cache
+from app.sql_plan_cache import run_sql_agent_with_plans, sql_plan_cache
+
+# Consulta do registro, janela e nomes das colunas em português por tipo de pergunta
+RAG_QUERY_SPECS = {
+    'top_products': ('top_products', {'days': 30, 'limit': 5}, {
+        'name': 'produto_nome', 'sku': 'sku', 'category': 'categoria', 'price': 'preco',
+        'total_quantity': 'total_quantidade', 'total_revenue': 'total_receita', 'total_orders': 'total_pedidos'
+    }),
+    'summary': ('sales_overview', {}, {
+        'total_sales': 'total_vendas', 'total_revenue': 'receita_total', 'products_sold': 'total_produtos',
+        'active_customers': 'total_clientes', 'average_order_value': 'ticket_medio'
+    }),
+    'last_week': ('top_products', {'days': 7, 'limit': 10}, {
+        'name': 'produto_nome', 'total_quantity': 'quantidade_vendida', 'total_revenue': 'receita'
+    }),
+    'general': ('period_totals', {'days': 30}, {
+        'total_sales': 'total_vendas', 'total_revenue': 'receita_total'
+    })
+}
 
 class SalesLangChainAgent:
     """
@@ -42,7 +60,6 @@ class SalesLangChainAgent:
     """
     
     def __init__(self):
-        self.database_url = os.getenv("DATABASE_URL", "sqlite:///./sales.db")
         self.use_openai = os.getenv("USE_OPENAI", "False").lower() == "true"
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
         
@@ -50,15 +67,14 @@ class SalesLangChainAgent:
         self.db = None
         self.llm = None
         self.agent = None
-        self.memory = ConversationBufferMemory(memory_key="chat_history")
         
         self._initialize_components()
     
     def _initialize_components(self):
         """Inicializa os componentes do LangChain"""
         try:
-            # Conecta ao banco de dados via LangChain
-            self.db = SQLDatabase.from_uri(self.database_url)
+            # Conecta ao banco via LangChain (engine da aplicação, esquema em cache)
+            self.db = get_sql_database()
             print("✅ Banco de dados conectado via LangChain")
             
             # Inicializa LLM
@@ -94,58 +110,42 @@ class SalesLangChainAgent:
     def _create_sql_agent(self):
         """Cria o agente SQL do LangChain"""
         try:
-            # Cria toolkit SQL
-            toolkit = SQLDatabaseToolkit(db=self.db, llm=self.llm)
+            # Cria toolkit SQL (resultados da ferramenta de consulta em cache)
+            toolkit = CachedSQLDatabaseToolkit(db=self.db, llm=self.llm)
             
             # Cria agente SQL
             self.agent = create_sql_agent(
                 llm=self.llm,
                 toolkit=toolkit,
+                prefix=SQL_AGENT_PREFIX,
                 verbose=True,
                 handle_parsing_errors=True,
                 max_iterations=3,
-                early_stopping_method="generate"
+                early_stopping_method="generate",
+                agent_executor_kwargs={"return_intermediate_steps": True}
             )
             print("✅ Agente SQL LangChain criado")
         except Exception as e:
             print(f"❌ Erro ao criar agente SQL: {e}")
             self.agent = None
     
+    def run_sql_agent(self, question: str, db_session: Session) -> Dict[str, Any]:
+        """
+        Executa o agente SQL do LangChain na sessão da requisição
+        Perguntas com plano guardado executam o SQL diretamente, sem o LLM
+        Retorna a resposta e as linhas do SQL validado, se veio de um plano e os acertos do cache SQL
+        """
+        if self.agent is None:
+            raise RuntimeError("Agente SQL indisponível")
+        
+        return run_sql_agent_with_plans(self.agent, question, db_session, crud.get_data_version(db_session))
+    
     def _validate_question(self, question: str) -> bool:
         """
         Valida se a pergunta é sobre vendas e força o uso de RAG
         Implementa limitação conforme requisito do PDF
         """
-        question_lower = question.lower()
-        
-        # Palavras-chave relacionadas a vendas
-        sales_keywords = [
-            'venda', 'vendas', 'produto', 'produtos', 'cliente', 'clientes',
-            'receita', 'faturamento', 'total', 'quantidade', 'valor',
-            'mês', 'semana', 'período', 'data', 'mais vendido', 'top',
-            'melhor', 'maior', 'menor', 'resumo', 'relatório'
-        ]
-        
-        # Verifica se contém pelo menos uma palavra-chave de vendas
-        has_sales_keyword = any(keyword in question_lower for keyword in sales_keywords)
-        
-        if not has_sales_keyword:
-            return False
-        
-        # Verifica se não é uma pergunta genérica (força RAG)
-        generic_patterns = [
-            r'^(oi|olá|hello|hi)\b',
-            r'^(como você está|tudo bem|como vai)',
-            r'^(qual é seu nome|quem é você)',
-            r'^(o que é|defina|explique)(?!.*venda)',
-            r'^(conte-me sobre)(?!.*venda)'
-        ]
-        
-        for pattern in generic_patterns:
-            if re.match(pattern, question_lower):
-                return False
-        
-        return True
+        return intent_router.is_sales_question(question)
     
     def _execute_safe_sql_query(self, db_session: Session, query_intent: str) -> Dict[str, Any]:
         """
@@ -153,77 +153,19 @@ class SalesLangChainAgent:
         Implementa RAG forçando busca direta no banco
         """
         try:
-            if "produto mais vendido" in query_intent or "top produto" in query_intent:
-                # Query para produtos mais vendidos
-                query = """
-                SELECT 
-                    p.name as produto_nome,
-                    p.sku,
-                    p.category as categoria,
-                    p.price as preco,
-                    SUM(s.quantity) as total_quantidade,
-                    SUM(s.total_amount) as total_receita,
-                    COUNT(s.id) as total_pedidos
-                FROM products p
-                JOIN sales s ON p.id = s.product_id
-                WHERE s.sale_date >= date('now', '-30 days')
-                GROUP BY p.id, p.name, p.sku, p.category, p.price
-                ORDER BY total_quantidade DESC
-                LIMIT 5
-                """
-                
-            elif "resumo" in query_intent or "total" in query_intent:
-                # Query para resumo geral
-                query = """
-                SELECT 
-                    COUNT(DISTINCT s.id) as total_vendas,
-                    SUM(s.total_amount) as receita_total,
-                    COUNT(DISTINCT p.id) as total_produtos,
-                    COUNT(DISTINCT c.id) as total_clientes,
-                    AVG(s.total_amount) as ticket_medio
-                FROM sales s
-                JOIN products p ON s.product_id = p.id
-                JOIN customers c ON s.customer_id = c.id
-                """
-                
-            elif "última semana" in query_intent or "semana passada" in query_intent:
-                # Query para dados da última semana
-                query = """
-                SELECT 
-                    p.name as produto_nome,
-                    SUM(s.quantity) as quantidade_vendida,
-                    SUM(s.total_amount) as receita
-                FROM products p
-                JOIN sales s ON p.id = s.product_id
-                WHERE s.sale_date >= date('now', '-7 days')
-                GROUP BY p.id, p.name
-                ORDER BY quantidade_vendida DESC
-                LIMIT 10
-                """
-                
-            else:
-                # Query padrão para análise geral
-                query = """
-                SELECT 
-                    'Análise Geral' as tipo,
-                    COUNT(s.id) as total_vendas,
-                    SUM(s.total_amount) as receita_total
-                FROM sales s
-                WHERE s.sale_date >= date('now', '-30 days')
-                """
-            
-            # Executa a query
-            result = db_session.execute(text(query))
-            columns = result.keys()
-            rows = result.fetchall()
+            query_type = intent_router.classify_rag_query(query_intent)
+            query_name, window, columns = RAG_QUERY_SPECS[query_type]
             
-            # Converte para lista de dicionários
-            data = [dict(zip(columns, row)) for row in rows]
+            # Executa a consulta pré-compilada do registro e traduz as colunas
+            rows = run_analytics_query(db_session, query_name, **window)
+            data = [{columns[key]: value for key, value in row.items() if key in columns} for row in rows]
+            if query_type == 'general':
+                data = [{'tipo': 'Análise Geral', **item} for item in data]
             
             return {
                 'success': True,
                 'data': data,
-                'query_executed': query,
+                'query_executed': compiled_sql(query_name),
                 'row_count': len(data)
             }
             
@@ -253,10 +195,10 @@ class SalesLangChainAgent:
         if not data:
             return "📊 Não foram encontrados dados para sua consulta no período especificado."
         
-        question_lower = question.lower()
+        query_type = intent_router.classify_rag_query(question)
         
         # Formata resposta baseada no tipo de pergunta
-        if "produto mais vendido" in question_lower or "top produto" in question_lower:
+        if query_type == 'top_products':
             response = "🏆 **Produtos Mais Vendidos (Último Mês):**\n\n"
             for i, item in enumerate(data[:5], 1):
                 produto_nome = self._safe_get(item, 'produto_nome', 'N/A')
@@ -274,7 +216,7 @@ class SalesLangChainAgent:
             
             response += f"📈 *Dados extraídos diretamente do banco de dados ({query_result['row_count']} registros processados)*"
             
-        elif "resumo" in question_lower or "total" in question_lower:
+        elif query_type == 'summary':
             item = data[0]
             total_vendas = self._safe_get(item, 'total_vendas', 0)
             receita_total = self._safe_get(item, 'receita_total', 0.0)
@@ -292,7 +234,7 @@ class SalesLangChainAgent:
 
 💡 *Análise baseada em consulta direta ao banco de dados de vendas*"""
             
-        elif "última semana" in question_lower or "semana passada" in question_lower:
+        elif query_type == 'last_week':
             response = "📅 **Vendas da Última Semana:**\n\n"
             for i, item in enumerate(data[:5], 1):
                 produto_nome = self._safe_get(item, 'produto_nome', 'N/A')
@@ -392,6 +334,8 @@ Posso responder apenas perguntas específicas sobre dados de vendas.
             'llm_type': type(self.llm).__name__ if self.llm else None,
             'rag_enforced': True,
             'validation_active': True,
+            'sql_result_cache': sql_result_cache.stats(),
+            'sql_plan_cache': sql_plan_cache.stats(),
             'supported_queries': [
                 'Produtos mais vendidos',
                 'Resumo de vendas',
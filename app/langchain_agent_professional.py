@@ -6,24 +6,67 @@ Advanced AI agent for sales data analysis using LangChain + OpenAI GPT + RAG arc
 Provides professional-grade business intelligence insights from sales databases.
 """
 import os
-import re
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterator, List, Optional, Tuple, Any
 from sqlalchemy.orm import Session
 from sqlalchemy import text, create_engine
 
 # LangChain imports
 from langchain.agents import create_sql_agent
-from langchain.agents.agent_toolkits import SQLDatabaseToolkit
-from langchain.sql_database import SQLDatabase
 from langchain.llms import OpenAI
 from langchain.schema import BaseMessage, HumanMessage, AIMessage
-from langchain.memory import ConversationBufferMemory
 from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
 
 from app.database import engine
-from app import crud
+from app import crud, intent_router
+from app.answer_cache import answer_cache, ANSWER_CACHE_ENABLED
+from app.analytics_queries import run_analytics_query, compiled_sql
+from app.analytics_snapshots import analytics_snapshots, ANALYTICS_SNAPSHOTS_ENABLED
+from app.approximate_analytics import approximate_analytics, APPROX_ANALYTICS_ENABLED
+from app.prompt_packer import PackedPrompt, pack_prompt
+from app.schema_cache import SQL_AGENT_PREFIX, get_sql_database
+from app.conversation_memory import SessionMemoryStore, format_history
+from app.sql_result_cache import CachedSQLDatabaseToolkit, sql_result_cache
+from app.sql_plan_cache import run_sql_agent_with_plans, sql_plan_cache
+
+# Registry query executed for each analytics type
+ANALYTICS_QUERY_BY_TYPE = {
+    'product': 'top_products_detailed',
+    'summary': 'executive_summary',
+    'customer': 'customer_ranking',
+    'customer_lifetime': 'customer_stats_ranking',
+    'trend': 'daily_trend',
+    'default': 'period_overview'
+}
+
+# Column used to keep the most relevant rows when the prompt exceeds its token budget
+PROMPT_RANK_COLUMN = {
+    'product': 'total_revenue',
+    'customer': 'total_spent',
+    'customer_lifetime': 'total_spent'
+}
+
+# Answer returned for questions outside the sales analytics scope
+QUERY_VALIDATION_MESSAGE = """QUERY VALIDATION ERROR
+
+This system is designed for sales data analysis only. Please submit queries related to:
+
+SUPPORTED ANALYSIS TYPES:
+- Sales performance summaries
+- Product performance analysis
+- Customer behavior insights
+- Revenue trend analysis
+- Market share calculations
+- Business intelligence reports
+
+EXAMPLE QUERIES:
+- "Provide a comprehensive sales summary"
+- "Analyze top-performing products"
+- "Generate customer segmentation analysis"
+- "Show revenue trends and growth patterns"
+
+System configured with RAG (Retrieval-Augmented Generation) for data-driven insights."""
 
 class ProfessionalSalesLangChainAgent:
     """
@@ -41,7 +84,6 @@ class ProfessionalSalesLangChainAgent:
     
     def __init__(self):
         """Initialize the professional sales intelligence agent."""
-        self.database_url = os.getenv("DATABASE_URL", "sqlite:///./sales.db")
         self.use_openai = os.getenv("USE_OPENAI", "False").lower() == "true"
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
         
@@ -49,15 +91,15 @@ class ProfessionalSalesLangChainAgent:
         self.db = None
         self.llm = None
         self.agent = None
-        self.memory = ConversationBufferMemory(memory_key="chat_history")
+        self.memory = SessionMemoryStore()  # bounded per-session conversation history
         
         self._initialize_components()
     
     def _initialize_components(self):
         """Initialize LangChain components with OpenAI integration."""
         try:
-            # Connect to database via LangChain
-            self.db = SQLDatabase.from_uri(self.database_url)
+            # Connect via LangChain, sharing the app engine and cached schema info
+            self.db = get_sql_database()
             print("Database connected successfully via LangChain")
             
             # Initialize OpenAI LLM
@@ -102,23 +144,47 @@ class ProfessionalSalesLangChainAgent:
     def _create_sql_agent(self):
         """Create LangChain SQL agent with OpenAI integration."""
         try:
-            # Create SQL toolkit
-            toolkit = SQLDatabaseToolkit(db=self.db, llm=self.llm)
+            # Create SQL toolkit (query tool results cached per data version)
+            toolkit = CachedSQLDatabaseToolkit(db=self.db, llm=self.llm)
             
             # Create SQL agent with advanced configuration
             self.agent = create_sql_agent(
                 llm=self.llm,
                 toolkit=toolkit,
+                prefix=SQL_AGENT_PREFIX,
                 verbose=True,
                 handle_parsing_errors=True,
                 max_iterations=3,
-                early_stopping_method="generate"
+                early_stopping_method="generate",
+                agent_executor_kwargs={"return_intermediate_steps": True}
             )
             print("SQL Agent created successfully with OpenAI integration")
         except Exception as e:
             print(f"Error creating SQL agent: {e}")
             self.agent = None
     
+    def run_sql_agent(self, question: str, db_session: Session) -> Dict[str, Any]:
+        """
+        Run the LangChain SQL agent on a question.
+        
+        Questions matching a stored question-to-SQL plan run the stored SQL
+        directly, skipping the LLM round trip.
+        
+        Args:
+            question: Business question from user
+            db_session: Database session of the request (runs the SQL and
+                provides the data version for the SQL result cache)
+            
+        Returns:
+            Dict: Answer and rows of the validated SQL, the SQL used, whether
+            a stored plan answered it, the agent's own text and the SQL
+            result cache hits/misses of this run
+        """
+        if self.agent is None:
+            raise RuntimeError("SQL agent is not available")
+        
+        return run_sql_agent_with_plans(self.agent, question, db_session, crud.get_data_version(db_session))
+    
     def _validate_sales_query(self, question: str) -> bool:
         """
         Validate if the question is sales-related and enforce RAG pattern.
@@ -129,188 +195,70 @@ class ProfessionalSalesLangChainAgent:
         Returns:
             bool: True if valid sales query, False otherwise
         """
-        question_lower = question.lower()
-        
-        # Sales-related keywords
-        sales_keywords = [
-            'sales', 'revenue', 'product', 'customer', 'client',
-            'profit', 'margin', 'performance', 'growth', 'trend',
-            'analysis', 'insight', 'report', 'summary', 'top',
-            'best', 'worst', 'total', 'average', 'conversion',
-            'roi', 'kpi', 'metric', 'dashboard', 'forecast'
-        ]
-        
-        # Check for sales keywords
-        has_sales_keyword = any(keyword in question_lower for keyword in sales_keywords)
-        
-        if not has_sales_keyword:
-            return False
-        
-        # Reject generic queries (enforce RAG)
-        generic_patterns = [
-            r'^(hello|hi|hey)\b',
-            r'^(how are you|what\'s up)',
-            r'^(what is your name|who are you)',
-            r'^(define|explain)(?!.*sales)',
-            r'^(tell me about)(?!.*sales)'
-        ]
-        
-        for pattern in generic_patterns:
-            if re.match(pattern, question_lower):
-                return False
+        return intent_router.is_sales_question(question, language='en')
+    
+    def _classify_analytics_intent(self, query_intent: str) -> str:
+        """
+        Map a lowercased question to one of the analytics query types.
         
-        return True
+        Args:
+            query_intent: Lowercased user question
+            
+        Returns:
+            str: 'product', 'summary', 'customer' (last 30 days),
+            'customer_lifetime', 'trend' or 'default'
+        """
+        return intent_router.classify_analytics(query_intent)
     
-    def _execute_advanced_analytics_query(self, db_session: Session, query_intent: str) -> Dict[str, Any]:
+    def _execute_advanced_analytics_query(
+        self,
+        db_session: Session,
+        query_intent: str,
+        approximate: bool = False,
+        data_version: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Execute advanced SQL queries for comprehensive sales analytics.
         
         Args:
             db_session: Database session
             query_intent: Analyzed intent from user question
+            approximate: Answer from HyperLogLog sketches and sampled sums when supported
+            data_version: Current data version; a snapshot taken at another
+                version is still served within its staleness bound but is
+                flagged as not cacheable
             
         Returns:
             Dict containing query results and metadata
         """
         try:
-            if "product" in query_intent and ("top" in query_intent or "best" in query_intent):
-                # Advanced product performance analysis
-                query = """
-                SELECT 
-                    p.name as product_name,
-                    p.sku,
-                    p.category,
-                    p.price as unit_price,
-                    SUM(s.quantity) as total_quantity_sold,
-                    SUM(s.total_amount) as total_revenue,
-                    COUNT(s.id) as total_orders,
-                    AVG(s.quantity) as avg_quantity_per_order,
-                    AVG(s.total_amount) as avg_order_value,
-                    MIN(s.sale_date) as first_sale_date,
-                    MAX(s.sale_date) as last_sale_date,
-                    ROUND(SUM(s.total_amount) * 100.0 / (
-                        SELECT SUM(total_amount) FROM sales 
-                        WHERE sale_date >= date('now', '-30 days')
-                    ), 2) as revenue_percentage,
-                    COUNT(DISTINCT s.customer_id) as unique_customers,
-                    ROUND(SUM(s.total_amount) / COUNT(DISTINCT s.customer_id), 2) as revenue_per_customer,
-                    julianday('now') - julianday(MAX(s.sale_date)) as days_since_last_sale
-                FROM products p
-                JOIN sales s ON p.id = s.product_id
-                WHERE s.sale_date >= date('now', '-30 days')
-                GROUP BY p.id, p.name, p.sku, p.category, p.price
-                ORDER BY total_quantity_sold DESC
-                LIMIT 10
-                """
-                
-            elif "summary" in query_intent or "overview" in query_intent or "report" in query_intent:
-                # Comprehensive executive summary
-                query = """
-                SELECT 
-                    COUNT(DISTINCT s.id) as total_transactions,
-                    SUM(s.total_amount) as total_revenue,
-                    COUNT(DISTINCT p.id) as products_sold,
-                    COUNT(DISTINCT c.id) as active_customers,
-                    AVG(s.total_amount) as average_order_value,
-                    SUM(s.quantity) as total_items_sold,
-                    MAX(s.total_amount) as highest_sale,
-                    MIN(s.total_amount) as lowest_sale,
-                    ROUND(AVG(s.quantity), 2) as avg_items_per_sale,
-                    ROUND(SUM(s.total_amount) / COUNT(DISTINCT c.id), 2) as revenue_per_customer,
-                    (SELECT p2.name FROM products p2 
-                     JOIN sales s2 ON p2.id = s2.product_id 
-                     WHERE s2.sale_date >= date('now', '-30 days') 
-                     GROUP BY p2.id ORDER BY SUM(s2.quantity) DESC LIMIT 1) as top_product_by_quantity,
-                    (SELECT c2.name FROM customers c2 
-                     JOIN sales s2 ON c2.id = s2.customer_id 
-                     WHERE s2.sale_date >= date('now', '-30 days') 
-                     GROUP BY c2.id ORDER BY SUM(s2.total_amount) DESC LIMIT 1) as top_customer,
-                    (SELECT COUNT(*) FROM sales WHERE sale_date >= date('now', '-7 days')) as sales_last_week,
-                    (SELECT SUM(total_amount) FROM sales WHERE sale_date >= date('now', '-7 days')) as revenue_last_week
-                FROM sales s
-                JOIN products p ON s.product_id = p.id
-                JOIN customers c ON s.customer_id = c.id
-                WHERE s.sale_date >= date('now', '-30 days')
-                """
-                
-            elif "customer" in query_intent or "client" in query_intent:
-                # Customer analysis and segmentation
-                query = """
-                SELECT 
-                    c.name as customer_name,
-                    c.email as customer_email,
-                    COUNT(s.id) as total_purchases,
-                    SUM(s.total_amount) as total_spent,
-                    AVG(s.total_amount) as average_order_value,
-                    SUM(s.quantity) as total_items_purchased,
-                    MIN(s.sale_date) as first_purchase_date,
-                    MAX(s.sale_date) as last_purchase_date,
-                    julianday('now') - julianday(MAX(s.sale_date)) as days_since_last_purchase,
-                    ROUND(SUM(s.total_amount) * 100.0 / (
-                        SELECT SUM(total_amount) FROM sales 
-                        WHERE sale_date >= date('now', '-30 days')
-                    ), 2) as revenue_contribution_percentage,
-                    COUNT(DISTINCT s.product_id) as unique_products_purchased
-                FROM customers c
-                JOIN sales s ON c.id = s.customer_id
-                WHERE s.sale_date >= date('now', '-30 days')
-                GROUP BY c.id, c.name, c.email
-                ORDER BY total_spent DESC
-                LIMIT 15
-                """
-                
-            elif "trend" in query_intent or "growth" in query_intent or "performance" in query_intent:
-                # Trend analysis and performance metrics
-                query = """
-                SELECT 
-                    DATE(s.sale_date) as sale_date,
-                    COUNT(s.id) as daily_transactions,
-                    SUM(s.total_amount) as daily_revenue,
-                    SUM(s.quantity) as daily_items_sold,
-                    AVG(s.total_amount) as daily_avg_order_value,
-                    COUNT(DISTINCT s.customer_id) as daily_unique_customers,
-                    COUNT(DISTINCT s.product_id) as daily_unique_products
-                FROM sales s
-                WHERE s.sale_date >= date('now', '-30 days')
-                GROUP BY DATE(s.sale_date)
-                ORDER BY sale_date DESC
-                LIMIT 30
-                """
-                
+            analytics_type = self._classify_analytics_intent(query_intent)
+            query_name = ANALYTICS_QUERY_BY_TYPE[analytics_type]
+            
+            # Approximate mode (opt-in) answers distinct counts and sums from
+            # sketches; queries it does not cover fall through to the exact path
+            estimate = None
+            if approximate and APPROX_ANALYTICS_ENABLED:
+                estimate = approximate_analytics.query(db_session, query_name)
+            
+            # Read the scheduled snapshot when fresh enough, otherwise run the
+            # precompiled registry query (last 30 days)
+            snapshot = None
+            if estimate is not None:
+                data = estimate['rows']
             else:
-                # Default comprehensive analysis
-                query = """
-                SELECT 
-                    'Comprehensive Sales Analysis' as analysis_type,
-                    COUNT(s.id) as total_sales,
-                    SUM(s.total_amount) as total_revenue,
-                    AVG(s.total_amount) as average_order_value,
-                    COUNT(DISTINCT s.product_id) as products_in_sales,
-                    COUNT(DISTINCT s.customer_id) as active_customers,
-                    SUM(s.quantity) as total_items,
-                    MAX(s.total_amount) as peak_sale_value,
-                    MIN(s.total_amount) as minimum_sale_value,
-                    DATE('now') as analysis_date,
-                    'Last 30 days' as analysis_period,
-                    ROUND(SUM(s.total_amount) / 30.0, 2) as daily_average_revenue,
-                    ROUND(COUNT(s.id) / 30.0, 2) as daily_average_transactions
-                FROM sales s
-                WHERE s.sale_date >= date('now', '-30 days')
-                """
-            
-            # Execute query
-            result = db_session.execute(text(query))
-            columns = result.keys()
-            rows = result.fetchall()
-            
-            # Convert to list of dictionaries
-            data = [dict(zip(columns, row)) for row in rows]
+                snapshot = analytics_snapshots.get(query_name) if ANALYTICS_SNAPSHOTS_ENABLED else None
+                data = snapshot['rows'] if snapshot else run_analytics_query(db_session, query_name)
             
             return {
                 'success': True,
                 'data': data,
-                'query_executed': query,
+                'query_executed': compiled_sql(query_name),
                 'row_count': len(data),
+                'snapshot_age_seconds': snapshot['age_seconds'] if snapshot else None,
+                'cacheable': snapshot is None or data_version is None or snapshot['data_version'] == data_version,
+                'approximate': estimate is not None,
+                'error_bounds': estimate['error_bounds'] if estimate else None,
                 'analysis_complexity': 'Advanced Professional Analytics'
             }
             
@@ -323,42 +271,53 @@ class ProfessionalSalesLangChainAgent:
                 'row_count': 0
             }
     
+    def _answer_cache_intent(self, query_intent: str, approximate: bool) -> str:
+        """Intent part of the answer cache key; approximate answers are cached separately."""
+        intent = self._classify_analytics_intent(query_intent)
+        return f"{intent}|approximate" if approximate and APPROX_ANALYTICS_ENABLED else intent
+    
     def _safe_extract(self, item: dict, key: str, default=None):
         """Safely extract values from dictionary with null handling."""
         value = item.get(key, default)
         return value if value is not None else default
     
-    def _generate_professional_analysis(self, question: str, query_result: Dict[str, Any]) -> str:
+    def _build_analysis_prompt(
+        self,
+        question: str,
+        data: List[Dict[str, Any]],
+        history: Optional[List[Dict[str, str]]] = None
+    ) -> PackedPrompt:
         """
-        Generate professional business intelligence analysis using OpenAI GPT.
+        Build the business intelligence prompt sent to the LLM.
+        
+        The most relevant rows are packed into the token budget left after
+        reserving the LLM's max_tokens for the answer.
         
         Args:
             question: Original user question
-            query_result: Results from database query
+            data: Rows returned by the analytics query
+            history: Previous exchanges of the conversation session
             
         Returns:
-            str: Professional analysis report
+            PackedPrompt: Prompt for the analysis plus token/packing metrics
         """
-        if not query_result['success']:
-            return f"Error in data retrieval: {query_result['error']}"
-        
-        data = query_result['data']
-        if not data:
-            return "No data found for the specified analysis period."
-        
-        question_lower = question.lower()
+        analytics_type = self._classify_analytics_intent(question)
+        conversation = ""
+        if history:
+            conversation = f"""
+            CONVERSATION HISTORY (earlier in this session):
+{format_history(history)}
+"""
         
-        try:
-            # Prepare context for GPT analysis
-            context_data = str(data)[:2000]  # Limit context size
-            
-            # Professional analysis prompt
-            analysis_prompt = f"""
+        # Professional analysis prompt
+        def build_prompt(context_data: str) -> str:
+            return f"""
             As a senior business intelligence analyst, provide a comprehensive analysis of the following sales data:
-
+{conversation}
             BUSINESS QUESTION: {question}
             
-            DATA ANALYSIS RESULTS: {context_data}
+            DATA ANALYSIS RESULTS ({len(data)} rows):
+{context_data}
             
             REQUIREMENTS:
             1. Provide executive-level insights and strategic recommendations
@@ -376,39 +335,55 @@ class ProfessionalSalesLangChainAgent:
             
             PROFESSIONAL BUSINESS ANALYSIS:
             """
+        
+        return pack_prompt(
+            build_prompt,
+            data,
+            max_tokens=max(getattr(self.llm, 'max_tokens', 0) or 0, 0),
+            rank_by=PROMPT_RANK_COLUMN.get(analytics_type)
+        )
+    
+    def _format_data_sections(self, question: str, data: List[Dict[str, Any]]) -> Tuple[str, str]:
+        """
+        Format the structured data part of the report around the GPT analysis.
+        
+        Args:
+            question: Original user question
+            data: Rows returned by the analytics query
             
-            # Generate analysis using GPT
-            gpt_analysis = self.llm._call(analysis_prompt)
+        Returns:
+            Tuple[str, str]: Text placed before and after the GPT analysis
+        """
+        analytics_type = self._classify_analytics_intent(question)
+        
+        # Format response based on query type
+        if analytics_type == 'product':
+            header = "PRODUCT PERFORMANCE ANALYSIS\n\n"
             
-            # Format response based on query type
-            if "product" in question_lower and ("top" in question_lower or "best" in question_lower):
-                response = "PRODUCT PERFORMANCE ANALYSIS\n\n"
-                
-                # Structured data presentation
-                for i, item in enumerate(data[:5], 1):
-                    product_name = self._safe_extract(item, 'product_name', 'Unknown Product')
-                    total_quantity = self._safe_extract(item, 'total_quantity_sold', 0)
-                    total_revenue = self._safe_extract(item, 'total_revenue', 0.0)
-                    revenue_percentage = self._safe_extract(item, 'revenue_percentage', 0.0)
-                    unique_customers = self._safe_extract(item, 'unique_customers', 0)
-                    
-                    response += f"{i}. {product_name}\n"
-                    response += f"   Units Sold: {total_quantity:,}\n"
-                    response += f"   Revenue: ${total_revenue:,.2f}\n"
-                    response += f"   Market Share: {revenue_percentage:.1f}%\n"
-                    response += f"   Customer Base: {unique_customers} unique customers\n\n"
-                
-                # Add GPT analysis
-                response += f"STRATEGIC ANALYSIS:\n{gpt_analysis}\n"
-                
-            elif "summary" in question_lower or "overview" in question_lower:
-                item = data[0]
-                total_transactions = self._safe_extract(item, 'total_transactions', 0)
+            # Structured data presentation
+            for i, item in enumerate(data[:5], 1):
+                product_name = self._safe_extract(item, 'product_name', 'Unknown Product')
+                total_quantity = self._safe_extract(item, 'total_quantity_sold', 0)
                 total_revenue = self._safe_extract(item, 'total_revenue', 0.0)
-                average_order_value = self._safe_extract(item, 'average_order_value', 0.0)
-                active_customers = self._safe_extract(item, 'active_customers', 0)
+                revenue_percentage = self._safe_extract(item, 'revenue_percentage', 0.0)
+                unique_customers = self._safe_extract(item, 'unique_customers', 0)
                 
-                response = f"""EXECUTIVE SALES SUMMARY
+                header += f"{i}. {product_name}\n"
+                header += f"   Units Sold: {total_quantity:,}\n"
+                header += f"   Revenue: ${total_revenue:,.2f}\n"
+                header += f"   Market Share: {revenue_percentage:.1f}%\n"
+                header += f"   Customer Base: {unique_customers} unique customers\n\n"
+            
+            return header + "STRATEGIC ANALYSIS:\n", "\n"
+            
+        elif analytics_type == 'summary':
+            item = data[0]
+            total_transactions = self._safe_extract(item, 'total_transactions', 0)
+            total_revenue = self._safe_extract(item, 'total_revenue', 0.0)
+            average_order_value = self._safe_extract(item, 'average_order_value', 0.0)
+            active_customers = self._safe_extract(item, 'active_customers', 0)
+            
+            header = f"""EXECUTIVE SALES SUMMARY
 
 KEY PERFORMANCE INDICATORS:
 - Total Transactions: {total_transactions:,}
@@ -417,25 +392,58 @@ KEY PERFORMANCE INDICATORS:
 - Active Customer Base: {active_customers:,}
 
 BUSINESS INTELLIGENCE ANALYSIS:
-{gpt_analysis}
 """
-            else:
-                # General analysis format
-                response = f"COMPREHENSIVE BUSINESS ANALYSIS\n\n{gpt_analysis}"
+            return header, "\n"
+        
+        # General analysis format
+        return "COMPREHENSIVE BUSINESS ANALYSIS\n\n", ""
+    
+    def _generate_professional_analysis(
+        self,
+        question: str,
+        query_result: Dict[str, Any],
+        history: Optional[List[Dict[str, str]]] = None
+    ) -> str:
+        """
+        Generate professional business intelligence analysis using OpenAI GPT.
+        
+        Args:
+            question: Original user question
+            query_result: Results from database query
+            history: Previous exchanges of the conversation session
             
-            return response
+        Returns:
+            str: Professional analysis report
+        """
+        if not query_result['success']:
+            return f"Error in data retrieval: {query_result['error']}"
+        
+        data = query_result['data']
+        if not data:
+            return "No data found for the specified analysis period."
+        
+        try:
+            packed = self._build_analysis_prompt(question, data, history)
+            query_result['prompt_stats'] = packed.stats()
+            
+            # Generate analysis using GPT
+            gpt_analysis = self.llm._call(packed.prompt)
+            
+            header, footer = self._format_data_sections(question, data)
+            return header + gpt_analysis + footer
             
         except Exception as e:
             print(f"Error in GPT analysis: {e}")
-            # Fallback to structured analysis
+            # Fallback to structured analysis (not cached)
+            query_result['llm_failed'] = True
             return self._generate_fallback_analysis(question, query_result)
     
     def _generate_fallback_analysis(self, question: str, query_result: Dict[str, Any]) -> str:
         """Generate fallback analysis when GPT is unavailable."""
         data = query_result['data']
-        question_lower = question.lower()
+        analytics_type = self._classify_analytics_intent(question)
         
-        if "product" in question_lower and data:
+        if analytics_type == 'product' and data:
             response = "TOP PERFORMING PRODUCTS ANALYSIS\n\n"
             for i, item in enumerate(data[:5], 1):
                 product_name = self._safe_extract(item, 'product_name', 'Unknown')
@@ -446,7 +454,7 @@ BUSINESS INTELLIGENCE ANALYSIS:
             
             return response
             
-        elif "summary" in question_lower and data:
+        elif analytics_type == 'summary' and data:
             item = data[0]
             total_transactions = self._safe_extract(item, 'total_transactions', 0)
             total_revenue = self._safe_extract(item, 'total_revenue', 0.0)
@@ -455,13 +463,192 @@ BUSINESS INTELLIGENCE ANALYSIS:
         
         return "Professional sales analysis completed successfully."
     
-    def process_business_query(self, question: str, db_session: Session) -> Dict[str, Any]:
+    def _format_methodology_info(self, query_result: Dict[str, Any]) -> str:
+        """Format the methodology footer appended to every analysis."""
+        methodology_info = "\n\nMETHODOLOGY: LangChain + OpenAI GPT + RAG (Retrieval-Augmented Generation)"
+        methodology_info += f"\nQuery Complexity: {len(query_result.get('query_executed', '') or '')} characters"
+        methodology_info += f"\nRecords Analyzed: {query_result.get('row_count', 0)}"
+        if query_result.get('approximate'):
+            methodology_info += "\nApproximation: HyperLogLog distinct counts + sampled sums (95% error bounds)"
+        methodology_info += f"\nAI Model: OpenAI GPT (Professional Business Intelligence)"
+        methodology_info += f"\nAnalysis Quality: Enterprise-grade"
+        return methodology_info
+    
+    def stream_business_query(
+        self,
+        question: str,
+        db_session: Session,
+        session_id: Optional[str] = None,
+        approximate: bool = False
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming variant of process_business_query.
+        
+        The session's previous exchanges are included in the LLM prompt and
+        the streamed answer is recorded in its conversation memory once the
+        'done' event is reached.
+        
+        Args:
+            question: Business question from user
+            db_session: Database session for queries
+            session_id: Optional conversation session identifier
+            approximate: Use the approximate analytics mode when supported
+            
+        Yields:
+            Dict: 'data', 'token', 'done' or 'error' events
+        """
+        history = self.memory.history(session_id) if session_id else []
+        parts = []
+        for event in self._stream_business_answer(question, db_session, approximate, history):
+            if event['event'] in ('data', 'token'):
+                parts.append(event['text'])
+            elif event['event'] == 'done' and session_id:
+                self.memory.save_turn(session_id, question, "".join(parts))
+            yield event
+    
+    def _stream_business_answer(
+        self,
+        question: str,
+        db_session: Session,
+        approximate: bool = False,
+        history: Optional[List[Dict[str, str]]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Generate the streaming events for a business query.
+        
+        The structured data section is emitted as soon as the analytics query
+        returns; the GPT analysis follows token by token.
+        
+        Args:
+            question: Business question from user
+            db_session: Database session for queries
+            approximate: Use the approximate analytics mode when supported
+            history: Previous exchanges of the conversation session
+            
+        Yields:
+            Dict: 'data', 'token', 'done' or 'error' events
+        """
+        try:
+            if not self._validate_sales_query(question):
+                yield {'event': 'data', 'text': QUERY_VALIDATION_MESSAGE}
+                yield {'event': 'done', 'method_used': 'Query Validation + RAG Enforcement', 'cache_hit': False}
+                return
+            
+            query_intent = question.lower()
+            
+            # A follow-up answer depends on the conversation, so it bypasses the answer cache
+            cache_key = data_version = None
+            if ANSWER_CACHE_ENABLED and not history:
+                data_version = crud.get_data_version(db_session)
+                cache_key = answer_cache.make_key(
+                    question,
+                    self._answer_cache_intent(query_intent, approximate),
+                    data_version
+                )
+                cached = answer_cache.get(cache_key)
+                if cached is not None:
+                    yield {'event': 'data', 'text': cached['answer']}
+                    yield {'event': 'done', 'method_used': cached['method_used'], 'cache_hit': True}
+                    return
+            
+            query_result = self._execute_advanced_analytics_query(db_session, query_intent, approximate, data_version)
+            data = query_result['data']
+            
+            if not query_result['success'] or not data:
+                # Nothing to stream from the LLM; send the complete message at once
+                yield {'event': 'data', 'text': self._generate_professional_analysis(question, query_result, history)}
+                yield {'event': 'done', 'method_used': 'LangChain + OpenAI GPT + Advanced RAG', 'cache_hit': False}
+                return
+            
+            header, footer = self._format_data_sections(question, data)
+            yield {'event': 'data', 'text': header}
+            
+            packed = self._build_analysis_prompt(question, data, history)
+            
+            parts = []
+            try:
+                for token in self.llm.stream(packed.prompt):
+                    parts.append(token)
+                    yield {'event': 'token', 'text': token}
+                trailer = footer + self._format_methodology_info(query_result)
+            except Exception as e:
+                # Same fallback as process_business_query: structured analysis
+                print(f"Error in GPT analysis: {e}")
+                query_result['llm_failed'] = True
+                fallback = self._generate_fallback_analysis(question, query_result)
+                trailer = ("\n\n" if parts else "") + fallback + self._format_methodology_info(query_result)
+            yield {'event': 'token', 'text': trailer}
+            
+            # An answer built from a snapshot of an older data version, or
+            # from the fallback after an LLM failure, must not be cached
+            if cache_key is not None and query_result['cacheable'] and not query_result.get('llm_failed'):
+                answer_cache.set(cache_key, {
+                    'answer': header + "".join(parts) + trailer,
+                    'method_used': 'LangChain + OpenAI GPT + Advanced RAG',
+                    'data_source': 'Sales Database (Professional Analytics)',
+                    'professional_system': True,
+                    'rag_enforced': True,
+                    'query_success': True,
+                    'records_analyzed': query_result.get('row_count', 0),
+                    'analysis_quality': 'Enterprise-grade'
+                })
+            
+            yield {
+                'event': 'done',
+                'method_used': 'LangChain + OpenAI GPT + Advanced RAG',
+                'cache_hit': False,
+                'snapshot_age_seconds': query_result.get('snapshot_age_seconds'),
+                'approximate': query_result.get('approximate', False),
+                'error_bounds': query_result.get('error_bounds'),
+                'prompt': packed.stats()
+            }
+            
+        except Exception as e:
+            yield {'event': 'error', 'text': f"SYSTEM ERROR: {str(e)}"}
+    
+    def process_business_query(
+        self,
+        question: str,
+        db_session: Session,
+        session_id: Optional[str] = None,
+        approximate: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Process a business query within the session's conversation.
+        
+        The session's previous exchanges are included in the LLM prompt and
+        the answer is recorded in its conversation memory.
+        
+        Args:
+            question: Business question from user
+            db_session: Database session for queries
+            session_id: Optional conversation session identifier
+            approximate: Use the approximate analytics mode when supported
+            
+        Returns:
+            Dict: Comprehensive analysis results
+        """
+        history = self.memory.history(session_id) if session_id else []
+        result = self._answer_business_query(question, db_session, approximate, history)
+        if session_id:
+            self.memory.save_turn(session_id, question, result['answer'])
+        return result
+    
+    def _answer_business_query(
+        self,
+        question: str,
+        db_session: Session,
+        approximate: bool = False,
+        history: Optional[List[Dict[str, str]]] = None
+    ) -> Dict[str, Any]:
         """
         Process business intelligence queries using LangChain + OpenAI + RAG.
         
         Args:
             question: Business question from user
             db_session: Database session for queries
+            approximate: Use the approximate analytics mode when supported
+            history: Previous exchanges of the conversation session
             
         Returns:
             Dict: Comprehensive analysis results
@@ -471,25 +658,7 @@ BUSINESS INTELLIGENCE ANALYSIS:
             if not self._validate_sales_query(question):
                 return {
                     'question': question,
-                    'answer': """QUERY VALIDATION ERROR
-
-This system is designed for sales data analysis only. Please submit queries related to:
-
-SUPPORTED ANALYSIS TYPES:
-- Sales performance summaries
-- Product performance analysis
-- Customer behavior insights
-- Revenue trend analysis
-- Market share calculations
-- Business intelligence reports
-
-EXAMPLE QUERIES:
-- "Provide a comprehensive sales summary"
-- "Analyze top-performing products"
-- "Generate customer segmentation analysis"
-- "Show revenue trends and growth patterns"
-
-System configured with RAG (Retrieval-Augmented Generation) for data-driven insights.""",
+                    'answer': QUERY_VALIDATION_MESSAGE,
                     'method_used': 'Query Validation + RAG Enforcement',
                     'data_source': 'Input Validation System',
                     'timestamp': datetime.now(),
@@ -499,20 +668,35 @@ System configured with RAG (Retrieval-Augmented Generation) for data-driven insi
             # Analyze query intent
             query_intent = question.lower()
             
+            # Serve repeated questions from the answer cache; a follow-up answer
+            # depends on the conversation, so it bypasses the cache
+            cache_key = data_version = None
+            if ANSWER_CACHE_ENABLED and not history:
+                data_version = crud.get_data_version(db_session)
+                cache_key = answer_cache.make_key(
+                    question,
+                    self._answer_cache_intent(query_intent, approximate),
+                    data_version
+                )
+                cached = answer_cache.get(cache_key)
+                if cached is not None:
+                    cached.update({
+                        'question': question,
+                        'timestamp': datetime.now(),
+                        'cache_hit': True
+                    })
+                    return cached
+            
             # Execute advanced analytics query (RAG)
-            query_result = self._execute_advanced_analytics_query(db_session, query_intent)
+            query_result = self._execute_advanced_analytics_query(db_session, query_intent, approximate, data_version)
             
             # Generate professional analysis using GPT
-            analysis = self._generate_professional_analysis(question, query_result)
+            analysis = self._generate_professional_analysis(question, query_result, history)
             
             # Add methodology information
-            methodology_info = "\n\nMETHODOLOGY: LangChain + OpenAI GPT + RAG (Retrieval-Augmented Generation)"
-            methodology_info += f"\nQuery Complexity: {len(query_result.get('query_executed', '') or '')} characters"
-            methodology_info += f"\nRecords Analyzed: {query_result.get('row_count', 0)}"
-            methodology_info += f"\nAI Model: OpenAI GPT (Professional Business Intelligence)"
-            methodology_info += f"\nAnalysis Quality: Enterprise-grade"
+            methodology_info = self._format_methodology_info(query_result)
             
-            return {
+            result = {
                 'question': question,
                 'answer': analysis + methodology_info,
                 'method_used': 'LangChain + OpenAI GPT + Advanced RAG',
@@ -522,9 +706,26 @@ System configured with RAG (Retrieval-Augmented Generation) for data-driven insi
                 'rag_enforced': True,
                 'query_success': query_result['success'],
                 'records_analyzed': query_result.get('row_count', 0),
-                'analysis_quality': 'Enterprise-grade'
+                'analysis_quality': 'Enterprise-grade',
+                'cache_hit': False,
+                'snapshot_age_seconds': query_result.get('snapshot_age_seconds'),
+                'approximate': query_result.get('approximate', False),
+                'error_bounds': query_result.get('error_bounds'),
+                'prompt': query_result.get('prompt_stats')
             }
             
+            # Only successful GPT analyses of current data are cached
+            if (
+                cache_key is not None and query_result['success'] and query_result['cacheable']
+                and not query_result.get('llm_failed')
+            ):
+                answer_cache.set(cache_key, {
+                    key: value for key, value in result.items()
+                    if key not in ('question', 'timestamp', 'cache_hit', 'snapshot_age_seconds', 'prompt')
+                })
+            
+            return result
+            
         except Exception as e:
             return {
                 'question': question,
@@ -547,6 +748,13 @@ System configured with RAG (Retrieval-Augmented Generation) for data-driven insi
             'openai_configured': self.use_openai and bool(self.openai_api_key),
             'rag_pattern': 'Enforced',
             'query_validation': 'Active',
+            'answer_cache': answer_cache.stats(),
+            'schema_cache': self.db.stats() if self.db is not None else None,
+            'conversation_memory': self.memory.stats(),
+            'sql_result_cache': sql_result_cache.stats(),
+            'sql_plan_cache': sql_plan_cache.stats(),
+            'analytics_snapshots': analytics_snapshots.stats(),
+            'approximate_analytics': approximate_analytics.stats(),
             'analysis_capabilities': [
                 'Executive Sales Summaries',
                 'Product Performance Analysis',
@@ -0,0 +1,113 @@
+"""
+Caminho rápido de serialização das listagens (/products, /customers, /sales)
+
+Com `response_model=List[...]` o FastAPI carrega cada linha como objeto ORM
+(em /sales, com uma carga preguiçosa de produto e de cliente por venda),
+valida cada objeto em um modelo pydantic e codifica o resultado com o json
+da biblioteca padrão; em páginas de 1.000 linhas isso domina a CPU.
+
+Opcional (FAST_LIST_RESPONSES, requer orjson): lê tuplas do Core em uma única
+consulta (a página de vendas já juntada a produtos e clientes), monta os
+dicionários na ordem de campos dos schemas e serializa com orjson. O JSON é
+o mesmo do caminho validado: valores monetários como texto com duas casas
+(como o Decimal do pydantic) e datas em ISO 8601.
+
+Comparação com o caminho atual: benchmarks/bench_list_responses.py
+"""
+import os
+from typing import Any, Callable, Dict, List
+
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import bindparam, select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.money import format_cents
+
+try:
+    import orjson  # noqa: F401 (usado pelo ORJSONResponse)
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Configuração do caminho rápido
+FAST_LIST_RESPONSES = os.getenv("FAST_LIST_RESPONSES", "False").lower() == "true" and ORJSON_AVAILABLE
+
+products = models.Product.__table__
+customers = models.Customer.__table__
+sales = models.Sale.__table__
+
+SKIP = bindparam("skip")
+LIMIT = bindparam("limit")
+
+# Sem ORDER BY, como crud.get_products/get_customers/get_sales (ordem de rowid)
+_products_page = select(
+    products.c.sku, products.c.name, products.c.category, products.c.price_cents, products.c.id
+).offset(SKIP).limit(LIMIT)
+
+_customers_page = select(
+    customers.c.name, customers.c.email, customers.c.id, customers.c.created_at
+).offset(SKIP).limit(LIMIT)
+
+# A página é paginada antes das junções: a ordem e o OFFSET são os da tabela de vendas
+_sales = select(
+    sales.c.product_id, sales.c.customer_id, sales.c.quantity,
+    sales.c.total_amount_cents, sales.c.sale_date, sales.c.id
+).offset(SKIP).limit(LIMIT).subquery("page")
+
+_sales_page = select(
+    _sales,
+    products.c.sku, products.c.name, products.c.category, products.c.price_cents, products.c.id,
+    customers.c.name, customers.c.email, customers.c.id, customers.c.created_at
+).select_from(
+    _sales
+    .outerjoin(products, products.c.id == _sales.c.product_id)
+    .outerjoin(customers, customers.c.id == _sales.c.customer_id)
+)
+
+def _products(db: Session, params: Dict[str, int]) -> List[Dict[str, Any]]:
+    return [
+        {'sku': sku, 'name': name, 'category': category, 'price': format_cents(price), 'id': id_}
+        for sku, name, category, price, id_ in db.execute(_products_page, params)
+    ]
+
+def _customers(db: Session, params: Dict[str, int]) -> List[Dict[str, Any]]:
+    return [
+        {'name': name, 'email': email, 'id': id_, 'created_at': created_at}
+        for name, email, id_, created_at in db.execute(_customers_page, params)
+    ]
+
+def _sales_rows(db: Session, params: Dict[str, int]) -> List[Dict[str, Any]]:
+    return [
+        {
+            'product_id': product_id,
+            'customer_id': customer_id,
+            'quantity': quantity,
+            'total_amount': format_cents(cents),
+            'sale_date': sale_date,
+            'id': id_,
+            'product': None if p_id is None else {
+                'sku': sku, 'name': p_name, 'category': category, 'price': format_cents(price), 'id': p_id
+            },
+            'customer': None if c_id is None else {
+                'name': c_name, 'email': email, 'id': c_id, 'created_at': created_at
+            }
+        }
+        for (product_id, customer_id, quantity, cents, sale_date, id_,
+             sku, p_name, category, price, p_id,
+             c_name, email, c_id, created_at) in db.execute(_sales_page, params)
+    ]
+
+LIST_READERS: Dict[str, Callable[[Session, Dict[str, int]], List[Dict[str, Any]]]] = {
+    'products': _products,
+    'customers': _customers,
+    'sales': _sales_rows,
+}
+
+def read_list(db: Session, resource: str, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+    """Linhas de uma listagem já no formato de resposta (sem modelos pydantic)"""
+    return LIST_READERS[resource](db, {'skip': skip, 'limit': limit})
+
+def list_response(db: Session, resource: str, skip: int = 0, limit: int = 100) -> ORJSONResponse:
+    """Resposta da listagem serializada com orjson (ignora o response_model do endpoint)"""
+    return ORJSONResponse(read_list(db, resource, skip, limit))
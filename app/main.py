@@ -4,15 +4,27 @@ Aplicação principal FastAPI para Sales Insights AI
 import os
 from datetime import datetime
 from typing import List, Optional
-from fastapi import FastAPI, Depends, HTTPException, Query
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from dotenv import load_dotenv
 
-from app.database import get_db, create_tables
+from app.database import SessionLocal, get_db
 from app import models, schemas, crud
+from app.streaming import to_sse, SSE_HEADERS
+from app.process_memory import process_memory
+from app.top_products_tracker import top_products_tracker
+from app.columnar_engine import columnar_engine, COLUMNAR_ENGINE_ENABLED
+from app.sales_archive import sales_archive
+from app.customer_stats import ensure_customer_stats
+from app.migrations import run_migrations
+from app.list_responses import FAST_LIST_RESPONSES, list_response
+from app.compression import CompressionMiddleware, compression_stats
+from app.frontend_assets import frontend_assets
+from app.prompt_packer import load_tokenizer
 
 # Carrega variáveis de ambiente
 load_dotenv()
@@ -39,20 +51,43 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compressão gzip/brotli das respostas (COMPRESSION_*)
+app.add_middleware(CompressionMiddleware)
+
 # Monta arquivos estáticos
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# Cria tabelas no banco de dados na inicialização
+# Cria tabelas e aplica migrações no banco de dados na inicialização
 @app.on_event("startup")
 async def startup_event():
     """Evento executado na inicialização da aplicação"""
-    create_tables()
+    run_migrations()
+    frontend_assets.ensure_loaded()
+    load_tokenizer()
+    # Agregados de clientes e contadores do ranking de produtos (já carregados se pré-carregados pelo app.server)
+    with SessionLocal() as db:
+        ensure_customer_stats(db)
+        top_products_tracker.ensure_loaded(db)
+        if COLUMNAR_ENGINE_ENABLED:
+            columnar_engine.ensure_loaded(db)
 
-# Rota principal - serve o frontend
+# Rota principal - serve o frontend (em memória, pré-comprimido)
 @app.get("/", include_in_schema=False)
-async def read_root():
+async def read_root(request: Request):
     """Serve a página principal do frontend"""
-    return FileResponse("frontend/index.html")
+    response = frontend_assets.response(request, "index.html")
+    if response is None:
+        raise HTTPException(status_code=404, detail="Frontend não encontrado")
+    return response
+
+# Demais assets do frontend, pelo nome simples ou pelo nome com hash
+@app.get("/assets/{name:path}", include_in_schema=False)
+async def read_asset(name: str, request: Request):
+    """Serve um asset do frontend com ETag e cache de longa duração nos nomes com hash"""
+    response = frontend_assets.response(request, name)
+    if response is None:
+        raise HTTPException(status_code=404, detail="Asset não encontrado")
+    return response
 
 # Endpoint de saúde da API
 @app.get("/health", response_model=schemas.HealthResponse)
@@ -72,6 +107,8 @@ async def get_products(
     db: Session = Depends(get_db)
 ):
     """Lista todos os produtos"""
+    if FAST_LIST_RESPONSES:
+        return list_response(db, "products", skip, limit)
     products = crud.get_products(db, skip=skip, limit=limit)
     return products
 
@@ -83,6 +120,8 @@ async def get_customers(
     db: Session = Depends(get_db)
 ):
     """Lista todos os clientes"""
+    if FAST_LIST_RESPONSES:
+        return list_response(db, "customers", skip, limit)
     customers = crud.get_customers(db, skip=skip, limit=limit)
     return customers
 
@@ -94,6 +133,8 @@ async def get_sales(
     db: Session = Depends(get_db)
 ):
     """Lista todas as vendas"""
+    if FAST_LIST_RESPONSES:
+        return list_response(db, "sales", skip, limit)
     sales = crud.get_sales(db, skip=skip, limit=limit)
     return sales
 
@@ -104,6 +145,16 @@ async def get_sales_summary(db: Session = Depends(get_db)):
     summary = crud.get_sales_summary(db)
     return summary
 
+# Endpoint para relatório mensal de longo prazo
+@app.get("/sales/monthly-report")
+async def get_monthly_sales_report(
+    start_date: datetime,
+    end_date: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+):
+    """Retorna transações, receita e itens por mês (tabela quente + arquivo Parquet)"""
+    return crud.get_monthly_sales_report(db, start_date, end_date or datetime.now())
+
 # Endpoint para top produtos (implementação básica)
 @app.get("/top-products", response_model=schemas.TopProductsResponse)
 async def get_top_products(
@@ -140,14 +191,18 @@ async def get_sales_insights(
     try:
         from app.ai_agent import sales_ai_agent
         
-        # Processa a pergunta usando o agente de IA
-        result = sales_ai_agent.process_question(question, db)
+        # Processa a pergunta usando o agente de IA (fora do event loop, permitindo
+        # que requisições concorrentes sejam agrupadas pelo micro-batching)
+        result = await run_in_threadpool(sales_ai_agent.process_question, question, db)
         
         return schemas.SalesInsightResponse(
             question=result['question'],
             answer=result['answer'],
             data_source=f"{result['data_source']} (via {result['model_used']})",
-            timestamp=result['timestamp']
+            timestamp=result['timestamp'],
+            cache_hit=result.get('cache_hit', False),
+            prompt_tokens=result.get('prompt_tokens'),
+            timings=result.get('timings')
         )
     
     except Exception as e:
@@ -176,6 +231,77 @@ async def get_sales_insights(
             timestamp=datetime.now()
         )
 
+# Endpoint para insights de vendas em streaming (SSE)
+@app.get("/sales-insights/stream")
+async def stream_sales_insights(
+    question: str = Query(..., description="Pergunta sobre as vendas"),
+    db: Session = Depends(get_db)
+):
+    """
+    Versão em streaming de /sales-insights
+    Envia a tabela de dados imediatamente e depois os tokens do LLM (text/event-stream)
+    """
+    from app.ai_agent import sales_ai_agent
+    
+    return StreamingResponse(
+        to_sse(sales_ai_agent.stream_question(question, db)),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+# Endpoint para estatísticas de inferência do modelo local
+@app.get("/system/inference-stats")
+async def get_inference_stats():
+    """Retorna a vazão da inferência local por tamanho de lote"""
+    from app.ai_agent import sales_ai_agent
+    return sales_ai_agent.get_inference_stats()
+
+# Endpoint para uso de memória do worker
+@app.get("/system/process-stats")
+async def get_process_stats():
+    """Retorna a memória residente e compartilhada do worker que atendeu a requisição"""
+    return process_memory()
+
+# Endpoint para a economia de banda da compressão
+@app.get("/system/compression-stats")
+async def get_compression_stats():
+    """Retorna bytes economizados e CPU gasta pela compressão das respostas neste worker"""
+    return compression_stats.stats()
+
+# Endpoint para os assets do frontend em memória
+@app.get("/system/frontend-stats")
+async def get_frontend_stats():
+    """Retorna os assets do frontend carregados, tamanhos por codificação e revalidações"""
+    return frontend_assets.stats()
+
+# Endpoint para registrar vendas
+@app.post("/sales", response_model=schemas.Sale, status_code=201)
+async def create_sale(sale: schemas.SaleCreate, db: Session = Depends(get_db)):
+    """Registra uma venda (o ranking de produtos em memória é atualizado)"""
+    if crud.get_product(db, product_id=sale.product_id) is None:
+        raise HTTPException(status_code=404, detail="Produto não encontrado")
+    if crud.get_customer(db, customer_id=sale.customer_id) is None:
+        raise HTTPException(status_code=404, detail="Cliente não encontrado")
+    return crud.create_sale(db, sale)
+
+# Endpoint para estatísticas do ranking de produtos em memória
+@app.get("/system/top-products-stats")
+async def get_top_products_stats():
+    """Retorna o estado e a latência do ranking incremental de produtos"""
+    return top_products_tracker.stats()
+
+# Endpoint para estatísticas do motor colunar
+@app.get("/system/columnar-stats")
+async def get_columnar_stats():
+    """Retorna o tamanho, a memória e a latência do motor analítico colunar"""
+    return columnar_engine.stats()
+
+# Endpoint para estatísticas do arquivo frio de vendas
+@app.get("/system/archive-stats")
+async def get_archive_stats():
+    """Retorna os meses, arquivos e tamanho do arquivo Parquet de vendas"""
+    return sales_archive.stats()
+
 # Endpoint para buscar produto por ID
 @app.get("/products/{product_id}", response_model=schemas.Product)
 async def get_product(product_id: int, db: Session = Depends(get_db)):
@@ -6,9 +6,9 @@ Advanced sales intelligence system using FastAPI, LangChain, and OpenAI GPT
 for professional business analytics and insights generation.
 """
 
-from fastapi import FastAPI, Depends, HTTPException, Query
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, FileResponse, StreamingResponse, JSONResponse
 from sqlalchemy.orm import Session
 from typing import Dict, Any, Optional
 import os
@@ -18,6 +18,21 @@ from datetime import datetime
 from app.database import SessionLocal, engine
 from app import models, crud
 from app.langchain_agent_professional import professional_sales_agent
+from app.streaming import to_sse, SSE_HEADERS
+from app.sql_plan_cache import sql_plan_cache
+from app.process_memory import process_memory
+from app.top_products_tracker import top_products_tracker
+from app.columnar_engine import columnar_engine, COLUMNAR_ENGINE_ENABLED
+from app.analytics_snapshots import (
+    snapshot_scheduler, ANALYTICS_SNAPSHOTS_ENABLED, ANALYTICS_SNAPSHOT_SCHEDULER
+)
+from app.analytics_queries import ANALYTICS_QUERIES, run_analytics_query
+from app.approximate_analytics import approximate_analytics, APPROX_ANALYTICS_ENABLED
+from app.customer_stats import ensure_customer_stats
+from app.migrations import run_migrations
+from app.compression import CompressionMiddleware, compression_stats
+from app.frontend_assets import frontend_assets
+from app.prompt_packer import load_tokenizer
 
 # Create database tables
 models.Base.metadata.create_all(bind=engine)
@@ -31,6 +46,9 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+# Compress responses (gzip/brotli, see COMPRESSION_* settings)
+app.add_middleware(CompressionMiddleware)
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -44,22 +62,36 @@ def get_db():
         db.close()
 
 @app.get("/", response_class=HTMLResponse)
-async def get_dashboard():
+async def get_dashboard(request: Request):
     """
     Serve the main dashboard interface.
     
+    The page is held in memory with precompressed variants (see
+    app.frontend_assets) and revalidated through its ETag.
+    
     Returns:
         HTMLResponse: Professional sales dashboard
     """
-    try:
-        with open("frontend/index.html", "r", encoding="utf-8") as file:
-            html_content = file.read()
-        return HTMLResponse(content=html_content)
-    except FileNotFoundError:
+    response = frontend_assets.response(request, "index.html")
+    if response is None:
         return HTMLResponse(
             content="<h1>Sales Insights AI</h1><p>Dashboard interface not found.</p>",
             status_code=404
         )
+    return response
+
+@app.get("/assets/{name:path}", include_in_schema=False)
+async def get_asset(name: str, request: Request):
+    """
+    Serve a frontend asset from memory.
+    
+    Content-hashed names (see frontend_assets.asset_url) are cached for a
+    year; plain names revalidate through their ETag.
+    """
+    response = frontend_assets.response(request, name)
+    if response is None:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    return response
 
 @app.get("/health")
 async def health_check():
@@ -86,6 +118,8 @@ async def health_check():
 @app.get("/sales-insights")
 async def get_sales_insights(
     question: str = Query(..., description="Business intelligence question about sales data"),
+    session_id: Optional[str] = Query(None, max_length=128, description="Conversation session identifier"),
+    approximate: bool = Query(False, description="Answer from HyperLogLog sketches and sampled sums (±error bounds)"),
     db: Session = Depends(get_db)
 ) -> Dict[str, Any]:
     """
@@ -96,6 +130,8 @@ async def get_sales_insights(
     
     Args:
         question: Business intelligence question
+        session_id: Optional conversation session identifier
+        approximate: Use the approximate analytics mode when supported
         db: Database session
         
     Returns:
@@ -106,7 +142,7 @@ async def get_sales_insights(
     """
     try:
         # Process query using professional AI agent
-        result = professional_sales_agent.process_business_query(question, db)
+        result = professional_sales_agent.process_business_query(question, db, session_id, approximate)
         
         return {
             "question": result["question"],
@@ -114,6 +150,11 @@ async def get_sales_insights(
             "data_source": result["data_source"],
             "method_used": result["method_used"],
             "timestamp": result["timestamp"],
+            "cache_hit": result.get("cache_hit", False),
+            "snapshot_age_seconds": result.get("snapshot_age_seconds"),
+            "approximate": result.get("approximate", False),
+            "error_bounds": result.get("error_bounds"),
+            "prompt": result.get("prompt"),
             "system_info": {
                 "developer": "João Gabriel de Araujo Diniz",
                 "system": "Sales Insights AI Professional",
@@ -128,6 +169,74 @@ async def get_sales_insights(
             detail=f"Error processing sales insights query: {str(e)}"
         )
 
+@app.get("/sales-insights/stream")
+async def stream_sales_insights(
+    question: str = Query(..., description="Business intelligence question about sales data"),
+    session_id: Optional[str] = Query(None, max_length=128, description="Conversation session identifier"),
+    approximate: bool = Query(False, description="Answer from HyperLogLog sketches and sampled sums (±error bounds)"),
+    db: Session = Depends(get_db)
+) -> StreamingResponse:
+    """
+    Stream professional sales insights as Server-Sent Events.
+    
+    The structured data section is sent immediately, followed by the
+    GPT analysis tokens as they are generated.
+    
+    Args:
+        question: Business intelligence question
+        session_id: Optional conversation session identifier
+        approximate: Use the approximate analytics mode when supported
+        db: Database session
+        
+    Returns:
+        StreamingResponse: text/event-stream with data, token and done events
+    """
+    return StreamingResponse(
+        to_sse(professional_sales_agent.stream_business_query(question, db, session_id, approximate)),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+@app.get("/sales-insights/sql")
+async def get_sql_insights(
+    question: str = Query(..., description="Business question answered by a SQL query over the sales tables"),
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """
+    Answer a question with the LangChain SQL agent.
+    
+    Questions matching a stored question-to-SQL plan run the stored SQL
+    directly; otherwise the agent writes the query and the validated SQL is
+    stored as a plan. Both paths return the rows of the validated SQL.
+    
+    Args:
+        question: Business question
+        db: Database session
+        
+    Returns:
+        Dict: Answer table, rows, SQL used, plan hit and the agent's own text
+    """
+    try:
+        result = professional_sales_agent.run_sql_agent(question, db)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing SQL agent query: {str(e)}"
+        )
+    
+    return {
+        "question": question,
+        "answer": result["answer"],
+        "rows": result["rows"],
+        "sql": result["sql"],
+        "plan_hit": result["plan_hit"],
+        "agent_output": result["agent_output"],
+        "sql_cache": result["sql_cache"],
+        "timestamp": datetime.now()
+    }
+
 @app.get("/top-products")
 async def get_top_products(
     limit: int = Query(10, ge=1, le=50, description="Number of top products to return"),
@@ -144,8 +253,8 @@ async def get_top_products(
         Dict: Top products with performance metrics
     """
     try:
-        # Get top products using CRUD operations
-        top_products = crud.get_top_products(db, limit=limit)
+        # Top products of the last 30 days (served by the in-memory tracker)
+        top_products = crud.get_top_products_last_month(db, limit=limit)
         
         if not top_products:
             return {
@@ -160,11 +269,13 @@ async def get_top_products(
         products_data = []
         for product in top_products:
             products_data.append({
-                "product_name": product.name,
-                "sku": product.sku,
-                "category": product.category,
-                "unit_price": float(product.price),
-                "total_sales": "Calculated from sales data",
+                "product_name": product["name"],
+                "sku": product["sku"],
+                "category": product["category"],
+                "unit_price": float(product["price"] or 0),
+                "total_quantity": product["total_quantity"],
+                "total_revenue": product["total_revenue"],
+                "total_orders": product["total_orders"],
                 "performance_rank": len(products_data) + 1
             })
         
@@ -187,6 +298,52 @@ async def get_top_products(
             detail=f"Error retrieving top products: {str(e)}"
         )
 
+@app.get("/analytics/{query_name}")
+async def get_analytics(
+    query_name: str,
+    days: int = Query(30, ge=1, le=365, description="Analysis window in days"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Maximum number of rows"),
+    approximate: bool = Query(False, description="Answer from HyperLogLog sketches and sampled sums (±error bounds)"),
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """
+    Run a registry analytics query for dashboards.
+    
+    With approximate=true, executive_summary, top_products_detailed and
+    period_overview are answered from the in-memory sketches, with the 95%
+    error bound of each estimated column; other queries, and windows longer
+    than the sketches keep, run exactly.
+    
+    Args:
+        query_name: Registry query name (e.g. executive_summary)
+        days: Analysis window in days
+        limit: Maximum number of rows
+        approximate: Use the approximate analytics mode when supported
+        db: Database session
+        
+    Returns:
+        Dict: Rows, whether they are approximate and their error bounds
+    """
+    if query_name not in ANALYTICS_QUERIES:
+        raise HTTPException(status_code=404, detail="Analytics query not found")
+    
+    estimate = None
+    if approximate and APPROX_ANALYTICS_ENABLED:
+        estimate = approximate_analytics.query(db, query_name, days=days, limit=limit)
+    if estimate is not None:
+        return {"query": query_name, "days": days, "approximate": True, **estimate}
+    
+    start = datetime.now()
+    rows = run_analytics_query(db, query_name, days=days, limit=limit)
+    return {
+        "query": query_name,
+        "days": days,
+        "approximate": False,
+        "rows": rows,
+        "error_bounds": None,
+        "elapsed_ms": round((datetime.now() - start).total_seconds() * 1000, 2)
+    }
+
 @app.get("/system-status")
 async def get_system_status() -> Dict[str, Any]:
     """
@@ -209,6 +366,11 @@ async def get_system_status() -> Dict[str, Any]:
                 "framework": "FastAPI",
                 "python_version": "3.11+"
             },
+            "process": process_memory(),
+            "top_products_tracker": top_products_tracker.stats(),
+            "columnar_engine": columnar_engine.stats(),
+            "compression": compression_stats.stats(),
+            "frontend_assets": frontend_assets.stats(),
             "ai_system": agent_status,
             "database": {
                 "type": "SQLite",
@@ -230,6 +392,34 @@ async def get_system_status() -> Dict[str, Any]:
             "timestamp": datetime.now()
         }
 
+@app.get("/admin/sql-plans")
+async def list_sql_plans() -> Dict[str, Any]:
+    """
+    List the stored question-to-SQL plans used by the SQL agent.
+    
+    Returns:
+        Dict: Plan cache statistics and every stored plan with its hit rate
+    """
+    return {
+        "stats": sql_plan_cache.stats(),
+        "plans": sql_plan_cache.plans()
+    }
+
+@app.delete("/admin/sql-plans/{plan_id}")
+async def delete_sql_plan(plan_id: int) -> Dict[str, Any]:
+    """
+    Remove a stored question-to-SQL plan.
+    
+    Args:
+        plan_id: Identifier of the plan
+        
+    Returns:
+        Dict: Deletion confirmation
+    """
+    if not sql_plan_cache.delete(plan_id):
+        raise HTTPException(status_code=404, detail="SQL plan not found")
+    return {"deleted": plan_id}
+
 @app.get("/api-documentation")
 async def get_api_documentation() -> Dict[str, Any]:
     """
@@ -249,10 +439,31 @@ async def get_api_documentation() -> Dict[str, Any]:
                 "method": "GET",
                 "description": "Generate AI-powered sales insights",
                 "parameters": {
-                    "question": "Business intelligence question (required)"
+                    "question": "Business intelligence question (required)",
+                    "approximate": "Answer from sketches with error bounds (optional, default: false)"
                 },
                 "example": "/sales-insights?question=Analyze top performing products"
             },
+            "sql_insights": {
+                "path": "/sales-insights/sql",
+                "method": "GET",
+                "description": "Answer with the LangChain SQL agent (stored SQL plans skip the LLM)",
+                "parameters": {
+                    "question": "Business question (required)"
+                },
+                "example": "/sales-insights/sql?question=top 5 produtos por receita"
+            },
+            "analytics": {
+                "path": "/analytics/{query_name}",
+                "method": "GET",
+                "description": "Run a registry analytics query for dashboards",
+                "parameters": {
+                    "days": "Analysis window in days (optional, default: 30)",
+                    "limit": "Maximum number of rows (optional)",
+                    "approximate": "Answer from sketches with error bounds (optional, default: false)"
+                },
+                "example": "/analytics/executive_summary?days=90&approximate=true"
+            },
             "top_products": {
                 "path": "/top-products",
                 "method": "GET",
@@ -286,22 +497,22 @@ async def get_api_documentation() -> Dict[str, Any]:
 @app.exception_handler(404)
 async def not_found_handler(request, exc):
     """Handle 404 errors."""
-    return {
+    return JSONResponse(status_code=404, content={
         "error": "Resource not found",
         "message": "The requested endpoint does not exist",
         "developer": "João Gabriel de Araujo Diniz",
         "system": "Sales Insights AI Professional"
-    }
+    })
 
 @app.exception_handler(500)
 async def internal_error_handler(request, exc):
     """Handle 500 errors."""
-    return {
+    return JSONResponse(status_code=500, content={
         "error": "Internal server error",
         "message": "An unexpected error occurred during processing",
         "developer": "João Gabriel de Araujo Diniz",
         "system": "Sales Insights AI Professional"
-    }
+    })
 
 # Application metadata
 @app.on_event("startup")
@@ -311,11 +522,24 @@ async def startup_event():
     print("Developer: João Gabriel de Araujo Diniz")
     print("System: FastAPI + LangChain + OpenAI GPT")
     print("Architecture: RAG (Retrieval-Augmented Generation)")
+    run_migrations()
+    frontend_assets.ensure_loaded()
+    load_tokenizer()
+    if ANALYTICS_SNAPSHOTS_ENABLED and ANALYTICS_SNAPSHOT_SCHEDULER:
+        snapshot_scheduler.start()
+    with SessionLocal() as db:
+        ensure_customer_stats(db)
+        top_products_tracker.ensure_loaded(db)
+        if COLUMNAR_ENGINE_ENABLED:
+            columnar_engine.ensure_loaded(db)
+        if APPROX_ANALYTICS_ENABLED:
+            approximate_analytics.ensure_loaded(db)
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Application shutdown event."""
     print("Sales Insights AI Professional - Shutting down...")
+    snapshot_scheduler.stop()
     print("Developed by: João Gabriel de Araujo Diniz")
 
 if __name__ == "__main__":
@@ -0,0 +1,181 @@
+"""
+Migrações incrementais do esquema do banco
+
+`create_all` só cria tabelas ausentes: colunas e índices acrescentados a
+tabelas que já existem são aplicados aqui. Cada passo confere o esquema atual
+antes de alterar, então as migrações podem rodar a cada inicialização (as
+aplicações e o pré-carregamento do app.server as executam) ou manualmente:
+
+    python -m app.migrations
+"""
+import time
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import Column, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateColumn
+
+from app import models
+
+sales = models.Sale.__table__
+products = models.Product.__table__
+customer_stats = models.CustomerStats.__table__
+data_version = models.DataVersion.__table__
+
+# Tabelas cujas alterações mudam a versão dos dados (chave dos caches de respostas)
+VERSIONED_TABLES = (sales.name, products.name, models.Customer.__tablename__)
+
+def _table_columns(connection: Connection, table: str) -> set:
+    # table_xinfo (e não table_info) também lista as colunas geradas
+    return {row[1] for row in connection.execute(text(f"PRAGMA table_xinfo({table})"))}
+
+def _indexes_using(connection: Connection, table: str, column: str) -> List[str]:
+    """Índices (criados por nós, não os automáticos) que contêm a coluna"""
+    names = [
+        row[1] for row in connection.execute(text(f"PRAGMA index_list({table})"))
+        if not row[1].startswith("sqlite_autoindex")
+    ]
+    return [
+        name for name in names
+        if column in {row[2] for row in connection.execute(text(f"PRAGMA index_xinfo({name})"))}
+    ]
+
+def _add_sale_time_columns(connection: Connection) -> List[str]:
+    """
+    Acrescenta sale_epoch e sale_day a `sales`
+
+    O ALTER TABLE do SQLite só aceita colunas geradas VIRTUAL: os valores são
+    calculados na leitura e o preenchimento das linhas existentes acontece na
+    construção do índice (_create_missing_indexes), que avalia a expressão de
+    cada venda.
+    """
+    applied = []
+    existing = _table_columns(connection, sales.name)
+    for column in (sales.c.sale_epoch, sales.c.sale_day):
+        if column.name not in existing:
+            ddl = CreateColumn(column).compile(dialect=connection.dialect)
+            connection.execute(text(f"ALTER TABLE {sales.name} ADD COLUMN {ddl}"))
+            applied.append(f"coluna sales.{column.name}")
+    return applied
+
+def _convert_to_cents(connection: Connection, column: Column, legacy: str) -> List[str]:
+    """
+    Troca a coluna monetária `legacy` (NUMERIC em reais) pela coluna inteira em centavos
+
+    A coluna nova é preenchida com ROUND(valor * 100) e a antiga é removida
+    (ALTER TABLE ... DROP COLUMN, SQLite 3.35+) junto com os índices que a
+    usam; a verificação é pela coluna antiga, então uma execução interrompida
+    antes do DROP é refeita por completo.
+    """
+    table = column.table.name
+    existing = _table_columns(connection, table)
+    if legacy not in existing:
+        return []
+
+    if column.name not in existing:
+        not_null = " NOT NULL DEFAULT 0" if not column.nullable else ""
+        connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column.name} INTEGER{not_null}"))
+    connection.execute(text(
+        f"UPDATE {table} SET {column.name} = CAST(ROUND({legacy} * 100) AS INTEGER) WHERE {legacy} IS NOT NULL"
+    ))
+    for index in _indexes_using(connection, table, legacy):
+        connection.execute(text(f"DROP INDEX {index}"))
+    connection.execute(text(f"ALTER TABLE {table} DROP COLUMN {legacy}"))
+    return [f"{table}.{legacy} -> {table}.{column.name}"]
+
+def _store_money_in_cents(connection: Connection) -> List[str]:
+    """
+    Preços e valores de venda em centavos inteiros
+
+    customer_stats guarda só agregados derivados de `sales`: com o total em
+    reais ela é recriada vazia e recarregada por ensure_customer_stats. Os
+    planos SQL guardados referem as colunas antigas e são descartados.
+    """
+    applied = _convert_to_cents(connection, sales.c.total_amount_cents, "total_amount")
+    applied += _convert_to_cents(connection, products.c.price_cents, "price")
+    if "total_spent" in _table_columns(connection, customer_stats.name):
+        customer_stats.drop(connection)
+        customer_stats.create(connection)
+        applied.append("customer_stats recriada em centavos")
+    if applied:
+        from app.sql_plan_cache import sql_plan_cache
+        discarded = sql_plan_cache.clear()
+        applied.append(f"planos SQL descartados: {discarded}")
+    return applied
+
+def _create_missing_indexes(connection: Connection) -> List[str]:
+    """Cria os índices declarados nos modelos que ainda não existem no banco"""
+    applied = []
+    for table in models.Base.metadata.sorted_tables:
+        for index in table.indexes:
+            if not connection.dialect.has_index(connection, table.name, index.name):
+                index.create(connection)
+                applied.append(f"índice {index.name}")
+    return applied
+
+def _create_data_version_triggers(connection: Connection) -> List[str]:
+    """
+    Linha de data_version e gatilhos que a incrementam
+
+    crud.get_data_version passa a ler uma única linha em vez de contar as
+    tabelas a cada requisição, e UPDATEs também mudam a versão. A versão
+    inicial vem do relógio, para que um banco recriado não repita versões
+    (e respostas em cache) de um banco anterior.
+    """
+    applied = []
+    if connection.execute(text(f"SELECT 1 FROM {data_version.name} WHERE id = 1")).first() is None:
+        connection.execute(
+            text(f"INSERT INTO {data_version.name} (id, version) VALUES (1, :version)"),
+            {"version": int(time.time() * 1000)}
+        )
+        applied.append("versão dos dados inicializada")
+
+    existing = {
+        row[0] for row in connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'"))
+    }
+    for table in VERSIONED_TABLES:
+        for operation in ("INSERT", "UPDATE", "DELETE"):
+            name = f"data_version_{table}_{operation.lower()}"
+            if name in existing:
+                continue
+            connection.execute(text(
+                f"CREATE TRIGGER {name} AFTER {operation} ON {table} "
+                f"BEGIN UPDATE {data_version.name} SET version = version + 1 WHERE id = 1; END"
+            ))
+            applied.append(f"gatilho {name}")
+    return applied
+
+# Migrações na ordem de aplicação (a criação de índices sobre as colunas já
+# migradas; os gatilhos de versão por último, sem contar as migrações de dados)
+MIGRATIONS: Tuple[Callable[[Connection], List[str]], ...] = (
+    _add_sale_time_columns,
+    _store_money_in_cents,
+    _create_missing_indexes,
+    _create_data_version_triggers,
+)
+
+def run_migrations(bind: Optional[Engine] = None) -> List[str]:
+    """
+    Aplica as migrações pendentes
+
+    Returns:
+        List[str]: Alterações aplicadas (vazia se o esquema já estava atualizado)
+    """
+    if bind is None:
+        from app.database import engine as bind
+
+    models.Base.metadata.create_all(bind=bind)
+    applied = []
+    for migration in MIGRATIONS:
+        start = time.perf_counter()
+        with bind.begin() as connection:
+            changes = migration(connection)
+        if changes:
+            print(f"✅ Migração {migration.__name__.lstrip('_')}: {', '.join(changes)} ({(time.perf_counter() - start) * 1000:.0f} ms)")
+        applied.extend(changes)
+    return applied
+
+if __name__ == "__main__":
+    changes = run_migrations()
+    if not changes:
+        print("✅ Esquema já atualizado")
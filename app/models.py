@@ -1,10 +1,15 @@
 """
 Modelos de dados SQLAlchemy para o sistema de vendas
 """
-from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import Column, Computed, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
+from app.money import from_cents, to_cents
+from app.sql_time import epoch_seconds
 
 class Product(Base):
     """
@@ -16,11 +21,20 @@ class Product(Base):
     sku = Column(String(50), unique=True, nullable=False, index=True)
     name = Column(String(255), nullable=False)
     category = Column(String(100))
-    price = Column(Numeric(10, 2))
+    price_cents = Column(Integer)
     
     # Relacionamento com vendas
     sales = relationship("Sale", back_populates="product")
     
+    @property
+    def price(self) -> Optional[Decimal]:
+        """Preço em reais (gravado em centavos)"""
+        return from_cents(self.price_cents)
+    
+    @price.setter
+    def price(self, value):
+        self.price_cents = to_cents(value)
+    
     def __repr__(self):
         return f"<Product(id={self.id}, name='{self.name}', sku='{self.sku}')>"
 
@@ -51,13 +65,74 @@ class Sale(Base):
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
     customer_id = Column(Integer, ForeignKey("customers.id"), nullable=False)
     quantity = Column(Integer, nullable=False)
-    total_amount = Column(Numeric(10, 2), nullable=False)
+    total_amount_cents = Column(Integer, nullable=False)
     sale_date = Column(DateTime, nullable=False)
+    # Instante (segundos desde 1970, sem fuso) e dia da venda como inteiros,
+    # gerados a partir de sale_date: filtros de período viram faixas no
+    # índice e a série diária agrupa sem date() sobre o texto
+    sale_epoch = Column(Integer, Computed(epoch_seconds(sale_date)))
+    sale_day = Column(Integer, Computed(epoch_seconds(sale_date) // 86400))
     
     # Relacionamentos
     product = relationship("Product", back_populates="sales")
     customer = relationship("Customer", back_populates="sales")
     
+    __table_args__ = (
+        # Produtos já comprados por um cliente (produtos distintos em customer_stats)
+        Index("ix_sales_customer_product", "customer_id", "product_id"),
+        # Vendas em ordem de dia com todas as colunas lidas pelas análises: as
+        # janelas de período são lidas só do índice, sem acessar a tabela
+        Index(
+            "ix_sales_sale_day_covering",
+            "sale_day", "sale_epoch", "product_id", "customer_id", "quantity", "total_amount_cents", "sale_date"
+        ),
+    )
+    
+    @property
+    def total_amount(self) -> Optional[Decimal]:
+        """Valor da venda em reais (gravado em centavos)"""
+        return from_cents(self.total_amount_cents)
+    
+    @total_amount.setter
+    def total_amount(self, value):
+        self.total_amount_cents = to_cents(value)
+    
     def __repr__(self):
         return f"<Sale(id={self.id}, product_id={self.product_id}, customer_id={self.customer_id}, total_amount={self.total_amount})>"
 
+class DataVersion(Base):
+    """
+    Versão dos dados (linha única), incrementada por gatilhos a cada INSERT,
+    UPDATE ou DELETE em vendas, produtos e clientes (app.migrations)
+    """
+    __tablename__ = "data_version"
+    
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<DataVersion(version={self.version})>"
+
+class CustomerStats(Base):
+    """
+    Agregados RFM por cliente, mantidos incrementalmente a cada venda
+    """
+    __tablename__ = "customer_stats"
+    
+    customer_id = Column(Integer, ForeignKey("customers.id"), primary_key=True)
+    total_purchases = Column(Integer, nullable=False, default=0)
+    total_spent_cents = Column(Integer, nullable=False, default=0)
+    total_items = Column(Integer, nullable=False, default=0)
+    first_purchase_date = Column(DateTime)
+    last_purchase_date = Column(DateTime)
+    unique_products = Column(Integer, nullable=False, default=0)
+    # Maior id de venda já incorporado (marca d'água da atualização incremental)
+    last_sale_id = Column(Integer, nullable=False, default=0)
+    
+    # Ranking por gasto: leitura top-N direto do índice
+    __table_args__ = (
+        Index("ix_customer_stats_ranking", total_spent_cents.desc(), customer_id),
+    )
+    
+    def __repr__(self):
+        return f"<CustomerStats(customer_id={self.customer_id}, total_purchases={self.total_purchases}, total_spent_cents={self.total_spent_cents})>"
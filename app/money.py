@@ -0,0 +1,36 @@
+"""
+Conversão entre centavos e reais
+
+Preços e valores de venda são gravados em centavos inteiros: somas e médias
+no banco e nos caches são feitas sobre inteiros, sem Decimal por linha e sem
+o acúmulo de arredondamento de floats. A conversão para reais acontece uma
+única vez, na borda (propriedades dos modelos e rótulos das consultas).
+
+As respostas da API formatam os centavos com format_cents (schemas.Product
+e schemas.Sale leem price_cents/total_amount_cents; app.list_responses
+também), sem passar pelas propriedades `price`/`total_amount` dos modelos,
+que criam um Decimal.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Optional, Union
+
+_CENT = Decimal(1)
+
+def to_cents(amount: Union[Decimal, float, int, str, None]) -> Optional[int]:
+    """Valor em reais para centavos (meio centavo arredonda para cima)"""
+    if amount is None:
+        return None
+    return int((Decimal(str(amount)) * 100).quantize(_CENT, rounding=ROUND_HALF_UP))
+
+def from_cents(cents: Optional[int]) -> Optional[Decimal]:
+    """Centavos para Decimal em reais com duas casas (exato)"""
+    if cents is None:
+        return None
+    return Decimal(cents).scaleb(-2)
+
+def format_cents(cents: Optional[int]) -> Optional[str]:
+    """Centavos como texto em reais ("1234.50"), igual ao Decimal serializado pelo pydantic"""
+    if cents is None:
+        return None
+    whole, part = divmod(abs(cents), 100)
+    return f"{'-' if cents < 0 else ''}{whole}.{part:02d}"
@@ -0,0 +1,74 @@
+"""
+Uso de memória por processo (residente, compartilhada e privada)
+
+No Linux lê /proc/<pid>/smaps_rollup, que separa as páginas compartilhadas
+(ex.: pesos do modelo herdados do processo mestre por copy-on-write) das
+privadas de cada worker; em kernels antigos usa /proc/<pid>/statm. Fora do
+Linux informa apenas o pico residente do próprio processo.
+"""
+import os
+import resource
+import sys
+from typing import Dict, Optional, Any
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def _mb(value_bytes: float) -> float:
+    return round(value_bytes / (1024 * 1024), 1)
+
+def _read_smaps_rollup(pid: int) -> Optional[Dict[str, int]]:
+    """Campos do smaps_rollup em bytes (None se indisponível)"""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+
+    fields = {}
+    for line in lines:
+        name, _, value = line.partition(":")
+        parts = value.split()
+        if len(parts) == 2 and parts[1] == "kB":
+            fields[name] = int(parts[0]) * 1024
+    return fields
+
+def process_memory(pid: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Memória do processo em MB
+
+    Returns:
+        Dict com 'pid', 'rss_mb', 'shared_mb', 'private_mb' e, quando
+        disponível, 'pss_mb' (parcela proporcional das páginas compartilhadas)
+    """
+    pid = pid or os.getpid()
+
+    fields = _read_smaps_rollup(pid)
+    if fields:
+        shared = fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0)
+        private = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+        return {
+            'pid': pid,
+            'rss_mb': _mb(fields.get("Rss", 0)),
+            'shared_mb': _mb(shared),
+            'private_mb': _mb(private),
+            'pss_mb': _mb(fields.get("Pss", 0))
+        }
+
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            _, resident, shared = (int(value) for value in f.read().split()[:3])
+        # statm só conta como compartilhadas as páginas mapeadas de arquivos
+        return {
+            'pid': pid,
+            'rss_mb': _mb(resident * _PAGE_SIZE),
+            'shared_mb': _mb(shared * _PAGE_SIZE),
+            'private_mb': _mb((resident - shared) * _PAGE_SIZE)
+        }
+    except OSError:
+        pass
+
+    if pid != os.getpid():
+        return {'pid': pid}
+    # ru_maxrss: kB no Linux, bytes no macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {'pid': pid, 'max_rss_mb': _mb(max_rss if sys.platform == "darwin" else max_rss * 1024)}
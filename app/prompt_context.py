@@ -0,0 +1,107 @@
+"""
+Serialização compacta de resultados tabulares para o contexto dos prompts
+
+Em vez de `str(data)` (repr de dicionários com as chaves repetidas em cada
+linha, `Decimal(...)`/`datetime(...)` e corte no meio de uma linha), os
+resultados são enviados como uma tabela: cabeçalho uma única vez e linhas com
+valores alinhados e números arredondados. Linhas que não cabem no limite são
+omitidas inteiras e indicadas no rodapé.
+"""
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence
+
+# Configurações do contexto dos prompts
+PROMPT_CONTEXT_PRECISION = int(os.getenv("PROMPT_CONTEXT_PRECISION", "2"))
+
+COLUMN_SEPARATOR = " | "
+
+def format_value(value: Any, precision: int = PROMPT_CONTEXT_PRECISION) -> str:
+    """Formata um valor de forma compacta (números arredondados, datas curtas)"""
+    if value is None:
+        return "-"
+    if isinstance(value, bool):
+        return "sim" if value else "não"
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, (float, Decimal)):
+        text = f"{float(value):.{precision}f}"
+        if "." in text:
+            text = text.rstrip("0").rstrip(".")
+        return "0" if text == "-0" else text
+    if isinstance(value, datetime):
+        if value.hour == value.minute == value.second == 0:
+            return value.strftime("%Y-%m-%d")
+        return value.strftime("%Y-%m-%d %H:%M")
+    if isinstance(value, date):
+        return value.isoformat()
+    return " ".join(str(value).replace("|", "/").split())
+
+def _is_numeric_column(rows: Sequence[Dict[str, Any]], column: str) -> bool:
+    """Colunas numéricas são alinhadas à direita"""
+    values = [row.get(column) for row in rows if row.get(column) is not None]
+    return bool(values) and all(
+        isinstance(value, (int, float, Decimal)) and not isinstance(value, bool) for value in values
+    )
+
+def format_table(
+    rows: Sequence[Dict[str, Any]],
+    columns: Optional[Sequence[str]] = None,
+    precision: int = PROMPT_CONTEXT_PRECISION,
+    max_chars: Optional[int] = None,
+    omitted_rows: int = 0
+) -> str:
+    """
+    Serializa linhas (dicionários) como tabela alinhada com cabeçalho único
+
+    Args:
+        rows: Linhas do resultado, na ordem de relevância
+        columns: Colunas a incluir (padrão: colunas da primeira linha)
+        precision: Casas decimais dos números
+        max_chars: Tamanho máximo do texto; as linhas excedentes são omitidas
+        omitted_rows: Linhas já removidas pelo chamador (informadas no rodapé)
+
+    Returns:
+        str: Tabela em texto ("(sem dados)" quando não há linhas)
+    """
+    if not rows:
+        return f"... ({omitted_rows} linhas omitidas)" if omitted_rows else "(sem dados)"
+
+    columns = list(columns or rows[0].keys())
+    if len(rows) == 1:
+        # Uma única linha (resumos): pares "coluna: valor" são mais curtos que a tabela
+        lines = [f"{column}: {format_value(rows[0].get(column), precision)}" for column in columns]
+        if omitted_rows:
+            lines.append(f"... (+{omitted_rows} linhas omitidas)")
+        return "\n".join(lines)
+
+    cells = [[format_value(row.get(column), precision) for column in columns] for row in rows]
+    widths = [
+        max(len(column), *(len(row_cells[index]) for row_cells in cells))
+        for index, column in enumerate(columns)
+    ]
+    numeric = [_is_numeric_column(rows, column) for column in columns]
+
+    def render(values: List[str], header: bool = False) -> str:
+        padded = [
+            value.rjust(width) if is_numeric and not header else value.ljust(width)
+            for value, width, is_numeric in zip(values, widths, numeric)
+        ]
+        return COLUMN_SEPARATOR.join(padded).rstrip()
+
+    lines = [render(columns, header=True)]
+    used = len(lines[0])
+    for index, row_cells in enumerate(cells):
+        line = render(row_cells)
+        omitted = len(cells) - index + omitted_rows
+        footer = f"... (+{omitted} linhas omitidas)"
+        if max_chars is not None and used + 1 + len(line) + (1 + len(footer) if omitted > 1 else 0) > max_chars:
+            lines.append(footer)
+            break
+        lines.append(line)
+        used += 1 + len(line)
+    else:
+        if omitted_rows:
+            lines.append(f"... (+{omitted_rows} linhas omitidas)")
+    return "\n".join(lines)
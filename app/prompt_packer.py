@@ -0,0 +1,154 @@
+"""
+Montagem de prompts com orçamento de tokens
+
+Os tokens do prompt são contados com um tokenizador local (tiktoken, quando
+instalado; caso contrário uma estimativa conservadora) e as linhas de dados
+mais relevantes são incluídas até o orçamento, que sempre reserva espaço para
+os `max_tokens` da resposta. Cada montagem informa os tokens do prompt e o
+tempo gasto para empacotá-lo; um prompt que excede o orçamento mesmo sem
+nenhuma linha de dados é sinalizado (`over_budget`). O tokenizador é
+carregado na inicialização da aplicação (load_tokenizer), não na primeira
+pergunta.
+"""
+import os
+import re
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Sequence
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+from app.prompt_context import format_table
+
+# Configurações do orçamento de tokens
+PROMPT_CONTEXT_WINDOW = int(os.getenv("PROMPT_CONTEXT_WINDOW", "4096"))
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "0"))  # 0 = janela - max_tokens
+PROMPT_TOKENIZER_ENCODING = os.getenv("PROMPT_TOKENIZER_ENCODING", "cl100k_base")
+
+_TOKEN_ESTIMATE_RE = re.compile(r"\w+|[^\w\s]")
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """Carrega o tokenizador uma única vez (None quando indisponível)"""
+    if not TIKTOKEN_AVAILABLE:
+        return None
+    try:
+        return tiktoken.get_encoding(PROMPT_TOKENIZER_ENCODING)
+    except Exception as e:
+        print(f"⚠️ Tokenizador indisponível, usando estimativa de tokens: {e}")
+        return None
+
+def load_tokenizer() -> bool:
+    """Carrega o tokenizador (chamado na inicialização); False se usa a estimativa"""
+    return _get_encoding() is not None
+
+def count_tokens(text: str) -> int:
+    """Conta os tokens do texto"""
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    # Estimativa: palavras e pontuação, no mínimo ~4 caracteres por token
+    return max(len(_TOKEN_ESTIMATE_RE.findall(text)), (len(text) + 3) // 4)
+
+def prompt_budget(max_tokens: int) -> int:
+    """Tokens disponíveis para o prompt, reservando os max_tokens da resposta"""
+    available = PROMPT_CONTEXT_WINDOW - max_tokens
+    if PROMPT_TOKEN_BUDGET:
+        return min(PROMPT_TOKEN_BUDGET, available)
+    return available
+
+class PackedPrompt:
+    """
+    Prompt montado dentro do orçamento, com as métricas da montagem
+    """
+
+    def __init__(self, prompt: str, prompt_tokens: int, budget: int,
+                 rows_included: int, rows_total: int, packing_ms: float):
+        self.prompt = prompt
+        self.prompt_tokens = prompt_tokens
+        self.budget = budget
+        self.rows_included = rows_included
+        self.rows_total = rows_total
+        self.packing_ms = packing_ms
+
+    @property
+    def over_budget(self) -> bool:
+        """True se o prompt excede o orçamento (só acontece com zero linhas de dados)"""
+        return self.prompt_tokens > self.budget
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas reportadas por requisição"""
+        return {
+            'prompt_tokens': self.prompt_tokens,
+            'prompt_budget': self.budget,
+            'rows_included': self.rows_included,
+            'rows_total': self.rows_total,
+            'over_budget': self.over_budget,
+            'packing_ms': round(self.packing_ms, 3)
+        }
+
+def pack_prompt(
+    build_prompt: Callable[[str], str],
+    rows: Sequence[Any],
+    max_tokens: int,
+    rank_by: Optional[str] = None,
+    render: Callable[..., str] = format_table,
+    budget: Optional[int] = None,
+    token_counter: Callable[[str], int] = count_tokens
+) -> PackedPrompt:
+    """
+    Monta o prompt com o maior número de linhas relevantes que cabe no orçamento
+
+    Args:
+        build_prompt: Recebe os dados serializados e retorna o prompt completo
+        rows: Linhas de dados, na ordem de relevância
+        max_tokens: Tokens reservados para a resposta do modelo
+        rank_by: Coluna usada para ordenar as linhas (maior valor primeiro)
+        render: Serializador das linhas (recebe as linhas e `omitted_rows`)
+        budget: Orçamento do prompt em tokens (padrão: prompt_budget(max_tokens))
+        token_counter: Contador de tokens (padrão: count_tokens; ex.: o tokenizador do modelo local)
+
+    Returns:
+        PackedPrompt: Prompt e métricas da montagem
+    """
+    start = time.perf_counter()
+    if budget is None:
+        budget = prompt_budget(max_tokens)
+    ranked = list(rows)
+    if rank_by:
+        ranked.sort(key=lambda row: row.get(rank_by) or 0, reverse=True)
+
+    def build(count: int):
+        prompt = build_prompt(render(ranked[:count], omitted_rows=len(ranked) - count))
+        return prompt, token_counter(prompt)
+
+    included = len(ranked)
+    prompt, tokens = build(included)
+    if tokens > budget and ranked:
+        # Busca binária pelo maior número de linhas que cabe no orçamento
+        included = 0
+        prompt, tokens = build(0)
+        low, high = 1, len(ranked) - 1
+        while low <= high:
+            middle = (low + high) // 2
+            candidate, candidate_tokens = build(middle)
+            if candidate_tokens <= budget:
+                included, prompt, tokens = middle, candidate, candidate_tokens
+                low = middle + 1
+            else:
+                high = middle - 1
+    if tokens > budget:
+        print(f"⚠️ Prompt excede o orçamento mesmo sem linhas de dados ({tokens} > {budget} tokens)")
+
+    return PackedPrompt(
+        prompt=prompt,
+        prompt_tokens=tokens,
+        budget=budget,
+        rows_included=included,
+        rows_total=len(ranked),
+        packing_ms=(time.perf_counter() - start) * 1000
+    )
@@ -0,0 +1,463 @@
+"""
+Arquivo frio das vendas em Parquet particionado por mês
+
+As análises só leem as últimas semanas, mas a tabela `sales` (e seus
+índices) cresce sem limite. O job de arquivamento move os meses já fechados
+e mais antigos que SALES_ARCHIVE_HOT_DAYS para arquivos Parquet em
+`SALES_ARCHIVE_PATH/sale_month=AAAA-MM/`, confere contagem e soma dos
+valores e só então apaga as linhas da tabela quente, mantendo seu tamanho
+limitado. Os relatórios de longo prazo leem o arquivo com poda de partições
+(só os diretórios dos meses pedidos) e projeção de colunas, combinando o
+resultado com a tabela quente. Os valores ficam em centavos (int64), como na
+tabela, e são convertidos para reais uma vez, nos totais agregados.
+
+Cada mês é gravado como `.pending-<ids>` (ignorado na leitura), as linhas
+são apagadas e só depois do commit o arquivo é publicado; um pendente que
+sobrar de uma execução interrompida é publicado ou descartado na próxima,
+conforme as linhas do seu intervalo de ids ainda existam na tabela. A lista
+de arquivos e os totais memorizados são refeitos sempre que o conjunto de
+partes muda (nome, mtime e tamanho), inclusive quando outro processo arquiva.
+
+Requer pyarrow (dependência opcional; sem ele o arquivo fica desativado).
+
+Uso (cron, fora do processo da API):
+    python -m app.sales_archive [--dry-run] [--hot-days 90] [--no-vacuum]
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Any
+
+from sqlalchemy import and_, func, select, text
+from sqlalchemy.orm import Session
+
+from app import models
+from app.analytics_queries import EPOCH, epoch_seconds, in_sale_period
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Configurações do arquivo frio
+SALES_ARCHIVE_ENABLED = os.getenv("SALES_ARCHIVE_ENABLED", "False").lower() == "true" and PYARROW_AVAILABLE
+SALES_ARCHIVE_PATH = os.getenv("SALES_ARCHIVE_PATH", "./sales_archive")
+# Deve cobrir a maior janela das análises (90 dias no agente profissional)
+SALES_ARCHIVE_HOT_DAYS = int(os.getenv("SALES_ARCHIVE_HOT_DAYS", "90"))
+SALES_ARCHIVE_BATCH_SIZE = int(os.getenv("SALES_ARCHIVE_BATCH_SIZE", "100000"))
+SALES_ARCHIVE_VACUUM = os.getenv("SALES_ARCHIVE_VACUUM", "True").lower() == "true"
+
+sales = models.Sale.__table__
+
+if PYARROW_AVAILABLE:
+    ARCHIVE_SCHEMA = pa.schema([
+        ("id", pa.int64()),
+        ("product_id", pa.int32()),
+        ("customer_id", pa.int32()),
+        ("quantity", pa.int32()),
+        ("total_amount_cents", pa.int64()),
+        ("sale_date", pa.timestamp("us"))
+    ])
+    PARTITIONING = ds.partitioning(pa.schema([("sale_month", pa.string())]), flavor="hive")
+    # Colunas lidas: as gravadas e a chave de partição (do nome do diretório)
+    DATASET_SCHEMA = ARCHIVE_SCHEMA.append(pa.field("sale_month", pa.string()))
+
+def _month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+def _next_month(value: datetime) -> datetime:
+    return datetime(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+def _month_key(value: datetime) -> str:
+    return f"{value.year:04d}-{value.month:02d}"
+
+def archive_cutoff(hot_days: Optional[int] = None, now: Optional[datetime] = None) -> datetime:
+    """
+    Início do primeiro mês mantido na tabela quente
+
+    Meses que terminam antes dele estão fechados e fora de qualquer janela de
+    `hot_days` dias, podendo ser arquivados.
+    """
+    hot_days = SALES_ARCHIVE_HOT_DAYS if hot_days is None else hot_days
+    now = now or datetime.now()
+    return _month_start(now - timedelta(days=hot_days))
+
+class SalesArchive:
+    """
+    Vendas de meses fechados em Parquet, particionadas por sale_month
+    """
+
+    def __init__(self, path: Optional[str] = None, batch_size: Optional[int] = None):
+        self.path = path or SALES_ARCHIVE_PATH
+        self.batch_size = batch_size or SALES_ARCHIVE_BATCH_SIZE
+        self._lock = threading.Lock()
+        self._dataset = None
+        self._dataset_signature: Optional[tuple] = None
+        self._totals: Optional[Dict[str, Any]] = None
+        self._totals_signature: Optional[tuple] = None
+        self.last_run: Optional[Dict[str, Any]] = None
+        self.scans = 0
+        self.scan_ms = 0.0
+
+    # ------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------
+
+    def _month_dir(self, month: datetime) -> str:
+        return os.path.join(self.path, f"sale_month={_month_key(month)}")
+
+    def _recover_pending(self, db: Session) -> int:
+        """
+        Resolve os arquivos `.pending-*` deixados por uma execução interrompida
+
+        Se nenhuma linha do intervalo de ids do arquivo ainda está no mês na
+        tabela quente, o apagamento foi confirmado e o arquivo é publicado;
+        caso contrário o commit não aconteceu e o arquivo é descartado.
+        """
+        recovered = 0
+        if not os.path.isdir(self.path):
+            return recovered
+        for directory in os.listdir(self.path):
+            if not directory.startswith("sale_month="):
+                continue
+            month = datetime.strptime(directory.split("=", 1)[1], "%Y-%m")
+            for name in os.listdir(os.path.join(self.path, directory)):
+                if not name.startswith(".pending-"):
+                    continue
+                path = os.path.join(self.path, directory, name)
+                ids = name[len(".pending-"):]
+                first_id, last_id = (int(value) for value in ids[:-len(".parquet")].split("-"))
+                remaining = db.execute(
+                    select(func.count(sales.c.id)).where(and_(
+                        in_sale_period(month, _next_month(month)),
+                        sales.c.id.between(first_id, last_id)
+                    ))
+                ).scalar()
+                if remaining:
+                    os.remove(path)
+                else:
+                    os.replace(path, os.path.join(self.path, directory, f"part-{ids}"))
+                    recovered += 1
+        return recovered
+
+    def _write_month(self, db: Session, start: datetime, end: datetime) -> Optional[Dict[str, Any]]:
+        """
+        Grava as vendas de [start, end) em um arquivo Parquet do mês
+
+        Lê em blocos por id (valor em centavos, sem Decimal por linha), grava
+        em um arquivo temporário e confere linhas e soma contra o banco antes
+        de publicar. Retorna None se o mês não tiver vendas.
+        """
+        in_month = in_sale_period(start, end)
+        expected_rows, expected_cents = db.execute(
+            select(func.count(sales.c.id), func.sum(sales.c.total_amount_cents))
+            .where(in_month)
+        ).one()
+        if not expected_rows:
+            return None
+
+        statement = (
+            select(
+                sales.c.id,
+                sales.c.product_id,
+                sales.c.customer_id,
+                sales.c.quantity,
+                sales.c.total_amount_cents,
+                sales.c.sale_date
+            )
+            .where(in_month)
+            .order_by(sales.c.id)
+            .limit(self.batch_size)
+        )
+
+        directory = self._month_dir(start)
+        os.makedirs(directory, exist_ok=True)
+        temporary = os.path.join(directory, f".part-{os.getpid()}.tmp")
+
+        first_id = last_id = None
+        rows_written = cents_written = 0
+        with pq.ParquetWriter(temporary, ARCHIVE_SCHEMA, compression="zstd") as writer:
+            after_id = 0
+            while True:
+                rows = db.execute(statement.where(sales.c.id > after_id)).all()
+                if not rows:
+                    break
+                ids, product_ids, customer_ids, quantities, cents, sale_dates = zip(*rows)
+                writer.write_table(pa.table({
+                    "id": pa.array(ids, pa.int64()),
+                    "product_id": pa.array(product_ids, pa.int32()),
+                    "customer_id": pa.array(customer_ids, pa.int32()),
+                    "quantity": pa.array(quantities, pa.int32()),
+                    "total_amount_cents": pa.array(cents, pa.int64()),
+                    "sale_date": pa.array(sale_dates, pa.timestamp("us"))
+                }, schema=ARCHIVE_SCHEMA))
+                first_id = ids[0] if first_id is None else first_id
+                last_id = after_id = ids[-1]
+                rows_written += len(rows)
+                cents_written += sum(cents)
+                if len(rows) < self.batch_size:
+                    break
+
+        file_rows = pq.read_metadata(temporary).num_rows
+        if (file_rows, rows_written, cents_written) != (expected_rows, expected_rows, expected_cents):
+            os.remove(temporary)
+            raise RuntimeError(
+                f"arquivo de {_month_key(start)} divergente: {rows_written} linhas/{cents_written} centavos, "
+                f"esperado {expected_rows}/{expected_cents}"
+            )
+
+        # O nome pelo intervalo de ids permite novas partes se vendas retroativas chegarem depois
+        ids = f"{first_id:012d}-{last_id:012d}.parquet"
+        pending = os.path.join(directory, f".pending-{ids}")
+        os.replace(temporary, pending)
+        return {
+            "month": _month_key(start),
+            "rows": rows_written,
+            "revenue": round(cents_written / 100, 2),
+            "pending": pending,
+            "file": os.path.join(directory, f"part-{ids}"),
+            "last_id": last_id,
+            "bytes": os.path.getsize(pending)
+        }
+
+    def archive(
+        self,
+        db: Session,
+        cutoff: Optional[datetime] = None,
+        dry_run: bool = False,
+        vacuum: Optional[bool] = None
+    ) -> Dict[str, Any]:
+        """
+        Move para o arquivo os meses fechados anteriores a `cutoff`
+
+        Cada mês é apagado da tabela quente e, só após o commit, publicado
+        (rename atômico do arquivo pendente); se o commit falhar o arquivo é
+        removido. Pendentes de uma execução interrompida são resolvidos antes.
+
+        Returns:
+            Meses arquivados, linhas movidas e tempo gasto
+        """
+        cutoff = cutoff or archive_cutoff()
+        vacuum = SALES_ARCHIVE_VACUUM if vacuum is None else vacuum
+        start_time = time.perf_counter()
+        recovered = 0 if dry_run else self._recover_pending(db)
+
+        oldest = db.execute(
+            select(func.min(sales.c.sale_day)).where(sales.c.sale_day < epoch_seconds(cutoff) // 86400)
+        ).scalar()
+        months: List[Dict[str, Any]] = []
+        month = _month_start(EPOCH + timedelta(days=oldest)) if oldest is not None else cutoff
+        while month < cutoff:
+            end = _next_month(month)
+            if dry_run:
+                rows = db.execute(
+                    select(func.count(sales.c.id)).where(in_sale_period(month, end))
+                ).scalar()
+                if rows:
+                    months.append({"month": _month_key(month), "rows": rows})
+                month = end
+                continue
+
+            written = self._write_month(db, month, end)
+            if written is not None:
+                pending = written.pop("pending")
+                try:
+                    db.execute(
+                        sales.delete().where(and_(in_sale_period(month, end), sales.c.id <= written["last_id"]))
+                    )
+                    db.commit()
+                except Exception:
+                    db.rollback()
+                    os.remove(pending)
+                    raise
+                # Publicado só depois do commit: nunca visível junto com as linhas quentes
+                os.replace(pending, written["file"])
+                months.append(written)
+                print(f"📦 Vendas de {written['month']} arquivadas: {written['rows']:,} linhas, {written['bytes'] / 1024:.0f} KB")
+            month = end
+
+        if (months or recovered) and not dry_run:
+            self.invalidate()
+            if vacuum:
+                # VACUUM não roda dentro de transação: devolve ao disco o espaço das linhas apagadas
+                with db.get_bind().connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+                    connection.execute(text("VACUUM"))
+
+        self.last_run = {
+            "cutoff": cutoff.isoformat(),
+            "dry_run": dry_run,
+            "months": months,
+            "rows": sum(month["rows"] for month in months),
+            "recovered_files": recovered,
+            "elapsed_ms": round((time.perf_counter() - start_time) * 1000, 1)
+        }
+        return self.last_run
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+
+    def invalidate(self):
+        """Descarta a lista de arquivos e os totais memorizados"""
+        with self._lock:
+            self._dataset = self._dataset_signature = None
+            self._totals = self._totals_signature = None
+
+    def _part_files(self) -> List[str]:
+        """Partes publicadas (temporários e pendentes começam com "." e ficam de fora)"""
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(
+            os.path.join(self.path, directory, name)
+            for directory in os.listdir(self.path) if directory.startswith("sale_month=")
+            for name in os.listdir(os.path.join(self.path, directory))
+            if name.startswith("part-") and name.endswith(".parquet")
+        )
+
+    def _signature(self) -> tuple:
+        """Conjunto atual de partes (caminho, mtime, tamanho): muda a cada arquivamento"""
+        signature = []
+        for path in self._part_files():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def months(self) -> List[str]:
+        """Meses presentes no arquivo (AAAA-MM)"""
+        return sorted({os.path.basename(os.path.dirname(path)).split("=", 1)[1] for path in self._part_files()})
+
+    def _get_dataset(self, signature: Optional[tuple] = None):
+        signature = self._signature() if signature is None else signature
+        with self._lock:
+            if signature != self._dataset_signature:
+                self._dataset = ds.dataset(
+                    [path for path, _, _ in signature], schema=DATASET_SCHEMA, format="parquet",
+                    partitioning=PARTITIONING, partition_base_dir=self.path
+                ) if signature else None
+                self._dataset_signature = signature
+            return self._dataset
+
+    def scan(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        columns: Optional[List[str]] = None,
+        signature: Optional[tuple] = None
+    ) -> "pa.Table":
+        """
+        Lê as vendas arquivadas de [start_date, end_date)
+
+        O filtro sobre sale_month descarta diretórios inteiros antes da
+        leitura; o filtro sobre sale_date usa as estatísticas dos row groups;
+        só as colunas pedidas são decodificadas.
+        """
+        columns = list(columns or ARCHIVE_SCHEMA.names)
+        dataset = self._get_dataset(signature)
+        if dataset is None:
+            return DATASET_SCHEMA.empty_table().select(columns)
+
+        start = time.perf_counter()
+        expression = None
+        if start_date is not None:
+            expression = (ds.field("sale_month") >= _month_key(start_date)) & (
+                ds.field("sale_date") >= pa.scalar(start_date, pa.timestamp("us"))
+            )
+        if end_date is not None:
+            before_end = (ds.field("sale_month") <= _month_key(end_date)) & (
+                ds.field("sale_date") < pa.scalar(end_date, pa.timestamp("us"))
+            )
+            expression = before_end if expression is None else expression & before_end
+
+        table = dataset.to_table(columns=columns, filter=expression)
+        self.scans += 1
+        self.scan_ms += (time.perf_counter() - start) * 1000
+        return table
+
+    def totals(self) -> Dict[str, Any]:
+        """Número de vendas e receita arquivadas (memorizado enquanto as partes não mudam)"""
+        signature = self._signature()
+        with self._lock:
+            if self._totals is not None and self._totals_signature == signature:
+                return self._totals
+        table = self.scan(columns=["total_amount_cents"], signature=signature)
+        cents = (pc.sum(table["total_amount_cents"]).as_py() or 0) if table.num_rows else 0
+        totals = {"sales": table.num_rows, "revenue_cents": cents, "revenue": cents / 100}
+        with self._lock:
+            self._totals, self._totals_signature = totals, signature
+        return totals
+
+    def sales_between(self, start_date: datetime, end_date: datetime) -> List[models.Sale]:
+        """Vendas arquivadas de [start_date, end_date] como objetos Sale transitórios"""
+        table = self.scan(start_date, end_date + timedelta(microseconds=1))
+        return [models.Sale(**row) for row in table.to_pylist()]
+
+    def monthly_totals(self, start_date: datetime, end_date: datetime) -> Dict[str, Dict[str, Any]]:
+        """
+        Transações, receita (em centavos e em reais) e itens por mês das vendas
+        arquivadas de [start_date, end_date)
+        """
+        table = self.scan(start_date, end_date, columns=["sale_month", "quantity", "total_amount_cents"])
+        if not table.num_rows:
+            return {}
+        grouped = table.group_by("sale_month").aggregate([
+            ("total_amount_cents", "count"), ("total_amount_cents", "sum"), ("quantity", "sum")
+        ])
+        return {
+            row["sale_month"]: {
+                "transactions": row["total_amount_cents_count"],
+                "revenue_cents": row["total_amount_cents_sum"],
+                "revenue": row["total_amount_cents_sum"] / 100,
+                "items": row["quantity_sum"]
+            }
+            for row in grouped.to_pylist()
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Meses, arquivos e tamanho do arquivo frio"""
+        months = self.months()
+        files = self._part_files()
+        return {
+            "enabled": SALES_ARCHIVE_ENABLED,
+            "path": self.path,
+            "hot_days": SALES_ARCHIVE_HOT_DAYS,
+            "months": months,
+            "files": len(files),
+            "size_mb": round(sum(os.path.getsize(path) for path in files) / (1024 * 1024), 2),
+            "scans": self.scans,
+            "avg_scan_ms": round(self.scan_ms / self.scans, 2) if self.scans else None,
+            "last_run": self.last_run
+        }
+
+# Arquivo global (lido pelos relatórios quando SALES_ARCHIVE_ENABLED=True)
+sales_archive = SalesArchive()
+
+def main():
+    parser = argparse.ArgumentParser(description="Arquiva em Parquet os meses fechados da tabela de vendas")
+    parser.add_argument("--dry-run", action="store_true", help="Apenas lista os meses e linhas a arquivar")
+    parser.add_argument("--hot-days", type=int, default=SALES_ARCHIVE_HOT_DAYS,
+                        help="Dias mantidos na tabela quente")
+    parser.add_argument("--no-vacuum", action="store_true", help="Não executa VACUUM após arquivar")
+    args = parser.parse_args()
+
+    if not PYARROW_AVAILABLE:
+        parser.error("pyarrow não está instalado")
+
+    from app.database import SessionLocal
+    with SessionLocal() as db:
+        result = sales_archive.archive(
+            db, cutoff=archive_cutoff(args.hot_days), dry_run=args.dry_run, vacuum=not args.no_vacuum
+        )
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Banco de dados compartilhado pelos agentes LangChain
+
+`SQLDatabase.from_uri` criava um segundo engine (e pool de conexões) ao lado
+de `app.database.engine` e refletia o esquema na inicialização de cada agente;
+o `SQLDatabaseToolkit` ainda recalculava a descrição das tabelas (CREATE TABLE
++ linhas de exemplo) a cada execução do agente. Aqui todos os agentes usam
+uma única instância sobre o engine da aplicação: o esquema é refletido uma
+vez por processo e a descrição das tabelas é pré-computada, sendo invalidada
+apenas quando uma migração altera o esquema.
+
+SQL_AGENT_PREFIX é o prompt padrão do agente SQL acrescido das convenções do
+esquema que o CREATE TABLE não deixa claras (valores em centavos).
+"""
+import hashlib
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Any
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from langchain.sql_database import SQLDatabase
+from langchain.agents.agent_toolkits.sql.prompt import SQL_PREFIX
+
+from app.database import engine
+
+# Nota de esquema para o LLM: os valores monetários são inteiros em centavos
+MONEY_SCHEMA_NOTE = (
+    "Money columns store integer cents: sales.total_amount_cents and "
+    "products.price_cents (and customer_stats.total_spent_cents). Divide them by 100.0 "
+    "to report amounts in reais, e.g. SUM(total_amount_cents) / 100.0 AS revenue."
+)
+
+# Prompt do agente SQL usado por todos os agentes LangChain ({dialect} e {top_k}
+# são preenchidos por create_sql_agent)
+SQL_AGENT_PREFIX = SQL_PREFIX + "\n\n" + MONEY_SCHEMA_NOTE
+
+def schema_version(bind: Engine = engine) -> str:
+    """
+    Versão do esquema do banco
+
+    No SQLite usa `PRAGMA schema_version`, incrementado a cada DDL; nos demais
+    bancos, um hash das tabelas e colunas.
+    """
+    if bind.dialect.name == "sqlite":
+        with bind.connect() as conn:
+            return str(conn.execute(text("PRAGMA schema_version")).scalar())
+
+    inspector = inspect(bind)
+    layout = [
+        (table, [(column["name"], str(column["type"])) for column in inspector.get_columns(table)])
+        for table in sorted(inspector.get_table_names())
+    ]
+    return hashlib.sha256(repr(layout).encode("utf-8")).hexdigest()
+
+class CachedSQLDatabase(SQLDatabase):
+    """
+    SQLDatabase sobre o engine da aplicação com descrição das tabelas em cache
+
+    A descrição (CREATE TABLE + linhas de exemplo) é calculada uma vez por
+    versão do esquema e conjunto de tabelas; uma migração descarta o cache e
+    reflete o esquema novamente.
+    """
+
+    def __init__(self, bind: Engine = engine, **kwargs: Any):
+        super().__init__(bind, **kwargs)
+        self._init_kwargs = kwargs
+        self._lock = threading.Lock()
+        self._table_info: Dict[Optional[Tuple[str, ...]], str] = {}
+        self._schema_version = schema_version(self._engine)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.get_table_info()  # pré-computa a descrição de todas as tabelas
+
+    def _check_schema_version(self):
+        """Descarta o cache (e recarrega o esquema) se uma migração alterou o banco"""
+        current = schema_version(self._engine)
+        if current == self._schema_version:
+            return
+
+        print(f"🔄 Esquema alterado ({self._schema_version} -> {current}), recarregando descrição das tabelas")
+        fresh = type(self)(self._engine, **self._init_kwargs)
+        self.__dict__.update({
+            key: value for key, value in fresh.__dict__.items()
+            if key not in ("_lock", "hits", "misses", "invalidations")
+        })
+        self.invalidations += 1
+
+    def get_table_info(self, table_names: Optional[List[str]] = None) -> str:
+        """Descrição das tabelas (em cache por versão do esquema)"""
+        key = tuple(sorted(table_names)) if table_names is not None else None
+        with self._lock:
+            self._check_schema_version()
+            cached = self._table_info.get(key)
+            if cached is not None:
+                self.hits += 1
+                return cached
+
+            table_info = super().get_table_info(table_names)
+            self._table_info[key] = table_info
+            self.misses += 1
+            return table_info
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas do cache de descrição das tabelas"""
+        return {
+            'schema_version': self._schema_version,
+            'cached_table_sets': len(self._table_info),
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations
+        }
+
+@lru_cache(maxsize=1)
+def get_sql_database() -> CachedSQLDatabase:
+    """Instância única compartilhada por todos os agentes LangChain"""
+    return CachedSQLDatabase()
@@ -3,8 +3,14 @@ Schemas Pydantic para validação de dados da API
 """
 from datetime import datetime
 from decimal import Decimal
-from typing import List, Optional
-from pydantic import BaseModel, EmailStr
+from typing import Annotated, Dict, List, Optional
+from pydantic import BaseModel, BeforeValidator, EmailStr, Field
+
+from app.money import format_cents
+
+# Respostas lidas do ORM: a coluna em centavos é formatada como texto em reais
+# ("1234.50", o mesmo JSON do Decimal), sem criar um Decimal por linha
+Reais = Annotated[str, BeforeValidator(format_cents)]
 
 # Schemas para Product
 class ProductBase(BaseModel):
@@ -17,6 +23,7 @@ class ProductCreate(ProductBase):
     pass
 
 class Product(ProductBase):
+    price: Optional[Reais] = Field(None, validation_alias="price_cents")
     id: int
     
     class Config:
@@ -49,6 +56,7 @@ class SaleCreate(SaleBase):
     pass
 
 class Sale(SaleBase):
+    total_amount: Reais = Field(validation_alias="total_amount_cents")
     id: int
     product: Optional[Product] = None
     customer: Optional[Customer] = None
@@ -62,6 +70,9 @@ class SalesInsightResponse(BaseModel):
     answer: str
     data_source: str
     timestamp: datetime
+    cache_hit: bool = False
+    prompt_tokens: Optional[int] = None
+    timings: Optional[Dict[str, float]] = None
 
 class TopProductsResponse(BaseModel):
     products: List[dict]
@@ -0,0 +1,237 @@
+"""
+Servidor pré-forkado com pesos do modelo compartilhados entre os workers
+
+Com `uvicorn --workers N` cada worker importa `app.ai_agent` e carrega a sua
+própria cópia do modelo transformers, multiplicando a memória pelo número de
+workers. Aqui o processo mestre importa a aplicação, carrega o modelo e
+pré-aquece os caches estáticos (intenções, contexto do banco, esquema,
+ranking de produtos, colunas do motor colunar, sketches do modo aproximado)
+antes do fork; os workers herdam essas páginas por copy-on-write e apenas
+leem os pesos. O mestre reinicia workers que terminarem, com espera
+exponencial entre reinícios de um worker que cai logo após subir, encerra o
+servidor se um worker entrar em loop de falhas e informa periodicamente a
+memória residente e compartilhada de cada um.
+
+O agendador de snapshots analíticos fica desligado nos workers (senão cada
+um atualizaria os mesmos snapshots); rode-o à parte com
+`python -m app.analytics_snapshots`.
+
+Uso:
+    python -m app.server --app app.main:app --workers 4
+"""
+import argparse
+import gc
+import os
+import signal
+import sys
+import time
+from importlib import import_module
+from typing import Dict, List
+
+import uvicorn
+from dotenv import load_dotenv
+from uvicorn.importer import import_from_string
+
+from app.process_memory import process_memory
+
+load_dotenv()
+
+# Configurações do servidor
+SERVER_APP = os.getenv("SERVER_APP", "app.main:app")
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", str(os.cpu_count() or 1)))
+SERVER_PRELOAD = os.getenv("SERVER_PRELOAD", "app.ai_agent")
+SERVER_MEMORY_REPORT_SECONDS = int(os.getenv("SERVER_MEMORY_REPORT_SECONDS", "60"))
+SERVER_RESTART_BACKOFF = float(os.getenv("SERVER_RESTART_BACKOFF", "1"))
+SERVER_RESTART_BACKOFF_MAX = float(os.getenv("SERVER_RESTART_BACKOFF_MAX", "30"))
+SERVER_CRASH_LOOP_LIMIT = int(os.getenv("SERVER_CRASH_LOOP_LIMIT", "5"))
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", 8000))
+
+def preload(app_path: str, modules: List[str]):
+    """
+    Carrega a aplicação, o modelo e os caches estáticos no processo mestre
+
+    Returns:
+        A aplicação ASGI importada
+    """
+    app = import_from_string(app_path)
+    for module in modules:
+        import_module(module)
+
+    from app.database import SessionLocal, engine
+    from app.migrations import run_migrations
+
+    # Colunas e índices novos antes de qualquer leitura dos caches
+    run_migrations()
+
+    if "app.ai_agent" in sys.modules:
+        from app.ai_agent import sales_ai_agent
+        with SessionLocal() as db:
+            sales_ai_agent.preload(db)
+    if "app.top_products_tracker" in sys.modules:
+        from app.top_products_tracker import top_products_tracker
+        with SessionLocal() as db:
+            top_products_tracker.ensure_loaded(db)
+    if "app.columnar_engine" in sys.modules:
+        from app.columnar_engine import columnar_engine, COLUMNAR_ENGINE_ENABLED
+        if COLUMNAR_ENGINE_ENABLED:
+            with SessionLocal() as db:
+                columnar_engine.ensure_loaded(db)
+    if "app.approximate_analytics" in sys.modules:
+        from app.approximate_analytics import approximate_analytics, APPROX_ANALYTICS_ENABLED
+        if APPROX_ANALYTICS_ENABLED:
+            with SessionLocal() as db:
+                approximate_analytics.ensure_loaded(db)
+    if "app.schema_cache" in sys.modules:
+        from app.schema_cache import get_sql_database
+        get_sql_database()
+
+    # Conexões do pool não podem ser compartilhadas: cada worker abre as suas
+    engine.dispose()
+    return app
+
+def _spawn_worker(config: uvicorn.Config, sock) -> int:
+    """Cria um worker que atende no socket herdado do mestre"""
+    pid = os.fork()
+    if pid:
+        return pid
+
+    # Processo filho: restaura os sinais padrão e executa o uvicorn
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    try:
+        uvicorn.Server(config).run(sockets=[sock])
+    finally:
+        os._exit(0)
+
+def report_memory(workers: Dict[int, int]):
+    """Imprime a memória do mestre e de cada worker"""
+    master = process_memory()
+    print(
+        f"📊 Mestre {master['pid']}: residente {master.get('rss_mb')} MB, "
+        f"compartilhada {master.get('shared_mb')} MB"
+    )
+    for index, pid in sorted(workers.items(), key=lambda item: item[1]):
+        memory = process_memory(pid)
+        print(
+            f"📊 Worker {index} ({pid}): residente {memory.get('rss_mb')} MB, "
+            f"compartilhada {memory.get('shared_mb')} MB, privada {memory.get('private_mb')} MB"
+        )
+
+def restart_delay(failures: int) -> float:
+    """Espera antes de reiniciar um worker após `failures` quedas seguidas"""
+    return min(SERVER_RESTART_BACKOFF * 2 ** (failures - 1), SERVER_RESTART_BACKOFF_MAX)
+
+def serve(app_path: str, workers: int, host: str, port: int, preload_modules: List[str]) -> int:
+    """
+    Pré-carrega a aplicação, faz o fork dos workers e os supervisiona
+
+    Returns:
+        Código de saída: 1 se um worker entrou em loop de falhas, 0 caso contrário
+    """
+    # Lido na importação da aplicação: precisa valer antes do preload
+    os.environ["ANALYTICS_SNAPSHOT_SCHEDULER"] = "False"
+
+    print(f"🚀 Pré-carregando {app_path} ({', '.join(preload_modules) or 'sem módulos extras'})...")
+    app = preload(app_path, preload_modules)
+
+    config = uvicorn.Config(app, host=host, port=port)
+    sock = config.bind_socket()
+
+    # Objetos já carregados saem do rastreamento do GC, que senão tocaria
+    # (e copiaria) as páginas herdadas em cada worker
+    gc.collect()
+    gc.freeze()
+
+    running: Dict[int, int] = {}  # pid -> índice do worker
+    started: Dict[int, float] = {}  # índice -> instante em que o worker subiu
+    failures: Dict[int, int] = {}  # índice -> quedas seguidas
+    pending: Dict[int, float] = {}  # índice -> instante do próximo reinício
+
+    def spawn(index: int):
+        running[_spawn_worker(config, sock)] = index
+        started[index] = time.monotonic()
+
+    for index in range(workers):
+        spawn(index)
+    print(f"✅ {workers} workers atendendo em http://{host}:{port}")
+
+    stopping = False
+    crash_loop = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        pending.clear()
+        for pid in running:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    next_report = time.monotonic() + SERVER_MEMORY_REPORT_SECONDS
+    while running or pending:
+        pid = 0
+        if running:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                running.clear()
+
+        if pid:
+            index = running.pop(pid)
+            if stopping:
+                continue
+
+            # Um worker que ficou no ar além da espera máxima zera a contagem de quedas
+            uptime = time.monotonic() - started[index]
+            failures[index] = 1 if uptime >= SERVER_RESTART_BACKOFF_MAX else failures.get(index, 0) + 1
+            if failures[index] > SERVER_CRASH_LOOP_LIMIT:
+                print(
+                    f"❌ Worker {index} ({pid}) caiu {failures[index]} vezes seguidas "
+                    f"(status {status}), encerrando o servidor"
+                )
+                crash_loop = True
+                stop(None, None)
+                continue
+
+            delay = restart_delay(failures[index])
+            print(f"⚠️ Worker {index} ({pid}) terminou com status {status}, reiniciando em {delay:g}s")
+            pending[index] = time.monotonic() + delay
+            continue
+
+        now = time.monotonic()
+        for index, due in list(pending.items()):
+            if due <= now:
+                del pending[index]
+                spawn(index)
+
+        if SERVER_MEMORY_REPORT_SECONDS and not stopping and time.monotonic() >= next_report:
+            report_memory({index: pid for pid, index in running.items()})
+            next_report = time.monotonic() + SERVER_MEMORY_REPORT_SECONDS
+        time.sleep(0.5)
+
+    sock.close()
+    print("👋 Servidor encerrado")
+    return 1 if crash_loop else 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor pré-forkado do Sales Insights AI")
+    parser.add_argument("--app", default=SERVER_APP, help="Aplicação ASGI (módulo:atributo)")
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS, help="Número de workers")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument(
+        "--preload", default=SERVER_PRELOAD,
+        help="Módulos carregados no mestre antes do fork (separados por vírgula)"
+    )
+    args = parser.parse_args()
+
+    modules = [module.strip() for module in args.preload.split(",") if module.strip()]
+    sys.exit(serve(args.app, args.workers, args.host, args.port, modules))
+
+if __name__ == "__main__":
+    main()
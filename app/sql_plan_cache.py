@@ -0,0 +1,331 @@
+"""
+Cache de planos pergunta -> SQL para o agente SQL do LangChain
+
+A parte cara de uma resposta do agente SQL é o LLM gerando a consulta, e a
+maior parte do tráfego são paráfrases de poucas dezenas de perguntas. Cada
+consulta validada (executada sem erro e com resposta final do agente) é
+guardada como modelo para a pergunta normalizada; os números da pergunta que
+aparecem no SQL viram parâmetros (ex.: "top 5 produtos" -> LIMIT {0}). Um
+número só vira parâmetro se cada número da pergunta aparecer exatamente uma
+vez no SQL, dentro ou fora de aspas; senão ("top 1" com `id > 1 LIMIT 1`,
+o ano em '2023-01-01' e '2023-12-31') o plano fica guardado apenas para a
+pergunta literal, sem parâmetros.
+Perguntas seguintes com o mesmo modelo, ou paráfrases com exatamente as
+mesmas palavras de conteúdo (só mudam ordem, artigos e preposições),
+executam o SQL guardado diretamente, sem chamar o LLM. Não há casamento
+aproximado: uma única palavra decisiva diferente (receita x quantidade,
+melhor x pior, produtos x clientes) mudaria o SQL correto.
+
+Os dois caminhos devolvem a mesma forma: as linhas do SQL validado e a
+tabela formatada delas como resposta; a execução do agente acrescenta o
+texto gerado pelo LLM em 'agent_output'.
+"""
+import os
+import re
+import time
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple, Any
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.answer_cache import ANSWER_CACHE_PATH, normalize_question
+from app.prompt_context import format_table
+from app.sql_result_cache import READ_ONLY_SQL_RE, track_agent_run
+
+# Configurações do cache de planos
+SQL_PLAN_CACHE_ENABLED = os.getenv("SQL_PLAN_CACHE_ENABLED", "True").lower() == "true"
+SQL_PLAN_CACHE_PATH = os.getenv("SQL_PLAN_CACHE_PATH", ANSWER_CACHE_PATH)
+SQL_PLAN_CACHE_MAX_ENTRIES = int(os.getenv("SQL_PLAN_CACHE_MAX_ENTRIES", "500"))
+
+_NUMBER_RE = re.compile(r"\b\d+\b")
+_SLOT = "#"
+
+# Palavras que não distinguem perguntas na comparação de paráfrases
+_STOPWORDS = frozenset(
+    "a o as os um uma de do da dos das no na nos nas em por para com e ou que qual quais "
+    "me mostre mostrar the of in on for to and or what which is are was were show me give "
+    "list please por favor".split()
+)
+
+def question_template(question: str) -> Tuple[str, List[str]]:
+    """Pergunta normalizada com os números trocados por '#' e os números extraídos"""
+    normalized = normalize_question(question)
+    return _NUMBER_RE.sub(_SLOT, normalized), _NUMBER_RE.findall(normalized)
+
+def _keywords(template: str) -> frozenset:
+    return frozenset(word for word in template.split() if word not in _STOPWORDS)
+
+def _escape_sql(sql: str) -> str:
+    """SQL sem parâmetros, com as chaves escapadas para str.format"""
+    return sql.strip().rstrip(";").replace("{", "{{").replace("}", "}}")
+
+def sql_template(sql: str, numbers: List[str]) -> Optional[str]:
+    """
+    Troca no SQL os números vindos da pergunta por parâmetros posicionais {0}, {1}...
+
+    Cada número da pergunta precisa ser distinto e aparecer exatamente uma vez
+    no SQL como número isolado, inclusive dentro de literais entre aspas
+    ('2023'); caso contrário a correspondência é ambígua e retorna None.
+    """
+    if len(set(numbers)) != len(numbers):
+        return None
+
+    template = _escape_sql(sql)
+    for index, number in enumerate(numbers):
+        pattern = re.compile(rf"(?<![\w.]){re.escape(number)}(?![\w.])")
+        if len(pattern.findall(template)) != 1:
+            return None
+        template = pattern.sub(f"{{{index}}}", template)
+    return template
+
+class SQLPlanCache:
+    """
+    Planos (pergunta normalizada -> modelo de SQL) em SQLite, com despejo LRU
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: Optional[int] = None):
+        self.path = path or SQL_PLAN_CACHE_PATH
+        self.max_entries = max_entries or SQL_PLAN_CACHE_MAX_ENTRIES
+        self._connect()
+        # Reabre a conexão nos processos filhos após um fork
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._connect)
+
+    def _connect(self):
+        """Abre a conexão com o SQLite e cria as tabelas"""
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sql_plans (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                question_key TEXT UNIQUE NOT NULL,
+                question TEXT NOT NULL,
+                sql_template TEXT NOT NULL,
+                slots INTEGER NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sql_plan_stats (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def _increment(self, name: str):
+        self._conn.execute(
+            "INSERT INTO sql_plan_stats (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,)
+        )
+
+    def lookup(self, question: str) -> Optional[Dict[str, Any]]:
+        """
+        Busca um plano para a pergunta (mesmo modelo ou paráfrase)
+
+        Os planos da pergunta literal (sem parâmetros) têm precedência sobre
+        os modelos com parâmetros.
+
+        Returns:
+            Dict com 'id', 'sql' (já preenchido com os números da pergunta) e
+            'match' ('exact' ou 'paraphrase'), ou None
+        """
+        key, numbers = question_template(question)
+        literal = normalize_question(question)
+        with self._lock:
+            self._increment("lookups")
+            row = None
+            for candidate_key, slots in ((literal, 0), (key, len(numbers))):
+                row = self._conn.execute(
+                    "SELECT id, sql_template FROM sql_plans WHERE question_key = ? AND slots = ?",
+                    (candidate_key, slots)
+                ).fetchone()
+                if row is not None:
+                    break
+            match = "exact"
+
+            if row is None:
+                # Paráfrases: as mesmas palavras de conteúdo da pergunta literal
+                # (planos sem parâmetros) ou do modelo (mesmo número de parâmetros)
+                keywords = {0: _keywords(literal), len(numbers): _keywords(key)}
+                candidates = self._conn.execute(
+                    "SELECT id, sql_template, question_key, slots FROM sql_plans WHERE slots IN (0, ?) "
+                    "ORDER BY last_used DESC", (len(numbers),)
+                )
+                row = next(
+                    ((plan_id, template) for plan_id, template, candidate_key, slots in candidates
+                     if keywords[slots] and _keywords(candidate_key) == keywords[slots]),
+                    None
+                )
+                if row is None:
+                    self._conn.commit()
+                    return None
+                match = "paraphrase"
+
+            self._increment("hits")
+            self._conn.execute(
+                "UPDATE sql_plans SET hits = hits + 1, last_used = ? WHERE id = ?", (time.time(), row[0])
+            )
+            self._conn.commit()
+        return {'id': row[0], 'sql': row[1].format(*numbers), 'match': match}
+
+    def store(self, question: str, sql: str):
+        """
+        Guarda (ou substitui) o plano validado da pergunta, como modelo com
+        parâmetros ou, se os números não se mapeiam sem ambiguidade, apenas
+        para a pergunta literal
+        """
+        key, numbers = question_template(question)
+        template = sql_template(sql, numbers)
+        slots = len(numbers)
+        if template is None:
+            key, template, slots = normalize_question(question), _escape_sql(sql), 0
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO sql_plans (question_key, question, sql_template, slots, created_at, last_used)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(question_key) DO UPDATE SET
+                    question = excluded.question,
+                    sql_template = excluded.sql_template,
+                    slots = excluded.slots,
+                    last_used = excluded.last_used
+                """,
+                (key, question, template, slots, now, now)
+            )
+            self._conn.execute(
+                """
+                DELETE FROM sql_plans WHERE id IN (
+                    SELECT id FROM sql_plans ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def clear(self) -> int:
+        """Remove todos os planos (ex.: após uma migração que muda colunas)"""
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM sql_plans").rowcount
+            self._conn.commit()
+        return deleted
+
+    def delete(self, plan_id: int) -> bool:
+        """Remove um plano (ex.: SQL que deixou de ser válido)"""
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM sql_plans WHERE id = ?", (plan_id,)).rowcount
+            self._conn.commit()
+        return deleted > 0
+
+    def plans(self) -> List[Dict[str, Any]]:
+        """Planos armazenados com a taxa de acerto de cada um (visão administrativa)"""
+        with self._lock:
+            lookups = self._stat("lookups")
+            rows = self._conn.execute(
+                "SELECT id, question, sql_template, hits, created_at, last_used "
+                "FROM sql_plans ORDER BY hits DESC, last_used DESC"
+            ).fetchall()
+        return [
+            {
+                'id': plan_id,
+                'question': question,
+                'sql_template': template,
+                'hits': hits,
+                'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+                'created_at': created_at,
+                'last_used': last_used
+            }
+            for plan_id, question, template, hits, created_at, last_used in rows
+        ]
+
+    def _stat(self, name: str) -> int:
+        row = self._conn.execute("SELECT value FROM sql_plan_stats WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas de uso do cache de planos"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM sql_plans").fetchone()[0]
+            lookups, hits = self._stat("lookups"), self._stat("hits")
+        return {
+            'enabled': SQL_PLAN_CACHE_ENABLED,
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'lookups': lookups,
+            'hits': hits,
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0
+        }
+
+# Instância global do cache de planos
+sql_plan_cache = SQLPlanCache()
+
+def _validated_sql(intermediate_steps: List[Tuple[Any, str]]) -> Optional[str]:
+    """Última consulta de leitura executada pelo agente sem erro"""
+    for action, observation in reversed(intermediate_steps):
+        if (
+            getattr(action, "tool", None) == "sql_db_query"
+            and isinstance(action.tool_input, str)
+            and READ_ONLY_SQL_RE.match(action.tool_input)
+            and not str(observation).startswith("Error")
+        ):
+            return action.tool_input
+    return None
+
+def _rows(db: Session, sql: str) -> List[Dict[str, Any]]:
+    return [dict(row) for row in db.execute(text(sql)).mappings()]
+
+def run_sql_agent_with_plans(agent, question: str, db: Session, data_version: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Responde com o plano guardado quando houver; senão executa o agente SQL e
+    guarda a consulta validada
+
+    As consultas rodam na sessão da requisição; `data_version` (a versão dos
+    dados já lida pela requisição) indexa o cache de resultados do agente.
+
+    Returns:
+        Dict com 'answer' (tabela das linhas), 'rows', 'sql', 'plan_hit',
+        'agent_output' (texto do LLM, None em um plano) e os acertos do
+        cache SQL ('sql_cache', None em um plano)
+    """
+    plan = sql_plan_cache.lookup(question) if SQL_PLAN_CACHE_ENABLED else None
+    if plan is not None:
+        try:
+            rows = _rows(db, plan['sql'])
+            return {
+                'answer': format_table(rows), 'rows': rows, 'sql': plan['sql'],
+                'plan_hit': True, 'agent_output': None, 'sql_cache': None
+            }
+        except Exception as e:
+            # SQL guardado deixou de ser válido (ex.: migração): descarta e usa o agente
+            db.rollback()
+            print(f"⚠️ Plano SQL {plan['id']} inválido, removendo: {e}")
+            sql_plan_cache.delete(plan['id'])
+
+    with track_agent_run(data_version) as cache_stats:
+        result = agent({"input": question})
+
+    sql = _validated_sql(result.get("intermediate_steps", []))
+    stopped = result["output"].startswith("Agent stopped")
+    rows = _rows(db, sql) if sql else []
+    if SQL_PLAN_CACHE_ENABLED and sql and not stopped:
+        sql_plan_cache.store(question, sql)
+
+    return {
+        'answer': format_table(rows) if sql else result["output"],
+        'rows': rows,
+        'sql': sql,
+        'plan_hit': False,
+        'agent_output': result["output"],
+        'sql_cache': cache_stats
+    }
@@ -0,0 +1,154 @@
+"""
+Cache de resultados das consultas executadas pelo agente SQL do LangChain
+
+O agente criado por `create_sql_agent` repete chamadas quase idênticas da
+ferramenta `sql_db_query` entre perguntas e entre as próprias iterações. A
+ferramenta é substituída por uma versão com cache, indexado pelo SQL
+normalizado e pela versão dos dados, com despejo LRU por tamanho. A versão
+é a já lida pela requisição (passada a track_agent_run), sem uma sessão nova
+por chamada da ferramenta. As contagens de acertos são acumuladas
+globalmente e por execução do agente.
+(A ferramenta `sql_db_schema` já é servida pelo cache de app.schema_cache.)
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Any
+
+from langchain.agents.agent_toolkits import SQLDatabaseToolkit
+from langchain.tools import BaseTool
+from langchain.tools.sql_database.tool import QuerySQLDataBaseTool
+
+from app import crud
+from app.database import SessionLocal
+
+# Configurações do cache de resultados SQL
+SQL_RESULT_CACHE_ENABLED = os.getenv("SQL_RESULT_CACHE_ENABLED", "True").lower() == "true"
+SQL_RESULT_CACHE_MAX_ENTRIES = int(os.getenv("SQL_RESULT_CACHE_MAX_ENTRIES", "256"))
+
+# Literais entre aspas são preservados; o restante é normalizado
+_LITERAL_RE = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")")
+_WHITESPACE_RE = re.compile(r"\s+")
+READ_ONLY_SQL_RE = re.compile(r"^\s*(?:select|with)\b", re.IGNORECASE)
+
+def normalize_sql(query: str) -> str:
+    """Normaliza o SQL: minúsculas e espaços simples fora dos literais, sem ';' final"""
+    parts = _LITERAL_RE.split(query.strip().rstrip(";").strip())
+    return "".join(
+        part if index % 2 else _WHITESPACE_RE.sub(" ", part.lower())
+        for index, part in enumerate(parts)
+    ).strip()
+
+_run_stats: ContextVar[Optional[Dict[str, int]]] = ContextVar("sql_result_cache_run", default=None)
+_run_data_version: ContextVar[Optional[str]] = ContextVar("sql_result_cache_version", default=None)
+
+@contextmanager
+def track_agent_run(data_version: Optional[str] = None) -> Iterator[Dict[str, int]]:
+    """
+    Conta os acertos e falhas do cache durante uma execução do agente
+
+    `data_version` é a versão dos dados usada como chave pelas consultas da
+    execução (a ferramenta roda na mesma thread, dentro deste contexto).
+    """
+    stats = {'hits': 0, 'misses': 0}
+    stats_token, version_token = _run_stats.set(stats), _run_data_version.set(data_version)
+    try:
+        yield stats
+    finally:
+        _run_stats.reset(stats_token)
+        _run_data_version.reset(version_token)
+
+class SQLResultCache:
+    """
+    Resultados de consultas SQL em memória com despejo LRU
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or SQL_RESULT_CACHE_MAX_ENTRIES
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[tuple, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _count(self, field: str):
+        setattr(self, field, getattr(self, field) + 1)
+        run_stats = _run_stats.get()
+        if run_stats is not None:
+            run_stats[field] += 1
+
+    def get(self, key: tuple) -> Optional[str]:
+        """Busca um resultado, marcando-o como usado recentemente"""
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self._count('misses')
+                return None
+            self._entries.move_to_end(key)
+            self._count('hits')
+            return result
+
+    def set(self, key: tuple, result: str):
+        """Armazena um resultado, despejando os menos usados acima do limite"""
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove todos os resultados"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas de uso do cache"""
+        with self._lock:
+            return {
+                'enabled': SQL_RESULT_CACHE_ENABLED,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+# Instância global do cache de resultados SQL
+sql_result_cache = SQLResultCache()
+
+def _current_data_version() -> str:
+    """Versão dos dados da execução em curso (fora de uma execução, lida em sessão própria)"""
+    data_version = _run_data_version.get()
+    if data_version is not None:
+        return data_version
+    with SessionLocal() as session:
+        return crud.get_data_version(session)
+
+class CachedQuerySQLDataBaseTool(QuerySQLDataBaseTool):
+    """Ferramenta sql_db_query com cache de resultados para consultas de leitura"""
+
+    def _run(self, query: str, run_manager: Any = None) -> str:
+        if not SQL_RESULT_CACHE_ENABLED or not READ_ONLY_SQL_RE.match(query):
+            return super()._run(query, run_manager)
+
+        key = (normalize_sql(query), _current_data_version())
+        result = sql_result_cache.get(key)
+        if result is not None:
+            return result
+
+        result = super()._run(query, run_manager)
+        # Mensagens de erro não são armazenadas (o agente reescreve a consulta)
+        if not result.startswith("Error:"):
+            sql_result_cache.set(key, result)
+        return result
+
+class CachedSQLDatabaseToolkit(SQLDatabaseToolkit):
+    """SQLDatabaseToolkit cuja ferramenta de consulta usa o cache de resultados"""
+
+    def get_tools(self) -> List[BaseTool]:
+        return [
+            CachedQuerySQLDataBaseTool(db=tool.db, description=tool.description)
+            if isinstance(tool, QuerySQLDataBaseTool) else tool
+            for tool in super().get_tools()
+        ]
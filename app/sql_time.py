@@ -0,0 +1,61 @@
+"""
+Expressões de data e hora independentes de dialeto
+
+As colunas geradas sale_epoch/sale_day, a série diária e o relatório mensal
+convertem entre data e segundos desde 1970 (sem fuso). Cada conversão é uma
+construção SQLAlchemy compilada por dialeto (SQLite e PostgreSQL); em outro
+dialeto a compilação falha com CompileError em vez de gerar SQL inválido.
+As migrações de app.migrations continuam específicas do SQLite.
+"""
+from sqlalchemy import Integer, String
+from sqlalchemy.exc import CompileError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+class epoch_seconds(FunctionElement):
+    """Segundos desde 1970 de uma data/hora sem fuso (inteiro)"""
+    type = Integer()
+    inherit_cache = True
+
+class epoch_date(FunctionElement):
+    """Data 'AAAA-MM-DD' de um instante em segundos desde 1970"""
+    type = String()
+    inherit_cache = True
+
+class epoch_month(FunctionElement):
+    """Mês 'AAAA-MM' de um instante em segundos desde 1970"""
+    type = String()
+    inherit_cache = True
+
+def _argument(compiler, element, **kw) -> str:
+    return compiler.process(element.clauses.clauses[0], **kw)
+
+@compiles(epoch_seconds)
+@compiles(epoch_date)
+@compiles(epoch_month)
+def _unsupported(element, compiler, **kw):
+    raise CompileError(f"{type(element).__name__} não suportado no dialeto {compiler.dialect.name}")
+
+@compiles(epoch_seconds, "sqlite")
+def _epoch_seconds_sqlite(element, compiler, **kw):
+    return f"CAST(strftime('%s', {_argument(compiler, element, **kw)}) AS INTEGER)"
+
+@compiles(epoch_date, "sqlite")
+def _epoch_date_sqlite(element, compiler, **kw):
+    return f"date({_argument(compiler, element, **kw)}, 'unixepoch')"
+
+@compiles(epoch_month, "sqlite")
+def _epoch_month_sqlite(element, compiler, **kw):
+    return f"strftime('%Y-%m', {_argument(compiler, element, **kw)}, 'unixepoch')"
+
+@compiles(epoch_seconds, "postgresql")
+def _epoch_seconds_postgresql(element, compiler, **kw):
+    return f"CAST(EXTRACT(EPOCH FROM {_argument(compiler, element, **kw)}) AS INTEGER)"
+
+@compiles(epoch_date, "postgresql")
+def _epoch_date_postgresql(element, compiler, **kw):
+    return f"to_char(to_timestamp({_argument(compiler, element, **kw)}) AT TIME ZONE 'UTC', 'YYYY-MM-DD')"
+
+@compiles(epoch_month, "postgresql")
+def _epoch_month_postgresql(element, compiler, **kw):
+    return f"to_char(to_timestamp({_argument(compiler, element, **kw)}) AT TIME ZONE 'UTC', 'YYYY-MM')"
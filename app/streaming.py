@@ -0,0 +1,17 @@
+"""
+Utilitários para respostas em streaming (Server-Sent Events)
+"""
+import json
+from typing import Any, Dict, Iterable, Iterator
+
+# Cabeçalhos que evitam buffering em proxies e caches
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no"
+}
+
+def to_sse(events: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """Converte eventos do agente ({'event': ..., ...}) no formato SSE"""
+    for event in events:
+        payload = json.dumps(event, default=str, ensure_ascii=False)
+        yield f"event: {event['event']}\ndata: {payload}\n\n"
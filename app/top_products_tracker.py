@@ -0,0 +1,342 @@
+"""
+Ranking incremental dos produtos mais vendidos em memória
+
+"Produtos mais vendidos" é a pergunta mais frequente e cada resposta era uma
+agregação completa sobre as vendas. Aqui cada processo mantém contadores por
+dia (o inteiro sale_day) e por produto (quantidade, receita em centavos e
+pedidos) dos últimos TOP_PRODUCTS_MAX_DAYS dias, além dos totais e do top-K
+já ordenado de cada janela consultada (7, 30 e 90 dias desde a carga; outras
+a partir do primeiro uso). Os contadores são reconstruídos do banco na
+inicialização, atualizados pelo cadastro de vendas (crud.create_sale) e
+sincronizados com vendas inseridas por outros processos pelo maior id.
+
+O tracker atende a consulta `top_products` do registro analítico com os
+mesmos limites start_day/end_day de build_params: janelas de até
+TOP_PRODUCTS_MAX_DAYS dias são respondidas da memória e as demais seguem para
+o SQL, assim como as consultas em que o último dia tem vendas posteriores ao
+fim da janela. Nome, SKU, categoria e preço são lidos do banco na consulta
+(só dos produtos do ranking), então alterações de cadastro aparecem na hora.
+Os mesmos contadores exatos dão o ranking e as somas por produto do modo
+aproximado (approximate_analytics).
+"""
+import bisect
+import heapq
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Any
+
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.analytics_queries import DEFAULT_WINDOW_DAYS, build_params, epoch_seconds, register_fast_path
+
+# Configurações do tracker
+TOP_PRODUCTS_TRACKER_ENABLED = os.getenv("TOP_PRODUCTS_TRACKER_ENABLED", "True").lower() == "true"
+TOP_PRODUCTS_MAX_DAYS = int(os.getenv("TOP_PRODUCTS_MAX_DAYS", "90"))
+TOP_PRODUCTS_TOP_K = int(os.getenv("TOP_PRODUCTS_TOP_K", "50"))
+TOP_PRODUCTS_WINDOWS = tuple(
+    int(days) for days in os.getenv("TOP_PRODUCTS_WINDOWS", "7,30,90").split(",") if days.strip()
+)
+TOP_PRODUCTS_SYNC_SECONDS = float(os.getenv("TOP_PRODUCTS_SYNC_SECONDS", "1"))
+
+sales = models.Sale.__table__
+products = models.Product.__table__
+
+# Cadastro dos produtos do ranking, lido a cada consulta (statement criado uma única vez)
+PRODUCT_DETAILS = select(
+    products.c.id, products.c.name, products.c.sku, products.c.category, products.c.price_cents
+).where(products.c.id.in_(bindparam("product_ids", expanding=True)))
+
+# Contadores de um produto: [quantidade, receita em centavos, pedidos]
+Counters = List[int]
+
+def _current_day() -> int:
+    """Dia de hoje na escala de sale_day (dias desde 1970-01-01)"""
+    return epoch_seconds(datetime.now()) // 86400
+
+def _merge(totals: Dict[int, Counters], day: Dict[int, Counters]):
+    """Soma os contadores de um dia nos totais"""
+    for product_id, (quantity, cents, orders) in day.items():
+        entry = totals.setdefault(product_id, [0, 0, 0])
+        entry[0] += quantity
+        entry[1] += cents
+        entry[2] += orders
+
+class TopProductsTracker:
+    """
+    Contadores por dia e produto com totais e top-K mantidos por janela
+    """
+
+    def __init__(self, max_days: Optional[int] = None, top_k: Optional[int] = None,
+                 windows: Optional[Tuple[int, ...]] = None):
+        self.max_days = max_days or TOP_PRODUCTS_MAX_DAYS
+        self.top_k = top_k or TOP_PRODUCTS_TOP_K
+        self.windows = tuple(days for days in (windows or TOP_PRODUCTS_WINDOWS) if days <= self.max_days)
+        self.loaded = False
+        self.hits = 0
+        self.fallbacks = 0
+        self.rebuild_ms = 0.0
+        self._query_seconds = 0.0
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._today = _current_day()
+        self._daily: Dict[int, Dict[int, Counters]] = {}
+        # Maior sale_epoch de cada dia: detecta vendas posteriores ao fim da janela
+        self._day_last_epoch: Dict[int, int] = {}
+        self._totals: Dict[int, Dict[int, Counters]] = {days: {} for days in self.windows}
+        self._top: Dict[int, Optional[List[Tuple[int, int]]]] = {days: None for days in self.windows}
+        self._last_sale_id = 0
+        self._last_sync = 0.0
+
+    def rebuild(self, db: Session):
+        """Reconstrói os contadores a partir do banco (inicialização ou após remoções)"""
+        start = time.perf_counter()
+        statement = (
+            select(
+                sales.c.sale_day,
+                sales.c.product_id,
+                func.sum(sales.c.quantity),
+                func.sum(sales.c.total_amount_cents),
+                func.count(sales.c.id),
+                func.max(sales.c.sale_epoch)
+            )
+            .where(sales.c.sale_day >= _current_day() - self.max_days)
+            .group_by(sales.c.sale_day, sales.c.product_id)
+        )
+
+        with self._lock:
+            self._reset()
+            for sale_day, product_id, quantity, cents, orders, last_epoch in db.execute(statement):
+                self._add(sale_day, last_epoch, product_id, quantity, cents or 0, orders)
+            self._last_sale_id = db.execute(select(func.max(sales.c.id))).scalar() or 0
+            self._last_sync = time.monotonic()
+            self.loaded = True
+            self.rebuild_ms = (time.perf_counter() - start) * 1000
+        print(f"✅ Ranking de produtos em memória: {len(self._daily)} dias, {self.rebuild_ms:.1f} ms")
+
+    def ensure_loaded(self, db: Session):
+        """Reconstrói os contadores apenas se ainda não foram carregados"""
+        if not self.loaded:
+            self.rebuild(db)
+
+    def _add(self, day: int, last_epoch: int, product_id: int, quantity: int, cents: int, orders: int):
+        """Acumula uma venda (ou agregado de vendas) no dia e nas janelas que o contêm"""
+        if self._today - day > self.max_days:
+            return
+        counters = {product_id: [quantity, cents, orders]}
+        _merge(self._daily.setdefault(day, {}), counters)
+        self._day_last_epoch[day] = max(self._day_last_epoch.get(day, last_epoch), last_epoch)
+        for days, totals in self._totals.items():
+            if 0 <= self._today - day <= days:
+                _merge(totals, counters)
+                self._update_top(days, product_id, totals[product_id][0])
+
+    def _update_top(self, days: int, product_id: int, quantity: int):
+        """
+        Reposiciona o produto no top-K da janela
+
+        Dentro do dia os contadores só crescem, então basta reinserir o produto
+        e descartar o excedente; na virada do dia o top-K é recalculado.
+        """
+        top = self._top[days]
+        if top is None:
+            return
+        top = [entry for entry in top if entry[1] != product_id]
+        bisect.insort(top, (-quantity, product_id))
+        self._top[days] = top[:self.top_k]
+
+    def _advance(self, today: Optional[int] = None):
+        """Na virada do dia, descarta os dias antigos e recalcula as janelas mantidas"""
+        today = today or _current_day()
+        if today <= self._today:
+            return
+        self._today = today
+        for day in [day for day in self._daily if today - day > self.max_days]:
+            del self._daily[day]
+            self._day_last_epoch.pop(day, None)
+        for days in self._totals:
+            self._totals[days] = self._sum_days(days)
+            self._top[days] = None
+
+    def record_sale(self, sale: models.Sale):
+        """Acumula uma venda recém-cadastrada"""
+        with self._lock:
+            if not self.loaded:
+                return
+            if sale.id != self._last_sale_id + 1:
+                # Há vendas de outros processos antes desta: a próxima consulta sincroniza todas
+                self._last_sync = 0.0
+                return
+            self._advance()
+            sale_epoch = epoch_seconds(sale.sale_date)
+            self._add(
+                sale_epoch // 86400, sale_epoch, sale.product_id, sale.quantity, sale.total_amount_cents, 1
+            )
+            self._last_sale_id = sale.id
+
+    def sync(self, db: Session):
+        """Incorpora vendas inseridas por outros processos (no máximo a cada TOP_PRODUCTS_SYNC_SECONDS)"""
+        if time.monotonic() - self._last_sync < TOP_PRODUCTS_SYNC_SECONDS:
+            return
+        last_sale_id = db.execute(select(func.max(sales.c.id))).scalar() or 0
+        if last_sale_id < self._last_sale_id:
+            # Vendas removidas: os contadores não são decrementáveis por id
+            self.rebuild(db)
+            return
+
+        with self._lock:
+            if last_sale_id > self._last_sale_id:
+                new_sales = db.execute(
+                    select(
+                        sales.c.id, sales.c.product_id, sales.c.quantity,
+                        sales.c.total_amount_cents, sales.c.sale_day, sales.c.sale_epoch
+                    ).where(sales.c.id > self._last_sale_id)
+                ).all()
+                for row in new_sales:
+                    self._add(
+                        row.sale_day, row.sale_epoch, row.product_id, row.quantity, row.total_amount_cents, 1
+                    )
+                    self._last_sale_id = max(self._last_sale_id, row.id)
+            self._last_sync = time.monotonic()
+
+    def _sum_days(self, days: int) -> Dict[int, Counters]:
+        """Soma os contadores diários da janela [hoje - days, hoje]"""
+        return self._sum_range(self._today - days, self._today)
+
+    def _sum_range(self, first_day: int, last_day: int) -> Dict[int, Counters]:
+        """Soma os contadores diários dos dias [first_day, last_day]"""
+        totals: Dict[int, Counters] = {}
+        for day, counters in self._daily.items():
+            if first_day <= day <= last_day:
+                _merge(totals, counters)
+        return totals
+
+    def _window_totals(self, days: int) -> Dict[int, Counters]:
+        """
+        Totais da janela; uma janela nova é somada dos dias na primeira consulta
+        e passa a ser mantida incrementalmente como as padrão
+        """
+        if days not in self._totals:
+            self._totals[days] = self._sum_days(days)
+            self._top[days] = None
+        return self._totals[days]
+
+    def _ranked(self, days: int, limit: int) -> List[Tuple[int, Counters]]:
+        """Produtos da janela [hoje - days, hoje] por quantidade (desc) e id (asc), como a consulta SQL"""
+        totals = self._window_totals(days)
+        if limit <= self.top_k:
+            top = self._top[days]
+            if top is None:
+                top = heapq.nsmallest(self.top_k, ((-entry[0], product_id) for product_id, entry in totals.items()))
+                self._top[days] = top
+            return [(product_id, totals[product_id]) for _, product_id in top[:limit]]
+
+        ranked = heapq.nsmallest(limit, ((-entry[0], product_id) for product_id, entry in totals.items()))
+        return [(product_id, totals[product_id]) for _, product_id in ranked]
+
+    def product_totals(self, db: Session, first_day: int, last_day: int) -> Optional[Dict[int, Counters]]:
+        """
+        Contadores exatos por produto dos dias (sale_day) [first_day, last_day]
+
+        Returns:
+            Produto -> [quantidade, receita em centavos, pedidos], ou None se
+            first_day está fora dos dias mantidos
+        """
+        self.ensure_loaded(db)
+        self.sync(db)
+        with self._lock:
+            self._advance()
+            if self._today - first_day > self.max_days:
+                return None
+            return self._sum_range(first_day, last_day)
+
+    def top_products(self, db: Session, days: int = DEFAULT_WINDOW_DAYS,
+                     limit: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Produtos mais vendidos nos últimos `days` dias
+
+        A janela é a de build_params (dias start_day a end_day). Nome, SKU,
+        categoria e preço vêm do banco, lidos só para os produtos do ranking.
+
+        Returns:
+            Linhas no formato da consulta `top_products` do registro, ou None
+            se o último dia tem vendas posteriores ao fim da janela (usar SQL)
+        """
+        params = build_params("top_products", days=days, limit=limit)
+        first_day, last_day = params["start_day"], params["end_day"]
+        self.ensure_loaded(db)
+        self.sync(db)
+
+        start = time.perf_counter()
+        with self._lock:
+            self._advance(last_day)
+            if self._day_last_epoch.get(last_day, params["end_epoch"] - 1) >= params["end_epoch"]:
+                return None
+            if last_day == self._today and last_day - first_day == days:
+                ranked = self._ranked(days, params["limit"])
+            else:
+                totals = self._sum_range(first_day, last_day)
+                ranked = [
+                    (product_id, totals[product_id]) for _, product_id in
+                    heapq.nsmallest(params["limit"], ((-entry[0], product_id) for product_id, entry in totals.items()))
+                ]
+
+        details = {
+            row.id: row for row in db.execute(
+                PRODUCT_DETAILS, {"product_ids": [product_id for product_id, _ in ranked]}
+            )
+        }
+        rows = []
+        for product_id, (quantity, cents, orders) in ranked:
+            product = details[product_id]
+            rows.append({
+                'id': product_id,
+                'name': product.name,
+                'sku': product.sku,
+                'category': product.category,
+                'price': product.price_cents / 100 if product.price_cents is not None else None,
+                'total_quantity': quantity,
+                'total_revenue': cents / 100,
+                'total_orders': orders
+            })
+        with self._lock:
+            self.hits += 1
+            self._query_seconds += time.perf_counter() - start
+        return rows
+
+    def query(self, db: Session, days: int = DEFAULT_WINDOW_DAYS, limit: Optional[int] = None,
+              **window: Any) -> Optional[List[Dict[str, Any]]]:
+        """Caminho rápido da consulta `top_products` (None: janela não atendida, usar SQL)"""
+        rows = None
+        if not window and days <= self.max_days:
+            rows = self.top_products(db, days=days, limit=limit)
+        if rows is None:
+            self.fallbacks += 1
+        return rows
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna o estado e a latência média do tracker"""
+        with self._lock:
+            return {
+                'enabled': TOP_PRODUCTS_TRACKER_ENABLED,
+                'loaded': self.loaded,
+                'days_tracked': len(self._daily),
+                'max_days': self.max_days,
+                'maintained_windows': sorted(self._totals),
+                'last_sale_id': self._last_sale_id,
+                'rebuild_ms': round(self.rebuild_ms, 3),
+                'hits': self.hits,
+                'fallbacks': self.fallbacks,
+                'avg_query_us': round(self._query_seconds / self.hits * 1e6, 1) if self.hits else 0.0
+            }
+
+# Instância global do tracker
+top_products_tracker = TopProductsTracker()
+
+if TOP_PRODUCTS_TRACKER_ENABLED:
+    register_fast_path("top_products", top_products_tracker.query)
@@ -0,0 +1,47 @@
+"""
+Benchmark das consultas do registro analítico
+
+Mede o tempo médio de cada consulta de app.analytics_queries com o cache de
+compilação do engine (comportamento padrão) e com a compilação refeita a cada
+execução.
+
+Uso:
+    python -m benchmarks.bench_analytics_queries [vendas] [repetições]
+"""
+import os
+import sys
+import time
+import tempfile
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.analytics_queries import ANALYTICS_QUERIES, build_params
+from benchmarks.sample_data import create_sample_database
+
+def time_query(session: Session, name: str, repetitions: int, compiled_cache: bool) -> float:
+    """Retorna o tempo médio (ms) de execução da consulta"""
+    query = ANALYTICS_QUERIES[name]
+    params = build_params(name)
+    options = {} if compiled_cache else {"compiled_cache": None}
+
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        session.execute(query.statement, params, execution_options=options).all()
+    return (time.perf_counter() - start) * 1000 / repetitions
+
+if __name__ == "__main__":
+    n_sales = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    repetitions = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    path = os.path.join(tempfile.gettempdir(), "bench_analytics_queries.db")
+    url = create_sample_database(path, n_sales)
+    engine = create_engine(url)
+
+    print(f"{n_sales:,} vendas, {repetitions} repetições por consulta")
+    print(f"{'consulta':<24}{'com cache (ms)':>16}{'sem cache (ms)':>16}")
+    with Session(engine) as session:
+        for name in ANALYTICS_QUERIES:
+            cached = time_query(session, name, repetitions, compiled_cache=True)
+            uncached = time_query(session, name, repetitions, compiled_cache=False)
+            print(f"{name:<24}{cached:>16.3f}{uncached:>16.3f}")
@@ -0,0 +1,82 @@
+"""
+Benchmark do modo aproximado (HyperLogLog + amostragem) contra o SQL
+
+Compara, nas janelas de 7, 30 e 90 dias, o tempo das consultas com contagens
+distintas (executive_summary, top_products_detailed, period_overview) no SQL
+e no modo aproximado, o erro relativo das colunas estimadas e a fração dos
+valores exatos dentro do intervalo de 95% informado.
+
+Uso:
+    python -m benchmarks.bench_approximate_analytics [vendas] [repetições]
+"""
+import os
+import sys
+import time
+import tempfile
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.analytics_queries import ANALYTICS_QUERIES, build_params
+from app.approximate_analytics import APPROXIMATE_QUERIES, ApproximateAnalytics
+from benchmarks.sample_data import create_sample_database
+
+WINDOWS = (7, 30, 90)
+# Linhas do top_products_detailed comparadas (por nome do produto)
+PRODUCT_LIMIT = 50
+
+def average_ms(function, repetitions: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        function()
+    return (time.perf_counter() - start) * 1000 / repetitions
+
+def sql_rows(session: Session, name: str, days: int):
+    params = build_params(name, days=days, limit=PRODUCT_LIMIT)
+    return [dict(row) for row in session.execute(ANALYTICS_QUERIES[name].statement, params).mappings()]
+
+def compare(exact, estimate):
+    """Erro relativo médio e cobertura do intervalo por coluna estimada"""
+    key = 'product_name' if exact and 'product_name' in exact[0] else None
+    expected_by_key = {row[key]: row for row in exact} if key else {None: exact[0]}
+    errors = {}
+    for row, bounds in zip(estimate['rows'], estimate['error_bounds']):
+        expected = expected_by_key.get(row[key] if key else None)
+        if expected is None:
+            continue
+        for column, bound in bounds.items():
+            if not expected[column]:
+                continue
+            error = abs(row[column] - expected[column])
+            stats = errors.setdefault(column, [0.0, 0, 0])
+            stats[0] += error / expected[column]
+            stats[1] += error <= bound
+            stats[2] += 1
+    return {column: (total / count, covered / count) for column, (total, covered, count) in errors.items()}
+
+if __name__ == "__main__":
+    n_sales = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    repetitions = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    path = os.path.join(tempfile.gettempdir(), "bench_approximate_analytics.db")
+    engine = create_engine(create_sample_database(path, n_sales, n_customers=200_000))
+
+    with Session(engine) as session:
+        approximate = ApproximateAnalytics()
+        approximate.load(session)
+        stats = approximate.stats()
+        print(f"Sketches: {stats['sketch_entries']:,} entradas; amostra: {stats['sample_rows']:,} vendas; {stats['memory_mb']} MB")
+
+        print(f"{'consulta':<24}{'janela':>7}{'SQL (ms)':>11}{'aprox. (ms)':>13}{'speedup':>9}  erro relativo médio (cobertura do IC 95%)")
+        for name in APPROXIMATE_QUERIES:
+            for days in WINDOWS:
+                exact = sql_rows(session, name, days)
+                estimate = approximate.query(session, name, days=days, limit=PRODUCT_LIMIT)
+                sql_ms = average_ms(lambda: sql_rows(session, name, days), repetitions)
+                approximate_ms = average_ms(
+                    lambda: approximate.query(session, name, days=days, limit=PRODUCT_LIMIT), repetitions
+                )
+                accuracy = ", ".join(
+                    f"{column} {error:.2%} ({coverage:.0%})" for column, (error, coverage) in compare(exact, estimate).items()
+                )
+                print(f"{name:<24}{days:>6}d{sql_ms:>11.1f}{approximate_ms:>13.2f}{sql_ms / approximate_ms:>8.0f}x  {accuracy}")
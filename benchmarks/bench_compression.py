@@ -0,0 +1,71 @@
+"""
+Benchmark da compressão das respostas: tamanho e CPU por codificação e nível
+
+Comprime corpos reais (página de /sales, página de /customers e o
+frontend/index.html) passando pelo CompressionMiddleware e informa a
+razão de compressão e o tempo de CPU por MB de entrada, a partir dos
+contadores de compression_stats. O brotli só é medido se estiver instalado.
+
+Uso:
+    python -m benchmarks.bench_compression [vendas] [limite] [repetições]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+import orjson
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.compression import BROTLI_AVAILABLE, CompressionMiddleware, CompressionStats
+from app.list_responses import read_list
+from benchmarks.sample_data import create_sample_database
+
+def respond(body: bytes, content_type: bytes):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", content_type)]})
+        await send({"type": "http.response.body", "body": body})
+    return app
+
+async def compress(middleware: CompressionMiddleware, encoding: str, repetitions: int):
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "headers": [(b"accept-encoding", encoding.encode())]}
+    for _ in range(repetitions):
+        await middleware(scope, None, send)
+
+if __name__ == "__main__":
+    n_sales = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    page = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    repetitions = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    path = os.path.join(tempfile.gettempdir(), "bench_compression.db")
+    url = create_sample_database(path, n_sales)
+    with Session(create_engine(url)) as session:
+        bodies = {
+            f"/sales ({page})": (orjson.dumps(read_list(session, "sales", limit=page)), b"application/json"),
+            f"/customers ({page})": (orjson.dumps(read_list(session, "customers", limit=page)), b"application/json"),
+        }
+    with open("frontend/index.html", "rb") as f:
+        bodies["index.html"] = (f.read(), b"text/html; charset=utf-8")
+
+    settings = [("gzip", level) for level in (1, 6, 9)]
+    if BROTLI_AVAILABLE:
+        settings += [("br", quality) for quality in (1, 4, 11)]
+
+    print(f"{repetitions} repetições por corpo (brotli {'disponível' if BROTLI_AVAILABLE else 'não instalado'})")
+    print(f"{'corpo':<20}{'original (KB)':>14}{'codificação':>14}{'comprimido (KB)':>17}{'razão':>8}{'CPU (ms/MB)':>13}")
+    for name, (body, content_type) in bodies.items():
+        for encoding, level in settings:
+            stats = CompressionStats()
+            middleware = CompressionMiddleware(
+                respond(body, content_type), minimum_size=0, gzip_level=level, brotli_quality=level, stats=stats
+            )
+            asyncio.run(compress(middleware, encoding, repetitions))
+            result = stats.stats()["encodings"][encoding]
+            print(
+                f"{name:<20}{len(body) / 1024:>14.1f}{f'{encoding}-{level}':>14}"
+                f"{result['compressed_bytes'] / repetitions / 1024:>17.1f}{result['ratio']:>8.3f}{result['cpu_ms_per_mb']:>13.1f}"
+            )
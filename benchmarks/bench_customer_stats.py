@@ -0,0 +1,59 @@
+"""
+Benchmark do ranking de clientes a partir de customer_stats
+
+Mede a carga inicial da tabela, o custo de incorporar vendas novas
+(o caminho de cada crud.create_sale) e compara a consulta agregada
+`customer_ranking` com a leitura indexada `customer_stats_ranking`.
+
+Uso:
+    python -m benchmarks.bench_customer_stats [vendas] [repetições]
+"""
+import os
+import sys
+import time
+import tempfile
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app import models
+from app.analytics_queries import run_analytics_query
+from app.customer_stats import apply_new_sales, ensure_customer_stats
+from benchmarks.sample_data import create_sample_database
+
+def average_ms(function, repetitions: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        function()
+    return (time.perf_counter() - start) * 1000 / repetitions
+
+if __name__ == "__main__":
+    n_sales = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    repetitions = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    path = os.path.join(tempfile.gettempdir(), "bench_customer_stats.db")
+    url = create_sample_database(path, n_sales)
+    engine = create_engine(url)
+
+    with Session(engine) as session:
+        start = time.perf_counter()
+        ensure_customer_stats(session)
+        print(f"{n_sales:,} vendas, carga inicial de customer_stats: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        def record_sale():
+            session.add(models.Sale(
+                product_id=1, customer_id=1, quantity=1, total_amount=10, sale_date=datetime.now()
+            ))
+            session.flush()
+            apply_new_sales(session)
+            session.commit()
+
+        print(f"venda + atualização incremental: {average_ms(record_sale, repetitions):.2f} ms")
+
+        aggregated_ms = average_ms(lambda: run_analytics_query(session, "customer_ranking"), repetitions)
+        indexed_ms = average_ms(lambda: run_analytics_query(session, "customer_stats_ranking"), repetitions)
+        print(f"{'consulta':<26}{'tempo (ms)':>12}")
+        print(f"{'customer_ranking':<26}{aggregated_ms:>12.3f}")
+        print(f"{'customer_stats_ranking':<26}{indexed_ms:>12.3f}")
+        print(f"speedup: {aggregated_ms / indexed_ms:.0f}x")
@@ -0,0 +1,114 @@
+"""
+Benchmark do resumo executivo em passada única
+
+Compara a forma anterior da consulta (quatro subconsultas escalares que releem
+a tabela sales) com a versão do registro analítico (CTE materializada lida
+uma única vez). Antes de medir, verifica que as duas formas retornam o mesmo
+resultado e conta, pelo EXPLAIN QUERY PLAN, quantas vezes cada uma lê sales.
+
+Uso:
+    python -m benchmarks.bench_executive_summary [vendas] [repetições]
+"""
+import math
+import os
+import re
+import sys
+import time
+import tempfile
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.analytics_queries import ANALYTICS_QUERIES, build_params
+from benchmarks.sample_data import create_sample_database
+
+# Forma anterior do resumo executivo (subconsultas escalares correlacionadas à janela)
+LEGACY_EXECUTIVE_SUMMARY = text("""
+    SELECT
+        COUNT(DISTINCT s.id) AS total_transactions,
+        SUM(s.total_amount_cents) / 100.0 AS total_revenue,
+        COUNT(DISTINCT p.id) AS products_sold,
+        COUNT(DISTINCT c.id) AS active_customers,
+        AVG(s.total_amount_cents) / 100.0 AS average_order_value,
+        SUM(s.quantity) AS total_items_sold,
+        MAX(s.total_amount_cents) / 100.0 AS highest_sale,
+        MIN(s.total_amount_cents) / 100.0 AS lowest_sale,
+        ROUND(AVG(s.quantity), 2) AS avg_items_per_sale,
+        ROUND(SUM(s.total_amount_cents) / 100.0 / (COUNT(DISTINCT c.id) + 0.0), 2) AS revenue_per_customer,
+        (SELECT p2.name FROM products p2
+         JOIN sales s2 ON p2.id = s2.product_id
+         WHERE s2.sale_date >= :start_date AND s2.sale_date < :end_date
+         GROUP BY p2.id ORDER BY SUM(s2.quantity) DESC LIMIT 1) AS top_product_by_quantity,
+        (SELECT c2.name FROM customers c2
+         JOIN sales s2 ON c2.id = s2.customer_id
+         WHERE s2.sale_date >= :start_date AND s2.sale_date < :end_date
+         GROUP BY c2.id ORDER BY SUM(s2.total_amount_cents) DESC LIMIT 1) AS top_customer,
+        (SELECT COUNT(*) FROM sales
+         WHERE sale_date >= :recent_start AND sale_date < :end_date) AS sales_last_week,
+        (SELECT SUM(total_amount_cents) / 100.0 FROM sales
+         WHERE sale_date >= :recent_start AND sale_date < :end_date) AS revenue_last_week
+    FROM sales s
+    JOIN products p ON s.product_id = p.id
+    JOIN customers c ON s.customer_id = c.id
+    WHERE s.sale_date >= :start_date AND s.sale_date < :end_date
+""")
+
+def same_row(legacy, current) -> bool:
+    """Compara as linhas tolerando a ordem de soma das médias em float (leitura por índice ou pela tabela)"""
+    return legacy.keys() == current.keys() and all(
+        math.isclose(value, current[key], rel_tol=1e-9) if isinstance(value, float) else value == current[key]
+        for key, value in legacy.items()
+    )
+
+_PLAN_ACCESS_RE = re.compile(r"^(?:SCAN|SEARCH) (\w+)")
+
+def count_sales_reads(session: Session, statement, params) -> int:
+    """Conta os acessos à tabela sales (por nome ou alias) no plano da consulta"""
+    compiled = statement.compile(session.get_bind())
+    bound = compiled.construct_params(params)
+    args = tuple(bound[name] for name in compiled.positiontup)
+    plan = session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", args).all()
+
+    aliases = {"sales", "s", "s2"}
+    return sum(
+        1 for row in plan
+        if (match := _PLAN_ACCESS_RE.match(row[-1])) and match.group(1) in aliases
+    )
+
+def time_statement(session: Session, statement, params, repetitions: int) -> float:
+    """Retorna o tempo médio (ms) de execução da consulta"""
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        session.execute(statement, params).all()
+    return (time.perf_counter() - start) * 1000 / repetitions
+
+if __name__ == "__main__":
+    n_sales = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    repetitions = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    path = os.path.join(tempfile.gettempdir(), "bench_executive_summary.db")
+    url = create_sample_database(path, n_sales)
+    engine = create_engine(url)
+
+    statement = ANALYTICS_QUERIES["executive_summary"].statement
+    params = build_params("executive_summary")
+
+    with Session(engine) as session:
+        legacy_row = session.execute(LEGACY_EXECUTIVE_SUMMARY, params).mappings().one()
+        current_row = session.execute(statement, params).mappings().one()
+        # Verificações explícitas (assert some com python -O); os testes em tests/ cobrem os rankings
+        if not same_row(dict(legacy_row), dict(current_row)):
+            raise SystemExit("resultados divergentes")
+
+        legacy_reads = count_sales_reads(session, LEGACY_EXECUTIVE_SUMMARY, params)
+        current_reads = count_sales_reads(session, statement, params)
+        if current_reads != 1:
+            raise SystemExit(f"a tabela sales foi lida {current_reads} vezes")
+
+        legacy_ms = time_statement(session, LEGACY_EXECUTIVE_SUMMARY, params, repetitions)
+        current_ms = time_statement(session, statement, params, repetitions)
+
+    print(f"{n_sales:,} vendas, {repetitions} repetições (resultados idênticos)")
+    print(f"{'forma':<22}{'leituras de sales':>20}{'tempo (ms)':>14}")
+    print(f"{'subconsultas':<22}{legacy_reads:>20}{legacy_ms:>14.3f}")
+    print(f"{'passada única':<22}{current_reads:>20}{current_ms:>14.3f} ({legacy_ms / current_ms:.2f}x)")
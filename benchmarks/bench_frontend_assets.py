@@ -0,0 +1,69 @@
+"""
+Benchmark do frontend em memória contra a leitura do disco a cada requisição
+
+Monta uma aplicação com o CompressionMiddleware e três formas de servir o
+frontend/index.html: FileResponse (app.main), leitura do arquivo em
+HTMLResponse (app.main_professional) e frontend_assets (pré-comprimido em
+memória), mais a revalidação com If-None-Match. Mede requisições por
+segundo e bytes transferidos com Accept-Encoding: gzip.
+
+Uso:
+    python -m benchmarks.bench_frontend_assets [repetições]
+"""
+import sys
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.testclient import TestClient
+
+from app.compression import CompressionMiddleware
+from app.frontend_assets import FrontendAssets
+
+def build_app(assets: FrontendAssets) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware)
+
+    @app.get("/file")
+    async def file_response():
+        return FileResponse("frontend/index.html")
+
+    @app.get("/read")
+    async def read_response():
+        with open("frontend/index.html", "r", encoding="utf-8") as file:
+            return HTMLResponse(content=file.read())
+
+    @app.get("/memory")
+    async def memory_response(request: Request):
+        return assets.response(request, "index.html")
+
+    return app
+
+def measure(client: TestClient, path: str, headers: dict, repetitions: int):
+    transferred = 0
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        response = client.get(path, headers=headers)
+        transferred += int(response.headers.get("content-length", 0))
+    return repetitions / (time.perf_counter() - start), transferred / repetitions
+
+if __name__ == "__main__":
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    assets = FrontendAssets(reload=False)
+    assets.load()
+    client = TestClient(build_app(assets))
+    gzip_only = {"Accept-Encoding": "gzip"}
+    etag = client.get("/memory", headers=gzip_only).headers["etag"]
+
+    cases = [
+        ("FileResponse", "/file", gzip_only),
+        ("open + HTMLResponse", "/read", gzip_only),
+        ("memória", "/memory", gzip_only),
+        ("memória (304)", "/memory", {**gzip_only, "If-None-Match": etag}),
+    ]
+    print(f"{repetitions} requisições por forma")
+    print(f"{'forma':<22}{'req/s':>10}{'bytes/resposta':>16}")
+    for name, path, headers in cases:
+        rps, transferred = measure(client, path, headers, repetitions)
+        print(f"{name:<22}{rps:>10.0f}{transferred:>16.0f}")
@@ -0,0 +1,105 @@
+"""
+Micro-benchmark do roteador de intenções
+
+Compara a classificação antiga (buscas `any(word in question ...)` e regex
+recompiladas a cada chamada) com o roteador compilado de app.intent_router.
+
+Uso:
+    python -m benchmarks.bench_intent_router [repetições]
+"""
+import re
+import sys
+import time
+
+from app import intent_router
+
+CORPUS = [
+    "Qual foi o produto mais vendido no último mês?",
+    "Mostre um resumo das vendas",
+    "Qual é a receita total?",
+    "Quais produtos venderam mais na última semana?",
+    "Quem são os melhores clientes?",
+    "Faturamento por período do ano",
+    "Vendas de hoje",
+    "Analyze top-performing products",
+    "Provide a comprehensive sales summary",
+    "Generate customer segmentation analysis",
+    "Show revenue trends and growth patterns",
+    "What is the average order value this month?",
+    "hello, how are you?",
+    "Tell me about the weather",
+    "Explique o que é RAG",
+    "Oi, tudo bem?",
+    "Qual o ticket médio dos clientes na semana passada?",
+    "Report the best products by revenue",
+    "Overview of KPI dashboard metrics",
+    "Top produto em quantidade"
+]
+
+def legacy_classify(question: str):
+    """Reproduz a classificação anterior ao roteador compilado"""
+    question_lower = question.lower()
+
+    if any(word in question_lower for word in ['mais vendido', 'top', 'melhor', 'maior']):
+        intent_type = 'top_products'
+    elif any(word in question_lower for word in ['total', 'soma', 'receita', 'faturamento']):
+        intent_type = 'summary'
+    elif any(word in question_lower for word in ['cliente', 'comprador']):
+        intent_type = 'customer_analysis'
+    elif any(word in question_lower for word in ['período', 'mês', 'semana', 'ano']):
+        intent_type = 'time_analysis'
+    else:
+        intent_type = 'general'
+
+    sales_keywords = [
+        'sales', 'revenue', 'product', 'customer', 'client',
+        'profit', 'margin', 'performance', 'growth', 'trend',
+        'analysis', 'insight', 'report', 'summary', 'top',
+        'best', 'worst', 'total', 'average', 'conversion',
+        'roi', 'kpi', 'metric', 'dashboard', 'forecast'
+    ]
+    valid = any(keyword in question_lower for keyword in sales_keywords)
+    if valid:
+        generic_patterns = [
+            r'^(hello|hi|hey)\b',
+            r'^(how are you|what\'s up)',
+            r'^(what is your name|who are you)',
+            r'^(define|explain)(?!.*sales)',
+            r'^(tell me about)(?!.*sales)'
+        ]
+        for pattern in generic_patterns:
+            if re.match(pattern, question_lower):
+                valid = False
+                break
+
+    return intent_type, valid
+
+def router_classify(question: str):
+    """Classificação equivalente usando o roteador compilado"""
+    return intent_router.analyze_question(question)['type'], intent_router.is_sales_question(question, language='en')
+
+def router_classify_uncached(question: str):
+    """Roteador compilado sem a memorização por pergunta (primeira ocorrência)"""
+    intent_router.route.cache_clear()
+    return router_classify(question)
+
+def run(classify, repetitions: int) -> float:
+    """Retorna perguntas classificadas por segundo"""
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        for question in CORPUS:
+            classify(question)
+    elapsed = time.perf_counter() - start
+    return repetitions * len(CORPUS) / elapsed
+
+if __name__ == "__main__":
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    legacy = run(legacy_classify, repetitions)
+    uncached = run(router_classify_uncached, repetitions)
+    cached = run(router_classify, repetitions)
+
+    print(f"Corpus: {len(CORPUS)} perguntas x {repetitions} repetições")
+    print(f"Classificação antiga:          {legacy:,.0f} perguntas/s")
+    print(f"Roteador (pergunta nova):      {uncached:,.0f} perguntas/s ({uncached / legacy:.2f}x)")
+    print(f"Roteador (pergunta repetida):  {cached:,.0f} perguntas/s ({cached / legacy:.2f}x)")
@@ -0,0 +1,75 @@
+"""
+Benchmark das listagens: response_model (ORM + pydantic + json) contra orjson
+
+Monta uma aplicação com as duas versões de /products, /customers e /sales
+(a forma dos endpoints de app.main), confere que os corpos JSON são
+idênticos byte a byte e mede requisições por segundo com páginas de
+`limite` linhas.
+
+Uso:
+    python -m benchmarks.bench_list_responses [vendas] [limite] [repetições]
+"""
+import os
+import sys
+import time
+import tempfile
+from typing import List
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app import crud, schemas
+from app.list_responses import list_response
+from benchmarks.sample_data import create_sample_database
+
+RESOURCES = {
+    "products": (schemas.Product, crud.get_products),
+    "customers": (schemas.Customer, crud.get_customers),
+    "sales": (schemas.Sale, crud.get_sales),
+}
+
+def build_app(url: str) -> FastAPI:
+    session_factory = sessionmaker(bind=create_engine(url))
+
+    def get_session():
+        with session_factory() as session:
+            yield session
+
+    app = FastAPI()
+    for resource, (schema, read) in RESOURCES.items():
+        def validated(skip: int = 0, limit: int = 100, db: Session = Depends(get_session), read=read):
+            return read(db, skip=skip, limit=limit)
+
+        def fast(skip: int = 0, limit: int = 100, db: Session = Depends(get_session), resource=resource):
+            return list_response(db, resource, skip, limit)
+
+        app.get(f"/validated/{resource}", response_model=List[schema])(validated)
+        app.get(f"/fast/{resource}")(fast)
+    return app
+
+def requests_per_second(client: TestClient, path: str, repetitions: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        client.get(path).raise_for_status()
+    return repetitions / (time.perf_counter() - start)
+
+if __name__ == "__main__":
+    n_sales = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    page = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    repetitions = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    path = os.path.join(tempfile.gettempdir(), "bench_list_responses.db")
+    url = create_sample_database(path, n_sales)
+    client = TestClient(build_app(url))
+
+    print(f"{n_sales:,} vendas, páginas de {page} linhas, {repetitions} repetições")
+    print(f"{'listagem':<12}{'validado (req/s)':>18}{'orjson (req/s)':>16}{'speedup':>10}")
+    for resource in RESOURCES:
+        query = f"?limit={page}"
+        validated, fast = client.get(f"/validated/{resource}{query}"), client.get(f"/fast/{resource}{query}")
+        assert validated.content == fast.content, f"{resource} divergente"
+        validated_rps = requests_per_second(client, f"/validated/{resource}{query}", repetitions)
+        fast_rps = requests_per_second(client, f"/fast/{resource}{query}", repetitions)
+        print(f"{resource:<12}{validated_rps:>18.1f}{fast_rps:>16.1f}{fast_rps / validated_rps:>9.1f}x")
@@ -0,0 +1,108 @@
+"""
+Benchmark das colunas inteiras sale_day/sale_epoch contra o filtro sobre texto
+
+Cria o banco de exemplo, remove as colunas geradas e o índice coberto (o
+esquema anterior), mede as consultas na forma antiga (sale_date em texto e
+DATE(sale_date) no agrupamento), aplica a migração e mede as consultas do
+registro, conferindo que as duas formas retornam as mesmas linhas.
+
+Uso:
+    python -m benchmarks.bench_sale_time_columns [vendas] [repetições]
+"""
+import math
+import os
+import sys
+import time
+import tempfile
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.analytics_queries import ANALYTICS_QUERIES, build_params
+from app.migrations import run_migrations
+from benchmarks.sample_data import create_sample_database
+
+WINDOWS = (7, 30, 90)
+
+# Forma anterior das consultas: comparação de texto em sale_date e DATE() por linha
+LEGACY_QUERIES = {
+    "period_totals": text("""
+        SELECT COUNT(id) AS total_sales, SUM(total_amount_cents) / 100.0 AS total_revenue
+        FROM sales WHERE sale_date >= :start_date AND sale_date < :end_date
+    """),
+    "top_products": text("""
+        SELECT p.id, p.name, p.sku, p.category, p.price_cents / 100.0 AS price, SUM(s.quantity) AS total_quantity,
+               SUM(s.total_amount_cents) / 100.0 AS total_revenue, COUNT(s.id) AS total_orders
+        FROM products p JOIN sales s ON p.id = s.product_id
+        WHERE s.sale_date >= :start_date AND s.sale_date < :end_date
+        GROUP BY p.id ORDER BY total_quantity DESC, p.id LIMIT :limit
+    """),
+    "daily_trend": text("""
+        SELECT DATE(sale_date) AS sale_date, COUNT(id) AS daily_transactions,
+               SUM(total_amount_cents) / 100.0 AS daily_revenue, SUM(quantity) AS daily_items_sold,
+               AVG(total_amount_cents) / 100.0 AS daily_avg_order_value,
+               COUNT(DISTINCT customer_id) AS daily_unique_customers,
+               COUNT(DISTINCT product_id) AS daily_unique_products
+        FROM sales WHERE sale_date >= :start_date AND sale_date < :end_date
+        GROUP BY DATE(sale_date) ORDER BY sale_date DESC LIMIT :limit
+    """)
+}
+
+def fetch(session: Session, statement, params):
+    return [tuple(row) for row in session.execute(statement, params)]
+
+def same_rows(legacy, current) -> bool:
+    """Compara as linhas tolerando a ordem de soma das médias em float"""
+    return len(legacy) == len(current) and all(
+        math.isclose(a, b, rel_tol=1e-9) if isinstance(a, float) and isinstance(b, float) else a == b
+        for legacy_row, current_row in zip(legacy, current)
+        for a, b in zip(legacy_row, current_row)
+    )
+
+def average_ms(session: Session, statement, params, repetitions: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        session.execute(statement, params).all()
+    return (time.perf_counter() - start) * 1000 / repetitions
+
+def drop_time_columns(path: str):
+    """Volta ao esquema anterior: sem o índice coberto e sem as colunas geradas"""
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP INDEX ix_sales_sale_day_covering")
+        connection.exec_driver_sql("ALTER TABLE sales DROP COLUMN sale_day")
+        connection.exec_driver_sql("ALTER TABLE sales DROP COLUMN sale_epoch")
+    engine.dispose()
+
+if __name__ == "__main__":
+    n_sales = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    repetitions = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    path = os.path.join(tempfile.gettempdir(), "bench_sale_time_columns.db")
+    url = create_sample_database(path, n_sales)
+    drop_time_columns(path)
+    engine = create_engine(url)
+
+    params = {
+        (name, days): build_params(name, days=days)
+        for name in LEGACY_QUERIES for days in WINDOWS
+    }
+
+    legacy = {}
+    with Session(engine) as session:
+        for (name, days), window in params.items():
+            rows = fetch(session, LEGACY_QUERIES[name], window)
+            legacy[name, days] = (rows, average_ms(session, LEGACY_QUERIES[name], window, repetitions))
+
+    start = time.perf_counter()
+    run_migrations(engine)
+    print(f"{n_sales:,} vendas, migração: {(time.perf_counter() - start) * 1000:.0f} ms, {repetitions} repetições")
+
+    print(f"{'consulta':<16}{'janela':>8}{'texto (ms)':>14}{'inteiro (ms)':>14}{'speedup':>10}")
+    with Session(engine) as session:
+        for (name, days), window in params.items():
+            statement = ANALYTICS_QUERIES[name].statement
+            legacy_rows, legacy_ms = legacy[name, days]
+            assert same_rows(legacy_rows, fetch(session, statement, window)), f"{name} divergente em {days} dias"
+            current_ms = average_ms(session, statement, window, repetitions)
+            print(f"{name:<16}{days:>7}d{legacy_ms:>14.2f}{current_ms:>14.2f}{legacy_ms / current_ms:>9.1f}x")
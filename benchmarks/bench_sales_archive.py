@@ -0,0 +1,63 @@
+"""
+Benchmark do arquivo frio de vendas (Parquet particionado por mês)
+
+Gera um banco com vendas de 13 meses, arquiva os meses fechados fora da
+janela quente e compara o tamanho do banco e o tempo do relatório mensal de
+um trimestre antigo lido do SQLite (antes) e do Parquet com poda de
+partições e projeção de colunas (depois). Requer pyarrow.
+
+Uso:
+    python -m benchmarks.bench_sales_archive [vendas] [repetições]
+"""
+import os
+import shutil
+import sys
+import time
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import app.crud as crud
+from app.sales_archive import SalesArchive
+from benchmarks.sample_data import create_sample_database
+
+def average_ms(function, repetitions: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        function()
+    return (time.perf_counter() - start) * 1000 / repetitions
+
+if __name__ == "__main__":
+    n_sales = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    repetitions = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    directory = tempfile.gettempdir()
+    path = os.path.join(directory, "bench_sales_archive.db")
+    archive_path = os.path.join(directory, "bench_sales_archive")
+    shutil.rmtree(archive_path, ignore_errors=True)
+    engine = create_engine(create_sample_database(path, n_sales, days=400))
+
+    # O relatório do CRUD passa a ler o arquivo do benchmark
+    archive = SalesArchive(path=archive_path)
+    crud.sales_archive = archive
+    now = datetime.now()
+    quarter = (now - timedelta(days=300), now - timedelta(days=210))
+
+    with Session(engine) as session:
+        crud.SALES_ARCHIVE_ENABLED = False
+        expected = crud.get_monthly_sales_report(session, *quarter)
+        sqlite_ms = average_ms(lambda: crud.get_monthly_sales_report(session, *quarter), repetitions)
+        size_before = os.path.getsize(path)
+
+        result = archive.archive(session)
+        crud.SALES_ARCHIVE_ENABLED = True
+        actual = crud.get_monthly_sales_report(session, *quarter)
+        assert actual == expected, "relatório divergente após o arquivamento"
+        parquet_ms = average_ms(lambda: crud.get_monthly_sales_report(session, *quarter), repetitions)
+
+        stats = archive.stats()
+        print(f"{n_sales:,} vendas; {result['rows']:,} arquivadas em {len(result['months'])} meses ({result['elapsed_ms'] / 1000:.1f} s)")
+        print(f"Banco: {size_before / 2**20:.1f} MB -> {os.path.getsize(path) / 2**20:.1f} MB; Parquet: {stats['size_mb']} MB")
+        print(f"Relatório mensal de um trimestre antigo: SQLite {sqlite_ms:.1f} ms, Parquet {parquet_ms:.1f} ms")
@@ -0,0 +1,58 @@
+"""
+Benchmark do ranking de produtos em memória contra a consulta SQL
+
+Compara, para janelas de 7 a 90 dias, o tempo médio da consulta
+`top_products` do registro com o do tracker incremental e confere que ambos
+retornam as mesmas linhas.
+
+Uso:
+    python -m benchmarks.bench_top_products_tracker [vendas] [repetições]
+"""
+import os
+import sys
+import time
+import tempfile
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.analytics_queries import ANALYTICS_QUERIES, build_params
+from app.top_products_tracker import TopProductsTracker
+from benchmarks.sample_data import create_sample_database
+
+WINDOWS = (7, 30, 45, 90)
+LIMIT = 10
+
+def sql_top_products(session: Session, days: int):
+    query = ANALYTICS_QUERIES["top_products"]
+    params = build_params("top_products", days=days, limit=LIMIT)
+    return [dict(row) for row in session.execute(query.statement, params).mappings()]
+
+def average_ms(function, repetitions: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        function()
+    return (time.perf_counter() - start) * 1000 / repetitions
+
+if __name__ == "__main__":
+    n_sales = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    repetitions = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    path = os.path.join(tempfile.gettempdir(), "bench_top_products_tracker.db")
+    url = create_sample_database(path, n_sales)
+    engine = create_engine(url)
+
+    with Session(engine) as session:
+        tracker = TopProductsTracker()
+        tracker.rebuild(session)
+
+        print(f"{n_sales:,} vendas, top {LIMIT}, {repetitions} repetições")
+        print(f"{'janela':<10}{'SQL (ms)':>12}{'tracker (µs)':>16}{'speedup':>10}")
+        for days in WINDOWS:
+            expected = sql_top_products(session, days)
+            actual = tracker.top_products(session, days=days, limit=LIMIT)
+            assert actual == expected, f"resultado divergente na janela de {days} dias"
+
+            sql_ms = average_ms(lambda: sql_top_products(session, days), repetitions)
+            tracker_ms = average_ms(lambda: tracker.top_products(session, days=days, limit=LIMIT), repetitions * 100)
+            print(f"{days:<10}{sql_ms:>12.3f}{tracker_ms * 1000:>16.1f}{sql_ms / tracker_ms:>9.0f}x")
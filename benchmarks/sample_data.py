@@ -0,0 +1,73 @@
+"""
+Geração de bancos de dados sintéticos para os benchmarks
+"""
+import os
+import random
+import sqlite3
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+
+from app import models
+from app.migrations import run_migrations
+
+def create_sample_database(
+    path: str,
+    n_sales: int,
+    n_products: int = 200,
+    n_customers: int = 5000,
+    days: int = 120,
+    seed: int = 42
+) -> str:
+    """
+    Cria um banco SQLite com o esquema da aplicação e vendas aleatórias
+
+    Returns:
+        str: URL do banco criado (sqlite:///...)
+    """
+    if os.path.exists(path):
+        os.remove(path)
+
+    url = f"sqlite:///{path}"
+    engine = create_engine(url)
+    models.Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+    rng = random.Random(seed)
+    now = datetime.now()
+    conn = sqlite3.connect(path)
+
+    products = [
+        (i, f"SKU{i:05d}", f"Produto {i}", rng.choice(["Eletrônicos", "Informática", "Casa"]), round(rng.uniform(10, 3000) * 100))
+        for i in range(1, n_products + 1)
+    ]
+    conn.executemany("INSERT INTO products (id, sku, name, category, price_cents) VALUES (?, ?, ?, ?, ?)", products)
+    conn.executemany(
+        "INSERT INTO customers (id, name, email, created_at) VALUES (?, ?, ?, ?)",
+        ((i, f"Cliente {i}", f"cliente{i}@email.com", now.strftime("%Y-%m-%d %H:%M:%S.%f")) for i in range(1, n_customers + 1))
+    )
+
+    prices = {product[0]: product[4] for product in products}
+
+    def generate_sales():
+        for i in range(1, n_sales + 1):
+            product_id = rng.randint(1, n_products)
+            quantity = rng.randint(1, 5)
+            sale_date = now - timedelta(seconds=rng.uniform(0, days * 86400))
+            yield (
+                i, product_id, rng.randint(1, n_customers), quantity,
+                prices[product_id] * quantity, sale_date.strftime("%Y-%m-%d %H:%M:%S.%f")
+            )
+
+    conn.executemany(
+        "INSERT INTO sales (id, product_id, customer_id, quantity, total_amount_cents, sale_date) VALUES (?, ?, ?, ?, ?, ?)",
+        generate_sales()
+    )
+    conn.commit()
+    conn.close()
+
+    # Gatilhos da versão dos dados depois da carga (a carga em massa não os dispara)
+    engine = create_engine(url)
+    run_migrations(engine)
+    engine.dispose()
+    return url
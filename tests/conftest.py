@@ -0,0 +1,14 @@
+"""
+Configuração comum dos testes
+
+Os módulos da aplicação leem a configuração e abrem os caches globais na
+importação: os testes apontam o banco e os arquivos de cache para um
+diretório temporário, sem tocar no sales.db e no answer_cache.db do projeto.
+"""
+import os
+import tempfile
+
+_TEST_DIR = tempfile.mkdtemp(prefix="sales-insights-tests-")
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_TEST_DIR, 'sales.db')}")
+os.environ.setdefault("ANSWER_CACHE_PATH", os.path.join(_TEST_DIR, "answer_cache.db"))
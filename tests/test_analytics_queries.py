@@ -0,0 +1,149 @@
+"""
+Equivalência e plano das consultas analíticas em passada única
+
+O resumo executivo (CTE materializada) é comparado com a forma anterior de
+subconsultas escalares; os rankings de produtos e clientes, com a forma
+anterior que relia a tabela sales para o total da janela no percentual de
+receita. Cada consulta deve ler sales uma única vez.
+"""
+import os
+from datetime import datetime, time
+
+import pytest
+from sqlalchemy import DateTime, create_engine, text
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import CompileError
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateTable
+
+from app import models
+from app.analytics_queries import ANALYTICS_QUERIES, build_params
+from benchmarks.bench_executive_summary import LEGACY_EXECUTIVE_SUMMARY, count_sales_reads, same_row
+from benchmarks.sample_data import create_sample_database
+
+# Formas anteriores: o total da janela vem de uma subconsulta que relê sales
+LEGACY_TOP_PRODUCTS_DETAILED = text("""
+    SELECT
+        p.name AS product_name,
+        p.sku,
+        p.category,
+        p.price_cents / 100.0 AS unit_price,
+        SUM(s.quantity) AS total_quantity_sold,
+        SUM(s.total_amount_cents) / 100.0 AS total_revenue,
+        COUNT(s.id) AS total_orders,
+        AVG(s.quantity) AS avg_quantity_per_order,
+        AVG(s.total_amount_cents) / 100.0 AS avg_order_value,
+        MIN(s.sale_date) AS first_sale_date,
+        MAX(s.sale_date) AS last_sale_date,
+        ROUND(SUM(s.total_amount_cents) * 100.0 / (
+            SELECT SUM(total_amount_cents) FROM sales
+            WHERE sale_date >= :start_date AND sale_date < :end_date
+        ), 2) AS revenue_percentage,
+        COUNT(DISTINCT s.customer_id) AS unique_customers,
+        ROUND(SUM(s.total_amount_cents) / 100.0 / COUNT(DISTINCT s.customer_id), 2) AS revenue_per_customer
+    FROM products p
+    JOIN sales s ON p.id = s.product_id
+    WHERE s.sale_date >= :start_date AND s.sale_date < :end_date
+    GROUP BY p.id
+    ORDER BY total_quantity_sold DESC, p.id
+    LIMIT :limit
+""").columns(first_sale_date=DateTime, last_sale_date=DateTime)
+
+LEGACY_CUSTOMER_RANKING = text("""
+    SELECT
+        c.name AS customer_name,
+        c.email AS customer_email,
+        COUNT(s.id) AS total_purchases,
+        SUM(s.total_amount_cents) / 100.0 AS total_spent,
+        AVG(s.total_amount_cents) / 100.0 AS average_order_value,
+        SUM(s.quantity) AS total_items_purchased,
+        MIN(s.sale_date) AS first_purchase_date,
+        MAX(s.sale_date) AS last_purchase_date,
+        ROUND(SUM(s.total_amount_cents) * 100.0 / (
+            SELECT SUM(total_amount_cents) FROM sales
+            WHERE sale_date >= :start_date AND sale_date < :end_date
+        ), 2) AS revenue_contribution_percentage,
+        COUNT(DISTINCT s.product_id) AS unique_products_purchased
+    FROM customers c
+    JOIN sales s ON c.id = s.customer_id
+    WHERE s.sale_date >= :start_date AND s.sale_date < :end_date
+    GROUP BY c.id
+    ORDER BY total_spent DESC, c.id
+    LIMIT :limit
+""").columns(first_purchase_date=DateTime, last_purchase_date=DateTime)
+
+LEGACY_QUERIES = {
+    "executive_summary": LEGACY_EXECUTIVE_SUMMARY,
+    "top_products_detailed": LEGACY_TOP_PRODUCTS_DETAILED,
+    "customer_ranking": LEGACY_CUSTOMER_RANKING
+}
+
+@pytest.fixture(scope="module")
+def session(tmp_path_factory):
+    path = os.path.join(tmp_path_factory.mktemp("analytics"), "sales.db")
+    engine = create_engine(create_sample_database(path, 20000, n_customers=500))
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+def window_params(name: str, days: int):
+    # Fim na meia-noite: sale_date < end_date e sale_epoch < end_epoch recortam igual
+    end_date = datetime.combine(datetime.now().date(), time.min)
+    return build_params(name, days=days, end_date=end_date)
+
+@pytest.mark.parametrize("days", [7, 30, 90])
+@pytest.mark.parametrize("name", sorted(LEGACY_QUERIES))
+def test_matches_legacy_form(session, name, days):
+    params = window_params(name, days)
+    legacy = [dict(row) for row in session.execute(LEGACY_QUERIES[name], params).mappings()]
+    current = [dict(row) for row in session.execute(ANALYTICS_QUERIES[name].statement, params).mappings()]
+
+    assert legacy and len(legacy) == len(current)
+    for legacy_row, current_row in zip(legacy, current):
+        assert same_row(legacy_row, current_row), (legacy_row, current_row)
+
+@pytest.mark.parametrize("name, column", [
+    ("top_products_detailed", "revenue_percentage"),
+    ("customer_ranking", "revenue_contribution_percentage")
+])
+def test_percentage_is_share_of_whole_window(session, name, column):
+    # O total vem de todos os grupos da janela, não só das linhas do LIMIT
+    params = window_params(name, 30)
+    limited = session.execute(ANALYTICS_QUERIES[name].statement, params).mappings().all()
+    everything = session.execute(ANALYTICS_QUERIES[name].statement, {**params, "limit": -1}).mappings().all()
+
+    assert len(limited) < len(everything)
+    assert [row[column] for row in limited] == [row[column] for row in everything[:len(limited)]]
+    assert sum(row[column] for row in everything) == pytest.approx(100, abs=0.01 * len(everything))
+
+@pytest.mark.parametrize("name", sorted(LEGACY_QUERIES))
+def test_reads_sales_once(session, name):
+    params = window_params(name, 30)
+    assert count_sales_reads(session, ANALYTICS_QUERIES[name].statement, params) == 1
+
+def test_executive_summary_legacy_form_rereads_sales(session):
+    # Garante que a contagem de leituras distingue as duas formas
+    params = window_params("executive_summary", 30)
+    assert count_sales_reads(session, LEGACY_EXECUTIVE_SUMMARY, params) > 1
+
+@pytest.mark.parametrize("dialect, materialized", [
+    (sqlite.dialect(), True),
+    (postgresql.dialect(), True),
+    (mysql.dialect(), False)
+])
+def test_materialized_hint_only_where_supported(dialect, materialized):
+    sql = str(ANALYTICS_QUERIES["executive_summary"].statement.compile(dialect=dialect))
+    assert ("AS MATERIALIZED" in sql) is materialized
+
+@pytest.mark.parametrize("name", sorted(ANALYTICS_QUERIES))
+def test_queries_compile_without_sqlite_functions_on_postgresql(name):
+    sql = str(ANALYTICS_QUERIES[name].statement.compile(dialect=postgresql.dialect()))
+    assert "unixepoch" not in sql and "strftime" not in sql
+
+def test_generated_sale_time_columns_compile_per_dialect():
+    sales = models.Sale.__table__
+    assert "strftime('%s', sale_date)" in str(CreateTable(sales).compile(dialect=sqlite.dialect()))
+    ddl = str(CreateTable(sales).compile(dialect=postgresql.dialect()))
+    assert "EXTRACT(EPOCH FROM sale_date)" in ddl and "strftime" not in ddl
+    with pytest.raises(CompileError):
+        CreateTable(sales).compile(dialect=mysql.dialect())
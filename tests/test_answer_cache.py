@@ -0,0 +1,52 @@
+"""
+Cache de respostas do SalesInsightsAI
+
+A chave inclui a versão dos dados: a mesma pergunta repetida é servida do
+cache até que uma venda (ou cadastro, ou alteração) mude a versão.
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app import crud, schemas
+from app.ai_agent import SalesInsightsAI
+from benchmarks.sample_data import create_sample_database
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(create_sample_database(str(tmp_path / "sales.db"), 2000, n_customers=100))
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+@pytest.fixture(scope="module")
+def agent():
+    return SalesInsightsAI()
+
+def test_repeated_question_is_served_from_cache(db, agent):
+    first = agent.process_question("Qual a receita total?", db)
+    second = agent.process_question("qual a receita total", db)
+
+    assert first['cache_hit'] is False
+    assert second['cache_hit'] is True
+    assert second['answer'] == first['answer']
+
+def test_new_sale_invalidates_cached_answer(db, agent):
+    agent.process_question("Qual a receita total?", db)
+    version = crud.get_data_version(db)
+
+    crud.create_sale(db, schemas.SaleCreate(
+        product_id=1, customer_id=1, quantity=1, total_amount=10, sale_date=datetime.now()
+    ))
+
+    assert crud.get_data_version(db) != version
+    assert agent.process_question("Qual a receita total?", db)['cache_hit'] is False
+
+def test_update_changes_data_version(db):
+    version = crud.get_data_version(db)
+    db.execute(text("UPDATE products SET name = 'Produto renomeado' WHERE id = 1"))
+    db.commit()
+
+    assert crud.get_data_version(db) != version
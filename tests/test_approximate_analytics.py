@@ -0,0 +1,65 @@
+"""
+Intervalos de confiança das somas por amostragem do modo aproximado
+
+O estimador de Horvitz-Thompson sobre a amostra de Bernoulli informa a
+meia-largura do intervalo de 95%: em amostras repetidas o valor exato deve
+cair dentro do intervalo em ~95% das vezes.
+"""
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.analytics_queries import ANALYTICS_QUERIES, build_params
+from app.approximate_analytics import ApproximateAnalytics
+from benchmarks.sample_data import create_sample_database
+
+TRIALS = 2000
+
+@pytest.mark.parametrize("rate", [0.05, 0.1, 0.3])
+def test_sampled_sum_interval_covers_95_percent(rate):
+    rng = np.random.default_rng(2024)
+    cents = rng.lognormal(mean=8, sigma=1, size=5000).astype(np.int64)
+    approximate = ApproximateAnalytics(sample_rate=rate)
+
+    covered = {'sum': 0, 'count': 0}
+    for _ in range(TRIALS):
+        sampled = cents[rng.random(len(cents)) < rate]
+        total, bound = approximate._estimate(sampled)
+        covered['sum'] += abs(total - cents.sum()) <= bound
+        count, count_bound = approximate._estimate(np.ones(len(sampled)))
+        covered['count'] += abs(count - len(cents)) <= count_bound
+
+    for name, hits in covered.items():
+        assert 0.93 <= hits / TRIALS <= 0.97, f"cobertura de {name}: {hits / TRIALS:.3f}"
+
+@pytest.fixture(scope="module")
+def db(tmp_path_factory):
+    path = tmp_path_factory.mktemp("approximate") / "sales.db"
+    engine = create_engine(create_sample_database(str(path), 40000, n_products=100, n_customers=3000, days=100))
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+def test_sample_rate_of_the_id_hash(db):
+    # Todos os dias da base mantidos: a amostra é tirada das 40 mil vendas
+    approximate = ApproximateAnalytics(sample_rate=0.1, max_days=120)
+    approximate.load(db)
+    rows = approximate.stats()['sample_rows']
+    # Bernoulli(0.1) sobre 40 mil vendas: desvio padrão de 60 linhas
+    assert abs(rows - 4000) <= 4 * 60
+
+def test_period_overview_intervals_cover_exact_values(db):
+    approximate = ApproximateAnalytics(sample_rate=0.1)
+    approximate.load(db)
+    checked = covered = 0
+    for days in (7, 14, 30, 45, 60, 90):
+        params = build_params("period_overview", days=days)
+        exact = dict(db.execute(ANALYTICS_QUERIES["period_overview"].statement, params).mappings().one())
+        estimate = approximate.query(db, "period_overview", days=days)
+        row, bounds = estimate['rows'][0], estimate['error_bounds'][0]
+        for column, bound in bounds.items():
+            checked += 1
+            covered += abs(row[column] - exact[column]) <= bound
+    # 24 intervalos de 95%: a grande maioria contém o valor exato
+    assert covered / checked >= 0.8
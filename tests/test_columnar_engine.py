@@ -0,0 +1,56 @@
+"""
+Motor colunar contra o SQL do registro
+
+validate_against_sql compara top_products, customer_ranking e daily_trend
+do motor colunar com o SQL, depois da carga e depois de vendas novas.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app import columnar_engine as columnar_module
+from app.columnar_engine import COLUMNAR_QUERIES, ColumnarSalesEngine, validate_against_sql
+from benchmarks.sample_data import create_sample_database
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(columnar_module, "COLUMNAR_REFRESH_SECONDS", 0)
+    engine = create_engine(create_sample_database(str(tmp_path / "sales.db"), 5000, n_products=60, n_customers=400))
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+@pytest.mark.parametrize("window", [{}, {"days": 7}, {"days": 90, "limit": 50}])
+def test_matches_sql_after_load(db, window):
+    engine = ColumnarSalesEngine()
+    engine.load(db)
+    assert validate_against_sql(db, engine, **window) == {name: [] for name in COLUMNAR_QUERIES}
+
+@pytest.mark.parametrize("tail_ratio, merges", [(0.5, 0), (0.0001, 1)])
+def test_matches_sql_after_new_sales(db, tail_ratio, merges):
+    # Vendas novas ficam no bloco de cauda ou são incorporadas e reordenadas
+    engine = ColumnarSalesEngine(tail_ratio=tail_ratio)
+    engine.load(db)
+    now = datetime.now()
+    for minutes in (1, 5, 60 * 24 * 3):
+        db.execute(
+            text(
+                "INSERT INTO sales (product_id, customer_id, quantity, total_amount_cents, sale_date) "
+                "VALUES (7, 11, 40, 987654, :sale_date)"
+            ),
+            {"sale_date": now - timedelta(minutes=minutes)}
+        )
+    db.commit()
+
+    assert validate_against_sql(db, engine, days=30) == {name: [] for name in COLUMNAR_QUERIES}
+    assert engine.stats()['refreshes'] == 1 and engine.stats()['merges'] == merges
+
+def test_reports_divergent_values(db):
+    engine = ColumnarSalesEngine()
+    engine.load(db)
+    engine._main['cents'] = engine._main['cents'] * 2
+    mismatches = validate_against_sql(db, engine, days=30)
+    assert mismatches['daily_trend'] and mismatches['customer_ranking']
+    assert any("daily_revenue" in problem for problem in mismatches['daily_trend'])
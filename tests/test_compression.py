@@ -0,0 +1,106 @@
+"""
+Compressão negociada por Accept-Encoding
+
+Respostas completas são comprimidas a partir do tamanho mínimo; respostas
+em streaming são comprimidas bloco a bloco com flush, e cada bloco enviado
+já descomprime o evento correspondente.
+"""
+import asyncio
+import gzip
+import zlib
+
+import pytest
+
+from app.compression import CompressionMiddleware, CompressionStats, choose_encoding
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("gzip, deflate, br", "br"),
+    ("gzip;q=1.0, br;q=0.5", "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("gzip;q=0", None),
+    ("*", "br"),
+    ("*;q=0.1, br;q=0", "gzip"),
+    ("identity", None),
+    ("", None),
+    ("GZIP", "gzip"),
+    ("gzip;q=abc, br", "br"),
+])
+def test_choose_encoding(accept_encoding, expected):
+    assert choose_encoding(accept_encoding, ("br", "gzip")) == expected
+
+def test_choose_encoding_without_brotli():
+    assert choose_encoding("br, gzip;q=0.1", ("gzip",)) == "gzip"
+    assert choose_encoding("br", ("gzip",)) is None
+
+def run(messages, accept_encoding="gzip", minimum_size=100):
+    """Executa o middleware sobre um app que envia `messages`; retorna as mensagens enviadas e os contadores"""
+    async def app(scope, receive, send):
+        for message in messages:
+            await send(message)
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    stats = CompressionStats()
+    middleware = CompressionMiddleware(app, minimum_size=minimum_size, stats=stats)
+    scope = {"type": "http", "headers": [(b"accept-encoding", accept_encoding.encode())]}
+    asyncio.run(middleware(scope, receive, send))
+    return sent, stats.stats()
+
+def start(content_type, **extra):
+    headers = [(b"content-type", content_type.encode())]
+    headers += [(name.encode(), value.encode()) for name, value in extra.items()]
+    return {"type": "http.response.start", "status": 200, "headers": headers}
+
+def headers_of(message):
+    return {name.decode().lower(): value.decode() for name, value in message["headers"]}
+
+def test_full_response_is_gzipped_with_length_and_weak_etag():
+    body = b'{"rows": [' + b", ".join(b'{"id": %d}' % i for i in range(200)) + b"]}"
+    sent, stats = run([
+        start("application/json", etag='"abc"', **{"content-length": str(len(body))}),
+        {"type": "http.response.body", "body": body}
+    ])
+
+    headers = headers_of(sent[0])
+    assert headers["content-encoding"] == "gzip"
+    assert headers["vary"] == "Accept-Encoding"
+    assert headers["etag"] == 'W/"abc"'
+    assert int(headers["content-length"]) == len(sent[1]["body"]) < len(body)
+    assert gzip.decompress(sent[1]["body"]) == body
+    assert stats["encodings"]["gzip"]["original_bytes"] == len(body)
+
+@pytest.mark.parametrize("content_type, body, extra, reason, accept_encoding", [
+    ("application/json", b"{}", {}, "below_min_size", "gzip"),
+    ("image/png", b"\x89PNG" * 100, {}, "content_type", "gzip"),
+    ("text/html", b"x" * 500, {"content-encoding": "br"}, "already_encoded", "gzip"),
+    ("text/html", b"x" * 500, {}, "not_accepted", "identity"),
+])
+def test_passthrough(content_type, body, extra, reason, accept_encoding):
+    messages = [start(content_type, **extra), {"type": "http.response.body", "body": body}]
+    sent, stats = run(messages, accept_encoding)
+    assert sent == messages
+    assert stats["skipped"][reason] == 1
+
+def test_streaming_flushes_every_event():
+    events = [f"data: evento {i} {'x' * i}\n\n".encode() for i in range(5)]
+    messages = [start("text/event-stream")]
+    messages += [{"type": "http.response.body", "body": event, "more_body": True} for event in events]
+    messages.append({"type": "http.response.body", "body": b"", "more_body": False})
+    # Em streaming o tamanho mínimo não se aplica: o corpo total não é conhecido
+    sent, stats = run(messages, minimum_size=10_000)
+
+    headers = headers_of(sent[0])
+    assert headers["content-encoding"] == "gzip" and "content-length" not in headers
+    # Cada bloco enviado descomprime exatamente o evento produzido, sem esperar os seguintes
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for event, message in zip(events, sent[1:]):
+        assert message["more_body"] is True
+        assert decompressor.decompress(message["body"]) == event
+    assert decompressor.decompress(sent[-1]["body"]) == b"" and decompressor.eof
+    assert stats["encodings"]["gzip"]["streamed"] == 1
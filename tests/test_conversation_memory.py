@@ -0,0 +1,54 @@
+"""
+Memória de conversa por sessão
+
+A busca da sessão e a contabilização de bytes acontecem sob o mesmo lock, e
+o histórico da sessão entra no prompt da pergunta seguinte.
+"""
+from app.conversation_memory import SessionMemoryStore, format_history
+
+def test_save_turn_accounts_new_session_and_evicts_oldest():
+    store = SessionMemoryStore(max_sessions=2)
+    for session_id in ("a", "b", "c"):
+        store.save_turn(session_id, f"question {session_id}", "answer")
+
+    stats = store.stats()
+    assert stats['sessions'] == 2
+    assert stats['evictions'] == 1
+    assert store.history("a") == []
+    # Os bytes contabilizados são exatamente os das sessões que restaram
+    expected = sum(len(m['content'].encode("utf-8")) for s in ("b", "c") for m in store.history(s))
+    assert stats['bytes'] == expected
+
+def test_byte_limit_keeps_only_the_current_session():
+    store = SessionMemoryStore(max_bytes=50)
+    store.save_turn("old", "q" * 30, "a" * 10)
+    store.save_turn("new", "q" * 30, "a" * 10)
+    assert store.stats()['sessions'] == 1
+    assert store.history("new")
+    assert store.stats()['bytes'] == 40
+
+def test_history_is_windowed_to_max_turns():
+    store = SessionMemoryStore(max_turns=2)
+    for i in range(5):
+        store.save_turn("s", f"question {i}", f"answer {i}")
+    history = store.history("s")
+    assert [m['content'] for m in history] == ["question 3", "answer 3", "question 4", "answer 4"]
+
+def test_history_reaches_the_analysis_prompt():
+    from app.langchain_agent_professional import professional_sales_agent
+
+    store = SessionMemoryStore()
+    store.save_turn("s", "Top products by revenue", "Produto 149 leads with " + "x" * 1000)
+    history = store.history("s")
+    text = format_history(history, max_chars=100)
+    assert text.startswith("User: Top products by revenue\nAnalyst: Produto 149 leads with")
+    assert text.endswith("...")
+
+    packed = professional_sales_agent._build_analysis_prompt(
+        "and the customers?", [{'customer_name': 'Cliente 1', 'total_spent': 10.0}], history
+    )
+    assert "CONVERSATION HISTORY" in packed.prompt
+    assert "User: Top products by revenue" in packed.prompt
+    assert "CONVERSATION HISTORY" not in professional_sales_agent._build_analysis_prompt(
+        "Top customers", [{'customer_name': 'Cliente 1', 'total_spent': 10.0}]
+    ).prompt
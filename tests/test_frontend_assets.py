@@ -0,0 +1,100 @@
+"""
+Assets do frontend em memória: ETag, 304 e cache dos nomes com hash
+
+Os nomes com hash do conteúdo são servidos com `immutable`; os nomes simples
+revalidam pelo ETag. Cada variante (original, gzip) tem o seu ETag.
+"""
+import os
+
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+from app.compression import CompressionMiddleware
+from app.frontend_assets import HASHED_CACHE_CONTROL, PLAIN_CACHE_CONTROL, FrontendAssets
+
+INDEX = b"<!doctype html><html><body>" + b"<p>Vendas</p>" * 200 + b"</body></html>"
+
+def build_app(assets: FrontendAssets) -> FastAPI:
+    """Rotas de assets como em app.main, atrás do middleware de compressão"""
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware)
+
+    @app.get("/assets/{name:path}")
+    async def read_asset(name: str, request: Request):
+        response = assets.response(request, name)
+        if response is None:
+            raise HTTPException(status_code=404)
+        return response
+
+    return app
+
+@pytest.fixture
+def frontend(tmp_path):
+    (tmp_path / "index.html").write_bytes(INDEX)
+    (tmp_path / "app.js").write_text("console.log('ok');")
+    assets = FrontendAssets(path=str(tmp_path), reload=True)
+    assets.load()
+    return tmp_path, assets, TestClient(build_app(assets))
+
+def test_plain_name_revalidates_and_hashed_name_is_immutable(frontend):
+    _, assets, client = frontend
+    plain = client.get("/assets/index.html", headers={"Accept-Encoding": "identity"})
+    hashed_url = assets.asset_url("index.html")
+    hashed = client.get(hashed_url, headers={"Accept-Encoding": "identity"})
+
+    assert hashed_url != "/assets/index.html"
+    assert plain.content == hashed.content == INDEX
+    assert plain.headers["cache-control"] == PLAIN_CACHE_CONTROL
+    assert hashed.headers["cache-control"] == HASHED_CACHE_CONTROL
+    assert "immutable" in hashed.headers["cache-control"]
+    assert plain.headers["etag"] == hashed.headers["etag"]
+
+def test_if_none_match_returns_304(frontend):
+    _, assets, client = frontend
+    etag = client.get("/assets/index.html", headers={"Accept-Encoding": "identity"}).headers["etag"]
+
+    for if_none_match in (etag, f"W/{etag}", f'"outro", {etag}', "*"):
+        response = client.get(
+            "/assets/index.html", headers={"Accept-Encoding": "identity", "If-None-Match": if_none_match}
+        )
+        assert response.status_code == 304 and response.content == b""
+        assert response.headers["etag"] == etag
+    assert client.get(
+        "/assets/index.html", headers={"Accept-Encoding": "identity", "If-None-Match": '"outro"'}
+    ).status_code == 200
+    assert assets.stats()["not_modified"] == 4
+
+def test_precompressed_variant_has_its_own_etag(frontend):
+    _, _, client = frontend
+    identity = client.get("/assets/index.html", headers={"Accept-Encoding": "identity"})
+    compressed = client.get("/assets/index.html", headers={"Accept-Encoding": "gzip"})
+
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["vary"] == "Accept-Encoding"
+    assert compressed.content == INDEX  # descomprimido pelo cliente
+    assert compressed.headers["etag"] != identity.headers["etag"]
+    # O middleware não recomprime nem enfraquece o ETag da variante pré-comprimida
+    assert not compressed.headers["etag"].startswith("W/")
+    revalidated = client.get(
+        "/assets/index.html", headers={"Accept-Encoding": "gzip", "If-None-Match": compressed.headers["etag"]}
+    )
+    assert revalidated.status_code == 304
+
+def test_changed_file_gets_a_new_hashed_name(frontend):
+    path, assets, client = frontend
+    old_url = assets.asset_url("app.js")
+    (path / "app.js").write_text("console.log('novo conteúdo');")
+    stat = os.stat(path / "app.js")
+    os.utime(path / "app.js", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    new_url = assets.asset_url("app.js")
+    assert new_url != old_url
+    assert client.get(new_url).text == "console.log('novo conteúdo');"
+    assert client.get(old_url).status_code == 404
+
+def test_small_asset_has_no_compressed_variant(frontend):
+    _, _, client = frontend
+    response = client.get("/assets/app.js", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert "javascript" in response.headers["content-type"]
@@ -0,0 +1,110 @@
+"""
+Fila de inferência com micro-batching
+
+O modelo é um callable com a interface do pipeline de geração de texto
+(lista de prompts -> lista de sequências geradas por prompt).
+"""
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pytest
+
+from app.inference_batcher import InferenceBatcher
+
+class EchoModel:
+    """Pipeline que devolve o prompt em maiúsculas e registra os lotes recebidos"""
+
+    def __init__(self, fail_with=None, drop_outputs=False):
+        self.batches = []
+        self.fail_with = fail_with
+        self.drop_outputs = drop_outputs
+
+    def __call__(self, prompts, batch_size, **kwargs):
+        self.batches.append(list(prompts))
+        if self.fail_with is not None:
+            raise self.fail_with
+        outputs = [[{'generated_text': prompt.upper()}] for prompt in prompts]
+        return outputs[:-1] if self.drop_outputs else outputs
+
+@pytest.fixture
+def make_batcher():
+    batchers = []
+
+    def make(model, **kwargs):
+        batcher = InferenceBatcher(model, {}, **kwargs)
+        batchers.append(batcher)
+        return batcher
+
+    yield make
+    for batcher in batchers:
+        batcher.close()
+
+def test_concurrent_prompts_share_a_batch(make_batcher):
+    model = EchoModel()
+    batcher = make_batcher(model, window_ms=200, max_batch_size=4)
+    prompts = [f"prompt {i}" for i in range(4)]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(batcher.generate, prompts))
+
+    assert results == [prompt.upper() for prompt in prompts]
+    assert sorted(len(batch) for batch in model.batches) == [4]
+    assert batcher.stats()['by_batch_size'][4]['prompts'] == 4
+
+def test_model_error_reaches_every_request_and_worker_survives(make_batcher):
+    model = EchoModel(fail_with=RuntimeError("sem memória"))
+    batcher = make_batcher(model, window_ms=100, max_batch_size=2)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = [pool.submit(batcher.generate, f"prompt {i}") for i in range(2)]
+        for future in futures:
+            with pytest.raises(RuntimeError, match="sem memória"):
+                future.result(timeout=5)
+
+    model.fail_with = None
+    assert batcher.generate("depois", timeout=5) == "DEPOIS"
+
+def test_missing_outputs_fail_the_whole_batch(make_batcher):
+    batcher = make_batcher(EchoModel(drop_outputs=True), window_ms=0)
+    with pytest.raises(RuntimeError, match="0 saídas para um lote de 1 prompts"):
+        batcher.generate("prompt", timeout=5)
+
+def test_cancelled_requests_are_not_generated(make_batcher):
+    model = EchoModel()
+    batcher = make_batcher(model, window_ms=0)
+    cancelled, waiting = Future(), Future()
+    cancelled.cancel()
+
+    batcher._process_batch([("desistiu", cancelled), ("aguarda", waiting)])
+
+    assert model.batches == [["aguarda"]]
+    assert waiting.result(timeout=1) == "AGUARDA"
+    assert cancelled.cancelled()
+
+def test_batch_of_only_cancelled_requests_skips_the_model(make_batcher):
+    model = EchoModel()
+    batcher = make_batcher(model, window_ms=0)
+    cancelled = Future()
+    cancelled.cancel()
+    batcher._process_batch([("desistiu", cancelled)])
+    assert model.batches == []
+
+def test_timed_out_request_is_dropped_from_the_queue(make_batcher):
+    started, release = threading.Event(), threading.Event()
+    model = EchoModel()
+
+    def slow_model(prompts, batch_size, **kwargs):
+        started.set()
+        release.wait(5)
+        return model(prompts, batch_size, **kwargs)
+
+    batcher = make_batcher(slow_model, window_ms=0, max_batch_size=1)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        first = pool.submit(batcher.generate, "primeiro")
+        assert started.wait(5)
+        # O worker está ocupado com o primeiro prompt: o segundo desiste na fila
+        with pytest.raises(TimeoutError):
+            batcher.generate("desistiu", timeout=0.05)
+        release.set()
+        assert first.result(timeout=5) == "PRIMEIRO"
+
+    assert batcher.generate("seguinte", timeout=5) == "SEGUINTE"
+    assert ["desistiu"] not in model.batches
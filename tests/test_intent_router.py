@@ -0,0 +1,59 @@
+"""
+Classificação de intenções do roteador
+
+Palavras-chave curtas (até SHORT_KEYWORD_LENGTH letras) só casam a palavra
+inteira; as longas casam no início de uma palavra. O ranking de clientes
+padrão é o dos últimos 30 dias; o de todo o histórico só é escolhido quando
+a pergunta pede explicitamente.
+"""
+import pytest
+
+from app.intent_router import analyze_question, classify_analytics, classify_rag_query, is_sales_question
+
+@pytest.mark.parametrize("question, expected", [
+    ("Who are our top customers?", "customer"),
+    ("Show the best clients", "customer"),
+    ("Top customers of all time", "customer_lifetime"),
+    ("Best clients ever", "customer_lifetime"),
+    ("Customer lifetime ranking", "customer_lifetime"),
+    ("Which customer bought every week?", "customer"),
+    ("Top products by revenue", "product"),
+    ("Sales trend", "trend"),
+])
+def test_classify_analytics_customer_window(question, expected):
+    assert classify_analytics(question) == expected
+
+@pytest.mark.parametrize("question, question_type, time_period", [
+    # 'mes' e 'ano' são curtas: não casam 'mesmo' nem 'anônimos'
+    ("Vendas do mesmo cliente", "customer_analysis", None),
+    ("Produtos anônimos vendidos", "general", None),
+    ("Vendas do último mês", "time_analysis", "last_month"),
+    ("Quanto vendemos no ano?", "time_analysis", None),
+    # 'top' casa só a palavra inteira
+    ("Produtos no topo da lista", "general", None),
+    ("Top vendas", "top_products", None),
+    ("Quais produtos venderam mais na semana passada?", "time_analysis", "last_week"),
+])
+def test_short_keywords_match_whole_words(question, question_type, time_period):
+    analysis = analyze_question(question)
+    assert analysis['type'] == question_type
+    assert analysis['time_period'] == time_period
+
+@pytest.mark.parametrize("question, language, expected", [
+    ("Qual o produto mais vendido?", "pt", True),
+    ("Qual a receita total?", "pt", True),
+    ("Qual o mesmo assunto?", "pt", False),
+    ("show top sales", "en", True),
+    ("topic of the day", "en", False),
+    ("What is the roi of the campaign?", "en", True),
+    ("Give me a round number", "en", False),
+    ("Olá, tudo bem com as vendas?", "pt", False),
+])
+def test_sales_question_validation(question, language, expected):
+    assert is_sales_question(question, language) is expected
+
+def test_rag_query_types():
+    assert classify_rag_query("Qual o produto mais vendido?") == "top_products"
+    assert classify_rag_query("Mostre um resumo") == "summary"
+    assert classify_rag_query("Vendas da semana passada") == "last_week"
+    assert classify_rag_query("Liste os clientes") == "general"
@@ -0,0 +1,47 @@
+"""
+Caminho rápido das listagens contra o response_model
+
+O JSON do orjson deve ser idêntico byte a byte ao do endpoint validado por
+pydantic, inclusive em valores nulos, datas sem microssegundos e páginas
+deslocadas.
+"""
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from benchmarks.bench_list_responses import RESOURCES, build_app
+from benchmarks.sample_data import create_sample_database
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    url = create_sample_database(str(tmp_path_factory.mktemp("lists") / "sales.db"), 300, n_products=20, n_customers=30)
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        # Produto sem categoria e sem preço, e venda com data sem fração de segundo
+        connection.execute(text("INSERT INTO products (id, sku, name) VALUES (999, 'SKU-NULL', 'Sem preço')"))
+        connection.execute(
+            text(
+                "INSERT INTO sales (product_id, customer_id, quantity, total_amount_cents, sale_date) "
+                "VALUES (999, 1, 1, 5, :sale_date)"
+            ),
+            {"sale_date": datetime(2024, 1, 2, 3, 4, 5)}
+        )
+    engine.dispose()
+    return TestClient(build_app(url))
+
+@pytest.mark.parametrize("resource", sorted(RESOURCES))
+@pytest.mark.parametrize("query", ["", "?limit=1000", "?skip=290&limit=50", "?skip=5000"])
+def test_fast_json_matches_response_model(client, resource, query):
+    validated = client.get(f"/validated/{resource}{query}")
+    fast = client.get(f"/fast/{resource}{query}")
+    assert validated.status_code == fast.status_code == 200
+    assert fast.content == validated.content
+
+def test_money_is_formatted_like_the_validated_decimal(client):
+    products = {row['sku']: row for row in client.get("/fast/products?limit=1000").json()}
+    assert products['SKU-NULL']['price'] is None
+    sale = client.get("/fast/sales?skip=300&limit=1").json()[0]
+    assert sale['total_amount'] == "0.05"
+    assert sale['sale_date'] == "2024-01-02T03:04:05"
@@ -0,0 +1,55 @@
+"""
+Modelos de SQL do cache de planos
+
+Um número da pergunta só vira parâmetro quando aparece exatamente uma vez no
+SQL (dentro ou fora de aspas); senão o plano vale só para a pergunta literal.
+"""
+import pytest
+
+from app.sql_plan_cache import SQLPlanCache, sql_template
+
+@pytest.fixture
+def plans(tmp_path):
+    return SQLPlanCache(path=str(tmp_path / "plans.db"))
+
+def test_number_in_question_becomes_parameter(plans):
+    plans.store("top 5 produtos", "SELECT name FROM products ORDER BY price_cents DESC LIMIT 5")
+
+    plan = plans.lookup("top 10 produtos")
+    assert plan['match'] == "exact"
+    assert plan['sql'] == "SELECT name FROM products ORDER BY price_cents DESC LIMIT 10"
+
+def test_quoted_number_becomes_parameter():
+    sql = "SELECT SUM(total_amount_cents) FROM sales WHERE strftime('%Y', sale_date) = '2023'"
+    assert sql_template(sql, ["2023"]) == (
+        "SELECT SUM(total_amount_cents) FROM sales WHERE strftime('%Y', sale_date) = '{0}'"
+    )
+
+def test_quoted_year_is_not_reused_for_another_year(plans):
+    plans.store(
+        "vendas de 2023",
+        "SELECT COUNT(*) FROM sales WHERE sale_date >= '2023-01-01' AND sale_date < '2023-12-31'"
+    )
+
+    assert plans.lookup("vendas de 2024") is None
+    assert "'2023-01-01'" in plans.lookup("vendas de 2023")['sql']
+
+def test_year_in_single_literal_answers_other_years(plans):
+    plans.store("vendas de 2023", "SELECT COUNT(*) FROM sales WHERE strftime('%Y', sale_date) = '2023'")
+
+    assert plans.lookup("vendas de 2024")['sql'].endswith("= '2024'")
+
+def test_unrelated_constant_equal_to_question_number_is_not_replaced(plans):
+    plans.store("top 1 produto", "SELECT name FROM products WHERE id > 1 LIMIT 1")
+
+    assert plans.lookup("top 5 produto") is None
+    assert plans.lookup("top 1 produto")['sql'] == "SELECT name FROM products WHERE id > 1 LIMIT 1"
+
+def test_repeated_question_number_is_stored_literally():
+    assert sql_template("SELECT * FROM sales LIMIT 5 OFFSET 5", ["5", "5"]) is None
+
+def test_paraphrase_needs_same_content_words(plans):
+    plans.store("qual a receita total", "SELECT SUM(total_amount_cents) FROM sales")
+
+    assert plans.lookup("receita total")['match'] == "paraphrase"
+    assert plans.lookup("qual a quantidade total") is None
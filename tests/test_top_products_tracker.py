@@ -0,0 +1,76 @@
+"""
+Ranking de produtos em memória contra a consulta `top_products` do registro
+
+O tracker usa os mesmos limites de dia de build_params e lê o cadastro dos
+produtos na consulta: o resultado deve ser igual ao do SQL, inclusive depois
+de vendas novas e de alterações de produto.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app import analytics_queries, top_products_tracker as tracker_module
+from app.analytics_queries import run_analytics_query
+from app.top_products_tracker import TopProductsTracker
+from benchmarks.sample_data import create_sample_database
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    # Sem o caminho rápido, run_analytics_query executa o SQL; sincronização a cada consulta
+    monkeypatch.delitem(analytics_queries._FAST_PATHS, "top_products", raising=False)
+    monkeypatch.setattr(tracker_module, "TOP_PRODUCTS_SYNC_SECONDS", 0)
+    engine = create_engine(create_sample_database(str(tmp_path / "sales.db"), 5000, n_products=80, days=100))
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+def _insert_sale(db: Session, sale_date: datetime, product_id: int = 1, quantity: int = 500):
+    db.execute(
+        text(
+            "INSERT INTO sales (product_id, customer_id, quantity, total_amount_cents, sale_date) "
+            "VALUES (:product_id, 1, :quantity, 123456, :sale_date)"
+        ),
+        {"product_id": product_id, "quantity": quantity, "sale_date": sale_date}
+    )
+    db.commit()
+
+@pytest.mark.parametrize("days, limit", [(7, None), (30, 5), (90, 10), (30, 60)])
+def test_matches_registry_query(db, days, limit):
+    tracker = TopProductsTracker()
+    tracker.rebuild(db)
+    assert tracker.query(db, days=days, limit=limit) == run_analytics_query(db, "top_products", days=days, limit=limit)
+
+def test_window_starts_at_registry_start_day(db):
+    tracker = TopProductsTracker()
+    tracker.rebuild(db)
+    # Venda no primeiro dia da janela de 7 dias (meia-noite de hoje - 7)
+    start = datetime.combine(datetime.now().date() - timedelta(days=7), datetime.min.time())
+    _insert_sale(db, start + timedelta(minutes=1), product_id=3)
+    # E uma no dia anterior, fora da janela
+    _insert_sale(db, start - timedelta(minutes=1), product_id=4)
+    assert tracker.query(db, days=7) == run_analytics_query(db, "top_products", days=7)
+    assert tracker.query(db, days=7)[0]['id'] == 3
+
+def test_product_changes_are_visible(db):
+    tracker = TopProductsTracker()
+    tracker.rebuild(db)
+    top_id = tracker.query(db, days=30)[0]['id']
+    db.execute(text("UPDATE products SET name = 'Renomeado', price_cents = 999 WHERE id = :id"), {"id": top_id})
+    db.commit()
+    rows = tracker.query(db, days=30)
+    assert rows[0]['name'] == 'Renomeado' and rows[0]['price'] == 9.99
+    assert rows == run_analytics_query(db, "top_products", days=30)
+
+def test_sales_after_window_end_fall_back_to_sql(db):
+    tracker = TopProductsTracker()
+    tracker.rebuild(db)
+    later = datetime.now() + timedelta(seconds=30)
+    _insert_sale(db, later, product_id=5, quantity=5000)
+    rows = tracker.query(db, days=30)
+    if later.date() == datetime.now().date():
+        # Venda do último dia posterior ao fim da janela: o tracker não recorta o dia
+        assert rows is None and tracker.fallbacks == 1
+    else:
+        assert rows == run_analytics_query(db, "top_products", days=30)